@@ -0,0 +1,214 @@
+import asyncio
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Dict
+
+from .config import Config
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a request is shed instead of queued
+    """
+    def __init__(self, intent: str, reason: str, retry_after: float):
+        super().__init__(f"Server busy ({reason}), retry in {retry_after:.1f}s")
+        self.intent = intent
+        self.reason = reason
+        self.retry_after = retry_after
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when an admitted request runs past its deadline
+    """
+
+class AdmissionTicket:
+    """
+    An admitted request: its deadline covers queueing and handling
+    """
+    __slots__ = ('controller', 'intent', 'created', 'deadline', 'queued')
+    
+    def __init__(self, controller: 'AdmissionController', intent: str, deadline: float):
+        self.controller = controller
+        self.intent = intent
+        self.created = time.monotonic()
+        self.deadline = self.created + deadline
+        self.queued = 0.0
+    
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+    
+    def _expired(self) -> DeadlineExceeded:
+        self.controller.deadline_exceeded[self.intent] += 1
+        return DeadlineExceeded(f"{self.intent} request exceeded its deadline")
+    
+    async def run(self, awaitable: Awaitable[Any]) -> Any:
+        """
+        Await the handler, giving up when the deadline passes
+        """
+        try:
+            return await asyncio.wait_for(awaitable, self.remaining())
+        except asyncio.TimeoutError:
+            raise self._expired() from None
+    
+    async def stream(self, chunks: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        """
+        Relay a streamed reply, giving up when the deadline passes
+        """
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), self.remaining())
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    raise self._expired() from None
+                yield chunk
+        finally:
+            await chunks.aclose()
+
+class AdmissionController:
+    """
+    Admission control in front of the intent handlers.
+    
+    At most max_concurrency requests are handled at once. Others wait in
+    a bounded queue per intent class and freed slots go to the highest
+    priority class first, so cheap system commands are not stuck behind
+    LLM calls. A request is shed with AdmissionRejected when its queue is
+    full, when the estimated wait (queue position times the moving
+    average handling time) already exceeds max_queue_wait, or when it
+    has actually waited that long. A request whose own deadline is shorter
+    than max_queue_wait and runs out while it waits gets DeadlineExceeded
+    instead, so the client learns its deadline fired rather than being
+    asked to retry.
+    """
+    # Highest priority first; unknown intents share the lowest class
+    PRIORITIES = ('system_control', 'task_automation', 'general_conversation', 'information_retrieval')
+    
+    def __init__(
+        self,
+        max_concurrency: int = None,
+        queue_limit: int = None,
+        max_queue_wait: float = None,
+        deadline: float = None
+    ):
+        self.max_concurrency = max_concurrency or Config.ADMISSION_MAX_CONCURRENCY
+        self.queue_limit = queue_limit or Config.ADMISSION_QUEUE_LIMIT
+        self.max_queue_wait = Config.ADMISSION_MAX_QUEUE_WAIT if max_queue_wait is None else max_queue_wait
+        self.deadline = deadline or Config.ADMISSION_DEADLINE
+        
+        self._queues = {intent: deque() for intent in self.PRIORITIES}
+        self._active = 0
+        self._service_time = None  # moving average, seconds
+        
+        # Metrics
+        self.admitted = Counter()
+        self.rejected = {intent: Counter() for intent in self.PRIORITIES}
+        self.deadline_exceeded = Counter()
+    
+    def _class_of(self, intent: str) -> str:
+        return intent if intent in self._queues else self.PRIORITIES[-1]
+    
+    def expected_wait(self, intent: str) -> float:
+        """
+        Estimated queueing delay for a new request of this class
+        """
+        if self._service_time is None:
+            return 0.0
+        ahead = 0
+        for name in self.PRIORITIES:
+            ahead += len(self._queues[name])
+            if name == intent:
+                break
+        return (ahead + 1) * self._service_time / self.max_concurrency
+    
+    def _reject(self, intent: str, reason: str):
+        self.rejected[intent][reason] += 1
+        retry_after = max(self.expected_wait(intent), self._service_time or 0.0, 0.1)
+        raise AdmissionRejected(intent, reason, retry_after)
+    
+    @asynccontextmanager
+    async def admit(self, intent: str, deadline: float = None) -> AsyncIterator[AdmissionTicket]:
+        """
+        Hold a handling slot for the duration of the block
+        """
+        ticket = AdmissionTicket(self, self._class_of(intent), deadline or self.deadline)
+        await self._acquire(ticket)
+        started = time.monotonic()
+        try:
+            yield ticket
+        finally:
+            self._release(time.monotonic() - started)
+    
+    async def _acquire(self, ticket: AdmissionTicket):
+        intent = ticket.intent
+        if self._active < self.max_concurrency and not any(self._queues.values()):
+            self._active += 1
+            self.admitted[intent] += 1
+            return
+        
+        queue = self._queues[intent]
+        if len(queue) >= self.queue_limit:
+            self._reject(intent, 'queue_full')
+        if self.expected_wait(intent) > self.max_queue_wait:
+            self._reject(intent, 'overloaded')
+        
+        # A releasing request hands its slot over by resolving the future
+        future = asyncio.get_running_loop().create_future()
+        queue.append(future)
+        # Whichever limit is closer ends the wait
+        remaining = ticket.remaining()
+        deadline_first = remaining < self.max_queue_wait
+        try:
+            await asyncio.wait_for(asyncio.shield(future), min(self.max_queue_wait, remaining))
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot arrived as the wait ended
+                if isinstance(e, asyncio.CancelledError):
+                    self._release(None)
+                    raise
+            else:
+                future.cancel()
+                queue.remove(future)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                if deadline_first:
+                    raise ticket._expired() from None
+                self._reject(intent, 'wait_exceeded')
+        
+        ticket.queued = time.monotonic() - ticket.created
+        self.admitted[intent] += 1
+    
+    def _release(self, duration: float = None):
+        if duration is not None:
+            self._service_time = (
+                duration if self._service_time is None
+                else 0.8 * self._service_time + 0.2 * duration
+            )
+        
+        for name in self.PRIORITIES:
+            queue = self._queues[name]
+            while queue:
+                future = queue.popleft()
+                if not future.done():
+                    future.set_result(None)
+                    return
+        self._active -= 1
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'active': self._active,
+            'max_concurrency': self.max_concurrency,
+            'service_time_ms': (self._service_time or 0.0) * 1000,
+            'classes': {
+                intent: {
+                    'depth': len(self._queues[intent]),
+                    'limit': self.queue_limit,
+                    'admitted': self.admitted[intent],
+                    'rejected': dict(self.rejected[intent]),
+                    'deadline_exceeded': self.deadline_exceeded[intent],
+                } for intent in self.PRIORITIES
+            },
+        }
+
+# Shared admission controller for all websocket traffic
+admission_controller = AdmissionController()
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import logging
+import tempfile
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Dict, IO, Iterator
+
+from .executors import execution_layer
+from .nlp_engine import nlp_engine
+
+logger = logging.getLogger('BulkAnalysis')
+
+# Marks the end of the result stream
+_END = object()
+
+# Request bodies larger than this are spooled to disk instead of memory
+SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+async def spool_body(body: AsyncIterator[bytes]) -> IO[bytes]:
+    """
+    Copy a request body into a spooled temporary file.
+    
+    The body has to be consumed before a streaming response starts, since
+    the server listens for client disconnects on the same receive channel.
+    Spooling keeps memory bounded for large uploads.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    async for chunk in body:
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+def ndjson_records(lines: Iterator[bytes], errors: deque, positions: deque = None) -> Iterator[Any]:
+    """
+    Decode NDJSON lines, appending malformed ones to errors and the line
+    number of each yielded record to positions
+    """
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            errors.append({'line': line_number, 'error': f"Invalid JSON: {e}"})
+            continue
+        if isinstance(record, dict) and 'text' not in record:
+            errors.append({'line': line_number, 'error': "Missing 'text' field"})
+            continue
+        if positions is not None:
+            positions.append(line_number)
+        yield record
+
+async def stream_analysis(
+    source: IO[bytes],
+    options: Dict[str, Any] = None,
+    queue_size: int = 1024
+) -> AsyncIterator[bytes]:
+    """
+    Run nlp_engine.analyze_many over an NDJSON file and yield NDJSON result
+    lines as they are produced.
+    
+    analyze_many is blocking, so it runs on the execution layer's CPU pool
+    and hands results to the event loop through a bounded queue; a slow
+    client pauses the analysis instead of letting results pile up in
+    memory. Malformed input lines are reported as error records in their
+    place in the input: analyze_many reads ahead by a batch, so an error is
+    held back until every earlier line's result has been sent.
+    """
+    loop = asyncio.get_running_loop()
+    outputs = asyncio.Queue(maxsize=queue_size)
+    cancelled = threading.Event()
+    
+    def publish(item) -> bool:
+        # Blocks the analysis thread until the event loop has room
+        if cancelled.is_set():
+            return False
+        asyncio.run_coroutine_threadsafe(outputs.put(item), loop).result()
+        return True
+    
+    def worker():
+        errors = deque()
+        positions = deque()
+        try:
+            if cancelled.is_set():
+                # The client left while this call waited for a pool thread
+                return
+            records = ndjson_records(source, errors, positions)
+            for result in nlp_engine.analyze_many(records, **(options or {})):
+                line_number = positions.popleft()
+                while errors and errors[0]['line'] < line_number:
+                    publish(errors.popleft())
+                if not publish(result):
+                    return
+            for error in errors:
+                publish(error)
+        except Exception as e:
+            logger.exception("Bulk analysis failed")
+            publish({'error': str(e)})
+        finally:
+            source.close()
+            publish(_END)
+    
+    analysis = asyncio.ensure_future(execution_layer.run_local(worker))
+    
+    try:
+        while True:
+            item = await outputs.get()
+            if item is _END:
+                break
+            yield (json.dumps(item) + '\n').encode()
+        await analysis
+    finally:
+        cancelled.set()
+        # Unblock the worker if it is waiting for queue space
+        while not outputs.empty():
+            outputs.get_nowait()
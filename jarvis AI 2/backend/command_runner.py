@@ -0,0 +1,202 @@
+import asyncio
+import inspect
+import os
+import signal
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Any, NamedTuple, Optional, Union
+
+from .config import Config
+
+CHUNK_SIZE = 2 ** 16
+
+# Called with (stream_name, line) for every line of output as it arrives
+OutputCallback = Callable[[str, str], Union[None, Awaitable[None]]]
+
+class CommandResult(NamedTuple):
+    command: str
+    returncode: Optional[int]
+    stdout: str
+    stderr: str
+    duration: float
+    timed_out: bool = False
+    truncated: bool = False
+
+class BoundedOutput:
+    """
+    Keeps the tail of a stream's output within a byte budget, counting
+    the UTF-8 encoded size of each line rather than its characters
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        # (line, encoded size) pairs
+        self.lines = deque()
+        self.size = 0
+        self.dropped = 0
+    
+    def append(self, line: str):
+        size = len(line.encode())
+        if size > self.max_bytes:
+            # Cutting may split a character; its remaining bytes are dropped
+            tail = line.encode()[-self.max_bytes:]
+            line = tail.decode(errors='ignore')
+            size = len(line.encode())
+            self.dropped += 1
+        self.lines.append((line, size))
+        self.size += size
+        while self.size > self.max_bytes:
+            self.size -= self.lines.popleft()[1]
+            self.dropped += 1
+    
+    def text(self) -> str:
+        return ''.join(line for line, _ in self.lines)
+
+class AsyncCommandRunner:
+    """
+    Runs shell commands as asyncio subprocesses.
+    
+    A semaphore caps concurrent commands, each command has a timeout after
+    which its whole process group is killed, and output is read line by
+    line so it can be forwarded while the command runs. Only the last
+    max_output_bytes of each stream are kept for the result.
+    """
+    def __init__(
+        self,
+        max_concurrency: int = None,
+        default_timeout: float = None,
+        max_output_bytes: int = None
+    ):
+        self.max_concurrency = max_concurrency or Config.COMMAND_MAX_CONCURRENCY
+        self.default_timeout = default_timeout or Config.DEFAULT_TIMEOUT
+        self.max_output_bytes = max_output_bytes or Config.COMMAND_MAX_OUTPUT_BYTES
+        self._semaphore = None
+        
+        self.running = 0
+        self.completed = 0
+        self.timeouts = 0
+    
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+    
+    async def run(
+        self,
+        command: str,
+        timeout: float = None,
+        on_output: OutputCallback = None
+    ) -> CommandResult:
+        """
+        Run a command, streaming output lines to on_output if given
+        """
+        timeout = timeout or self.default_timeout
+        async with self.semaphore:
+            self.running += 1
+            try:
+                return await self._run(command, timeout, on_output)
+            finally:
+                self.running -= 1
+                self.completed += 1
+    
+    async def _run(self, command: str, timeout: float, on_output: OutputCallback) -> CommandResult:
+        started = time.perf_counter()
+        process = await asyncio.create_subprocess_shell(
+            command,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=(os.name == 'posix')
+        )
+        
+        stdout = BoundedOutput(self.max_output_bytes)
+        stderr = BoundedOutput(self.max_output_bytes)
+        readers = asyncio.gather(
+            self._pump(process.stdout, 'stdout', stdout, on_output),
+            self._pump(process.stderr, 'stderr', stderr, on_output),
+        )
+        
+        timed_out = False
+        try:
+            await asyncio.wait_for(asyncio.shield(readers), timeout)
+            await process.wait()
+        except asyncio.TimeoutError:
+            timed_out = True
+            self.timeouts += 1
+            self._kill(process)
+            await process.wait()
+            await readers
+        except asyncio.CancelledError:
+            self._kill(process)
+            readers.cancel()
+            try:
+                await readers
+            except asyncio.CancelledError:
+                pass
+            raise
+        
+        return CommandResult(
+            command=command,
+            returncode=process.returncode,
+            stdout=stdout.text(),
+            stderr=stderr.text(),
+            duration=time.perf_counter() - started,
+            timed_out=timed_out,
+            truncated=bool(stdout.dropped or stderr.dropped),
+        )
+    
+    @staticmethod
+    async def _pump(
+        reader: asyncio.StreamReader,
+        name: str,
+        buffer: BoundedOutput,
+        on_output: OutputCallback
+    ):
+        # Read in chunks and split lines ourselves so arbitrarily long lines
+        # are passed on in pieces instead of overrunning the reader limit
+        pending = b''
+        while True:
+            chunk = await reader.read(CHUNK_SIZE)
+            if chunk:
+                pending += chunk
+                *lines, pending = pending.split(b'\n')
+                lines = [line + b'\n' for line in lines]
+                if len(pending) >= CHUNK_SIZE:
+                    lines.append(pending)
+                    pending = b''
+            else:
+                lines = [pending] if pending else []
+            
+            for raw in lines:
+                line = raw.decode(errors='replace')
+                buffer.append(line)
+                if on_output is not None:
+                    result = on_output(name, line)
+                    if inspect.isawaitable(result):
+                        await result
+            
+            if not chunk:
+                return
+    
+    @staticmethod
+    def _kill(process: asyncio.subprocess.Process):
+        try:
+            if os.name == 'posix':
+                # The shell's children share its session; kill them all,
+                # even when the shell itself has already exited
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except ProcessLookupError:
+            pass
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'running': self.running,
+            'completed': self.completed,
+            'timeouts': self.timeouts,
+            'max_concurrency': self.max_concurrency,
+        }
+
+# Shared runner
+command_runner = AsyncCommandRunner()
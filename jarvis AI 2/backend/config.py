@@ -7,19 +7,185 @@ load_dotenv()
 class Config:
     # OpenAI Configuration
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
+    OPENAI_API_BASE = os.getenv('OPENAI_API_BASE', 'https://api.openai.com/v1')
     
     # Speech Recognition Settings
     SPEECH_RECOGNITION_THRESHOLD = 0.5
     LANGUAGE_MODEL = 'gpt-3.5-turbo'
     
+    # /ws multiplexing: framed requests running at once per connection, and
+    # the most accepted (running plus waiting) before new ones are refused
+    WS_MAX_INFLIGHT = int(os.getenv('WS_MAX_INFLIGHT', '4'))
+    WS_MAX_PENDING = int(os.getenv('WS_MAX_PENDING', '32'))
+    
+    # Admission control across all connections: queries handled at once,
+    # waiting queries per intent class, longest queue wait before a query
+    # is answered "busy", and the deadline for queueing plus handling
+    ADMISSION_MAX_CONCURRENCY = int(os.getenv('ADMISSION_MAX_CONCURRENCY', '32'))
+    ADMISSION_QUEUE_LIMIT = int(os.getenv('ADMISSION_QUEUE_LIMIT', '64'))
+    ADMISSION_MAX_QUEUE_WAIT = float(os.getenv('ADMISSION_MAX_QUEUE_WAIT', '2'))  # seconds
+    ADMISSION_DEADLINE = float(os.getenv('ADMISSION_DEADLINE', '30'))  # seconds
+    
+    # Metrics: event loop lag sampling interval, and the fraction of
+    # requests whose per-stage spans are written to the Trace logger
+    METRICS_LOOP_LAG_INTERVAL = float(os.getenv('METRICS_LOOP_LAG_INTERVAL', '0.5'))  # seconds
+    METRICS_TRACE_SAMPLE_RATE = float(os.getenv('METRICS_TRACE_SAMPLE_RATE', '0'))
+    
+    # Voice websocket: PCM sample rate, energy VAD (RMS threshold on 16-bit
+    # samples, silence that ends an utterance, shortest kept utterance)
+    VOICE_SAMPLE_RATE = int(os.getenv('VOICE_SAMPLE_RATE', '16000'))
+    VOICE_VAD_THRESHOLD = float(os.getenv('VOICE_VAD_THRESHOLD', '500'))
+    VOICE_VAD_SILENCE_MS = int(os.getenv('VOICE_VAD_SILENCE_MS', '600'))
+    VOICE_VAD_MIN_SPEECH_MS = int(os.getenv('VOICE_VAD_MIN_SPEECH_MS', '200'))
+    VOICE_MAX_SEGMENT_MS = int(os.getenv('VOICE_MAX_SEGMENT_MS', '15000'))
+    # Utterances waiting to be answered per connection; when full the
+    # oldest waiting one is dropped
+    VOICE_MAX_PENDING_SEGMENTS = int(os.getenv('VOICE_MAX_PENDING_SEGMENTS', '4'))
+    # Offline speech_recognition backend: sphinx, vosk or whisper
+    VOICE_RECOGNIZER = os.getenv('VOICE_RECOGNIZER', 'sphinx')
+    VOICE_TTS_RATE = int(os.getenv('VOICE_TTS_RATE', '0'))  # words per minute, 0 = engine default
+    VOICE_TTS_VOICE = os.getenv('VOICE_TTS_VOICE', '')
+    TTS_CACHE_DIRECTORY = os.getenv('TTS_CACHE_DIRECTORY', os.path.join(os.getcwd(), 'data', 'tts'))
+    TTS_CACHE_MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+    
+    # NLP Model Settings
+    SPACY_MODEL = os.getenv('SPACY_MODEL', 'en_core_web_lg')
+    QA_MODEL_NAME = os.getenv('QA_MODEL_NAME', 'deepset/roberta-base-squad2')
+    # Comma-separated models loaded by the startup warm-up; everything else
+    # is loaded the first time a code path needs it.
+    # Available: spacy, qa_model, qa_tokenizer, sentiment, ner
+    NLP_PRELOAD_MODELS = [
+        name.strip()
+        for name in os.getenv('NLP_PRELOAD_MODELS', 'spacy').split(',')
+        if name.strip()
+    ]
+    # spaCy components skipped when parsing queries; intents and entities
+    # only need the tokenizer, tok2vec and ner
+    NLP_DISABLED_COMPONENTS = [
+        name.strip()
+        for name in os.getenv('NLP_DISABLED_COMPONENTS', 'parser,lemmatizer').split(',')
+        if name.strip()
+    ]
+    
+    # Transformer inference backend: torch (eager fp32), quantized (int8
+    # dynamic) or onnx (exported once into ONNX_CACHE_DIRECTORY)
+    NLP_INFERENCE_BACKEND = os.getenv('NLP_INFERENCE_BACKEND', 'torch').lower()
+    ONNX_CACHE_DIRECTORY = os.getenv('ONNX_CACHE_DIRECTORY', os.path.join(os.getcwd(), 'data', 'onnx'))
+    ONNX_PARITY_TOLERANCE = float(os.getenv('ONNX_PARITY_TOLERANCE', '1e-3'))
+    ONNX_INTRA_OP_THREADS = int(os.getenv('ONNX_INTRA_OP_THREADS', '0'))  # 0 = runtime default
+    
+    # Long-context QA: contexts are split into windows of QA_MAX_SEQ_LENGTH
+    # tokens overlapping by QA_DOC_STRIDE; the best span is searched among
+    # the QA_TOP_K most likely starts and ends of each window
+    QA_MAX_SEQ_LENGTH = int(os.getenv('QA_MAX_SEQ_LENGTH', '384'))
+    QA_DOC_STRIDE = int(os.getenv('QA_DOC_STRIDE', '128'))
+    QA_MAX_ANSWER_TOKENS = int(os.getenv('QA_MAX_ANSWER_TOKENS', '30'))
+    QA_TOP_K = int(os.getenv('QA_TOP_K', '20'))
+    QA_WINDOW_BATCH_SIZE = int(os.getenv('QA_WINDOW_BATCH_SIZE', '16'))
+    
+    # Inference micro-batching: concurrent requests are gathered for up to
+    # the window (or until the batch is full) and run as one padded batch
+    INFERENCE_BATCH_WINDOW_MS = float(os.getenv('INFERENCE_BATCH_WINDOW_MS', '5'))
+    INFERENCE_MAX_BATCH_SIZE = int(os.getenv('INFERENCE_MAX_BATCH_SIZE', '16'))
+    
+    # Shared model server: with USE_MODEL_SERVER=true web workers forward
+    # model calls over a Unix socket to one process that owns the models
+    USE_MODEL_SERVER = os.getenv('USE_MODEL_SERVER', 'false').lower() == 'true'
+    MODEL_SERVER_SOCKET = os.getenv('MODEL_SERVER_SOCKET', '/tmp/jarvis-models.sock')
+    MODEL_SERVER_TIMEOUT = float(os.getenv('MODEL_SERVER_TIMEOUT', '30'))  # seconds per call
+    MODEL_SERVER_STARTUP_TIMEOUT = float(os.getenv('MODEL_SERVER_STARTUP_TIMEOUT', '300'))
+    
+    # Bulk analysis (nlp.pipe batch size and worker processes, and the
+    # batch size for transformer pipelines)
+    BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', '256'))
+    BULK_N_PROCESS = int(os.getenv('BULK_N_PROCESS', '1'))
+    BULK_MODEL_BATCH_SIZE = int(os.getenv('BULK_MODEL_BATCH_SIZE', '32'))
+    # Largest batch_size and n_process a /analyze/batch request may ask for
+    BULK_MAX_BATCH_SIZE = int(os.getenv('BULK_MAX_BATCH_SIZE', '4096'))
+    BULK_MAX_N_PROCESS = int(os.getenv('BULK_MAX_N_PROCESS', str(os.cpu_count() or 1)))
+    
+    # Response cache for information-retrieval answers
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    RESPONSE_CACHE_CAPACITY = int(os.getenv('RESPONSE_CACHE_CAPACITY', '4096'))
+    RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '3600'))  # seconds
+    RESPONSE_CACHE_SIMILARITY = float(os.getenv('RESPONSE_CACHE_SIMILARITY', '0.95'))
+    RESPONSE_CACHE_MAX_BYTES = int(os.getenv('RESPONSE_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+    
+    # Per-session context memory
+    CONTEXT_TTL = float(os.getenv('CONTEXT_TTL', '3600'))  # seconds
+    CONTEXT_MAX_ENTRIES = int(os.getenv('CONTEXT_MAX_ENTRIES', '100000'))
+    CONTEXT_MAX_BYTES = int(os.getenv('CONTEXT_MAX_BYTES', str(64 * 1024 * 1024)))
+    
     # Task Automation Settings
     TASK_RETRY_LIMIT = 3
+    # Scheduled task runs allowed to execute at the same time
+    TASK_MAX_CONCURRENCY = int(os.getenv('TASK_MAX_CONCURRENCY', '64'))
+    # Timezone for cron schedules without their own; unset means server local time
+    CRON_TIMEZONE = os.getenv('CRON_TIMEZONE')
     DEFAULT_TIMEOUT = 30  # seconds
     
+    # Async command runner
+    COMMAND_MAX_CONCURRENCY = int(os.getenv('COMMAND_MAX_CONCURRENCY', '8'))
+    COMMAND_MAX_OUTPUT_BYTES = int(os.getenv('COMMAND_MAX_OUTPUT_BYTES', str(1024 * 1024)))
+    
+    # Execution Pools
+    IO_THREAD_POOL_SIZE = int(os.getenv('IO_THREAD_POOL_SIZE', '32'))
+    CPU_THREAD_POOL_SIZE = int(os.getenv('CPU_THREAD_POOL_SIZE', str(os.cpu_count() or 1)))
+    # 0 keeps model inference in-process on the CPU thread pool; each
+    # worker process loads its own copy of the models it uses
+    CPU_PROCESS_POOL_SIZE = int(os.getenv('CPU_PROCESS_POOL_SIZE', '0'))
+    
+    # LLM HTTP Client
+    LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', str(DEFAULT_TIMEOUT)))
+    LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', '100'))
+    LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('LLM_MAX_KEEPALIVE_CONNECTIONS', '20'))
+    
     # System Paths
     LOGS_DIRECTORY = os.path.join(os.getcwd(), 'logs')
     TEMP_DIRECTORY = os.path.join(os.getcwd(), 'temp')
     
+    # Task History: recent runs kept in memory, all runs appended to disk.
+    # Set TASK_HISTORY_LOG to an empty string to disable the log.
+    TASK_HISTORY_CAPACITY = int(os.getenv('TASK_HISTORY_CAPACITY', '1000'))
+    TASK_HISTORY_LOG = os.getenv('TASK_HISTORY_LOG', os.path.join(LOGS_DIRECTORY, 'task_history.jsonl'))
+    # Longest expected task run; records are logged on completion, so start
+    # times in the log can be out of order by up to this much
+    TASK_HISTORY_SKEW = float(os.getenv('TASK_HISTORY_SKEW', '300'))
+    
+    # Task Store: SQLite file holding registered tasks across restarts.
+    # Set TASK_STORE_PATH to an empty string to keep tasks in memory only.
+    TASK_STORE_PATH = os.getenv('TASK_STORE_PATH', os.path.join(os.getcwd(), 'data', 'tasks.db'))
+    TASK_STORE_FLUSH_INTERVAL = float(os.getenv('TASK_STORE_FLUSH_INTERVAL', '1'))  # seconds
+    TASK_STORE_BATCH_SIZE = int(os.getenv('TASK_STORE_BATCH_SIZE', '500'))
+    # Runs missed while the backend was down: skip, once or all
+    TASK_CATCHUP_POLICY = os.getenv('TASK_CATCHUP_POLICY', 'skip')
+    TASK_CATCHUP_LIMIT = int(os.getenv('TASK_CATCHUP_LIMIT', '10'))
+    
+    # Task Coordination: 'local' schedules tasks in each worker; 'redis'
+    # shares registered tasks between workers through REDIS_URL, with one
+    # leader (holding a lease renewed every third of it) queuing due runs
+    TASK_COORDINATION = os.getenv('TASK_COORDINATION', 'local')
+    REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+    TASK_REDIS_PREFIX = os.getenv('TASK_REDIS_PREFIX', 'jarvis:tasks')
+    TASK_LEADER_LEASE = float(os.getenv('TASK_LEADER_LEASE', '10'))  # seconds
+    TASK_REDIS_POLL_INTERVAL = float(os.getenv('TASK_REDIS_POLL_INTERVAL', '1'))  # seconds
+    TASK_QUEUE_BATCH_SIZE = int(os.getenv('TASK_QUEUE_BATCH_SIZE', '32'))
+    
+    # Logging: 'queued' hands file records to a background writer thread
+    # that writes JSON lines in batches and rotates by size and age;
+    # 'file' writes plain text synchronously from each logging call
+    LOG_HANDLER = os.getenv('LOG_HANDLER', 'queued')
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_FILE = os.getenv('LOG_FILE', os.path.join(LOGS_DIRECTORY, 'ai_assistant.log'))
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+    # Records below this level are dropped (and counted) once the queue is 80% full
+    LOG_DROP_LEVEL = os.getenv('LOG_DROP_LEVEL', 'WARNING')
+    LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', '256'))
+    LOG_FLUSH_INTERVAL = float(os.getenv('LOG_FLUSH_INTERVAL', '0.5'))  # seconds
+    LOG_MAX_BYTES = int(os.getenv('LOG_MAX_BYTES', str(50 * 1024 * 1024)))
+    LOG_ROTATE_INTERVAL = float(os.getenv('LOG_ROTATE_INTERVAL', str(24 * 3600)))  # seconds, 0 disables
+    LOG_BACKUP_COUNT = int(os.getenv('LOG_BACKUP_COUNT', '7'))
+    
     # Logging Configuration
     LOGGING_CONFIG = {
         'version': 1,
@@ -36,22 +202,26 @@ class Config:
                 'class': 'logging.StreamHandler',
             },
             'file_handler': {
+                '()': 'backend.log_writer.QueuedJSONHandler',
+                'level': 'DEBUG',
+                'filename': LOG_FILE,
+            } if LOG_HANDLER == 'queued' else {
                 'level': 'DEBUG',
                 'formatter': 'standard',
                 'class': 'logging.FileHandler',
-                'filename': os.path.join(LOGS_DIRECTORY, 'ai_assistant.log'),
+                'filename': LOG_FILE,
                 'mode': 'a',
             }
         },
         'loggers': {
             '': {  # root logger
                 'handlers': ['default', 'file_handler'],
-                'level': 'INFO',
+                'level': LOG_LEVEL,
                 'propagate': True
             }
         }
     }
-
+    
     @classmethod
     def validate_config(cls):
         """
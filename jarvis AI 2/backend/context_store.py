@@ -0,0 +1,141 @@
+import heapq
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Tuple
+
+from .config import Config
+
+class ContextRecord:
+    __slots__ = ('value', 'created_at', 'expires_at', 'size')
+    
+    def __init__(self, value: Any, created_at: float, expires_at: float, size: int):
+        self.value = value
+        self.created_at = created_at
+        self.expires_at = expires_at
+        self.size = size
+
+def estimate_size(value: Any) -> int:
+    """
+    Cheap approximate footprint: the object plus its direct members
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(sys.getsizeof(item) for item in value)
+    return size
+
+class SessionContextStore:
+    """
+    Bounded context memory scoped by session.
+    
+    Records live in one OrderedDict keyed by (session_id, key), which gives
+    O(1) get/set and LRU order. Expiry is driven by a min-heap of deadlines
+    with lazy deletion, and global entry and byte caps evict the least
+    recently used records first.
+    """
+    def __init__(
+        self,
+        max_entries: int = None,
+        max_bytes: int = None,
+        default_ttl: float = None
+    ):
+        self.max_entries = max_entries or Config.CONTEXT_MAX_ENTRIES
+        self.max_bytes = max_bytes or Config.CONTEXT_MAX_BYTES
+        self.default_ttl = default_ttl or Config.CONTEXT_TTL
+        
+        self._records = OrderedDict()
+        self._deadlines = []
+        self._sessions = {}
+        self.bytes_used = 0
+        
+        self.expirations = 0
+        self.evictions = 0
+    
+    def set(self, session_id: Hashable, key: str, value: Any, ttl: float = None):
+        now = time.time()
+        self._expire(now)
+        
+        record_key = (session_id, key)
+        if record_key in self._records:
+            self._remove(record_key)
+        
+        record = ContextRecord(value, now, now + (ttl or self.default_ttl), estimate_size(value))
+        self._records[record_key] = record
+        self._sessions.setdefault(session_id, set()).add(key)
+        self.bytes_used += record.size
+        heapq.heappush(self._deadlines, (record.expires_at, record_key))
+        
+        while len(self._records) > self.max_entries or self.bytes_used > self.max_bytes:
+            self._remove(next(iter(self._records)))
+            self.evictions += 1
+        
+        # Overwritten and evicted records leave stale heap entries behind
+        if len(self._deadlines) > 2 * len(self._records) + 64:
+            self._deadlines = [
+                (record.expires_at, record_key)
+                for record_key, record in self._records.items()
+            ]
+            heapq.heapify(self._deadlines)
+    
+    def get(self, session_id: Hashable, key: str, max_age: float = None) -> Any:
+        """
+        Return the stored value, or None if missing, expired or older than
+        max_age seconds
+        """
+        now = time.time()
+        record_key = (session_id, key)
+        record = self._records.get(record_key)
+        if record is None:
+            return None
+        
+        if record.expires_at <= now or (max_age is not None and now - record.created_at > max_age):
+            self._remove(record_key)
+            self.expirations += 1
+            return None
+        
+        self._records.move_to_end(record_key)
+        return record.value
+    
+    def delete(self, session_id: Hashable, key: str):
+        if (session_id, key) in self._records:
+            self._remove((session_id, key))
+    
+    def clear_session(self, session_id: Hashable):
+        """
+        Drop every record of a session, e.g. when its websocket closes
+        """
+        for key in list(self._sessions.get(session_id, ())):
+            self._remove((session_id, key))
+    
+    def _remove(self, record_key: Tuple[Hashable, str]):
+        record = self._records.pop(record_key)
+        self.bytes_used -= record.size
+        session_id, key = record_key
+        keys = self._sessions[session_id]
+        keys.discard(key)
+        if not keys:
+            del self._sessions[session_id]
+    
+    def _expire(self, now: float):
+        deadlines = self._deadlines
+        while deadlines and deadlines[0][0] <= now:
+            expires_at, record_key = heapq.heappop(deadlines)
+            record = self._records.get(record_key)
+            # Skip heap entries for records that were since replaced
+            if record is not None and record.expires_at == expires_at:
+                self._remove(record_key)
+                self.expirations += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        self._expire(time.time())
+        return {
+            'entries': len(self._records),
+            'sessions': len(self._sessions),
+            'bytes': self.bytes_used,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'expirations': self.expirations,
+            'evictions': self.evictions,
+        }
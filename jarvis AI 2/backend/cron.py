@@ -0,0 +1,215 @@
+import calendar
+from datetime import datetime, timedelta, tzinfo
+from functools import lru_cache
+from typing import Optional, Union
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+MONTH_NAMES = {
+    name.lower(): index for index, name in enumerate(calendar.month_abbr) if name
+}
+DAY_NAMES = {
+    'sun': 0, 'mon': 1, 'tue': 2, 'wed': 3, 'thu': 4, 'fri': 5, 'sat': 6
+}
+MACROS = {
+    '@yearly': '0 0 1 1 *',
+    '@annually': '0 0 1 1 *',
+    '@monthly': '0 0 1 * *',
+    '@weekly': '0 0 * * 0',
+    '@daily': '0 0 * * *',
+    '@midnight': '0 0 * * *',
+    '@hourly': '0 * * * *',
+}
+
+# Longest gap searched before deciding an expression can never fire
+# (e.g. "0 0 30 2 *"); Feb 29 needs up to 8 years across a century
+MAX_SEARCH_YEARS = 28
+
+def _next_bit(mask: int, start: int) -> Optional[int]:
+    """
+    Smallest set bit position >= start, or None
+    """
+    shifted = mask >> start
+    if not shifted:
+        return None
+    return start + (shifted & -shifted).bit_length() - 1
+
+def _parse_field(field: str, low: int, high: int, names: dict = None) -> int:
+    """
+    Parse one cron field into a bitset where bit n means value n matches
+    """
+    mask = 0
+    for part in field.lower().split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"Invalid step in cron field: {field}")
+        
+        if part == '*':
+            start, end = low, high
+        else:
+            bounds = [_parse_value(value, names) for value in part.split('-', 1)]
+            start = bounds[0]
+            # "5/15" means "5-max/15"
+            end = bounds[1] if len(bounds) == 2 else (high if step > 1 else start)
+        
+        if not low <= start <= end <= high:
+            raise ValueError(f"Cron field out of range {low}-{high}: {field}")
+        for value in range(start, end + 1, step):
+            mask |= 1 << value
+    return mask
+
+def _parse_value(value: str, names: dict = None) -> int:
+    if names and value in names:
+        return names[value]
+    return int(value)
+
+class CronExpression:
+    """
+    Five-field cron expression (minute hour day-of-month month day-of-week)
+    compiled into bitsets.
+    
+    next_after() jumps field by field using bit scans, so finding the next
+    occurrence costs a handful of operations per month considered rather
+    than one check per minute. Times are evaluated in the expression's
+    timezone (local time when none is given). As in Vixie cron, when both
+    day fields are restricted a day matches if either one does.
+    """
+    __slots__ = ('expression', 'timezone', 'minutes', 'hours', 'days', 'months',
+                 'weekdays', 'day_or')
+    
+    def __init__(self, expression: str, timezone: Union[str, tzinfo, None] = None):
+        self.expression = expression
+        self.timezone = _resolve_timezone(timezone)
+        
+        fields = MACROS.get(expression.strip().lower(), expression).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: {expression!r}")
+        minute, hour, day, month, weekday = fields
+        
+        self.minutes = _parse_field(minute, 0, 59)
+        self.hours = _parse_field(hour, 0, 23)
+        self.days = _parse_field(day, 1, 31)
+        self.months = _parse_field(month, 1, 12, MONTH_NAMES)
+        weekdays = _parse_field(weekday, 0, 7, DAY_NAMES)
+        # 7 is an alias for Sunday
+        self.weekdays = (weekdays | (weekdays >> 7)) & 0x7F
+        self.day_or = not day.startswith('*') and not weekday.startswith('*')
+    
+    def _day_mask(self, year: int, month: int) -> int:
+        """
+        Bitset of matching days (bit 1 = the 1st) in the given month
+        """
+        first_weekday, length = calendar.monthrange(year, month)
+        # calendar counts Monday as 0; cron counts Sunday as 0
+        first = (first_weekday + 1) % 7
+        # Rotate the weekday set so bit 0 is the weekday of the 1st, then
+        # tile it across the month
+        rotated = ((self.weekdays >> first) | (self.weekdays << (7 - first))) & 0x7F
+        weekday_days = 0
+        for week_start in range(0, length, 7):
+            weekday_days |= rotated << (week_start + 1)
+        
+        in_month = (1 << (length + 1)) - 2
+        if self.day_or:
+            mask = self.days | weekday_days
+        else:
+            mask = self.days & weekday_days
+        return mask & in_month
+    
+    def next_after(self, moment: datetime) -> datetime:
+        """
+        First matching time strictly after moment.
+        
+        Matching is done on wall-clock time, so around daylight saving
+        changes every matching local time fires once. A local time skipped
+        when clocks go forward fires as soon as the clocks have jumped, by
+        as much as they jumped (02:30 becomes 03:30 the next hour). A local
+        time repeated when clocks go back fires only the first time it
+        occurs: a daily 01:30 job runs at 01:30 daylight time and not again
+        an hour later, and "*/15 * * * *" pauses during the repeated hour.
+        """
+        if self.timezone is not None:
+            moment = moment.astimezone(self.timezone) if moment.tzinfo else moment.replace(tzinfo=self.timezone)
+        
+        found = self._next_wall_time(moment.replace(second=0, microsecond=0) + timedelta(minutes=1))
+        # Inside a repeated hour (fold=1) the wall times up to moment
+        # already fired during their first occurrence
+        while found.timestamp() <= moment.timestamp():
+            found = self._next_wall_time(found + timedelta(minutes=1))
+        return found
+    
+    def _next_wall_time(self, candidate: datetime) -> datetime:
+        """
+        First matching wall-clock time at or after candidate
+        """
+        year, month, day = candidate.year, candidate.month, candidate.day
+        hour, minute = candidate.hour, candidate.minute
+        
+        for _ in range(MAX_SEARCH_YEARS * 12):
+            next_month = _next_bit(self.months, month)
+            if next_month is None:
+                year, month, day, hour, minute = year + 1, 1, 1, 0, 0
+                continue
+            if next_month != month:
+                month, day, hour, minute = next_month, 1, 0, 0
+            
+            day_mask = self._day_mask(year, month)
+            next_day = _next_bit(day_mask, day)
+            if next_day is not None and next_day != day:
+                day, hour, minute = next_day, 0, 0
+            
+            while next_day is not None:
+                next_hour = _next_bit(self.hours, hour)
+                if next_hour is not None:
+                    if next_hour != hour:
+                        hour, minute = next_hour, 0
+                    next_minute = _next_bit(self.minutes, minute)
+                    if next_minute is not None:
+                        return candidate.replace(
+                            year=year, month=month, day=day, hour=hour, minute=next_minute
+                        )
+                    next_hour = _next_bit(self.hours, hour + 1)
+                    if next_hour is not None:
+                        hour, minute = next_hour, 0
+                        continue
+                # Nothing left today: move to the next matching day
+                next_day = _next_bit(day_mask, day + 1)
+                if next_day is not None:
+                    day, hour, minute = next_day, 0, 0
+            
+            # Nothing left this month
+            month, day, hour, minute = month + 1, 1, 0, 0
+            if month > 12:
+                year, month = year + 1, 1
+        
+        raise ValueError(f"Cron expression never fires: {self.expression!r}")
+    
+    def next_fire_time(self, after: float) -> float:
+        """
+        Next fire time as epoch seconds, strictly after the given epoch time
+        """
+        moment = datetime.fromtimestamp(after, self.timezone)
+        return self.next_after(moment).timestamp()
+    
+    def __repr__(self) -> str:
+        return f"CronExpression({self.expression!r}, timezone={self.timezone!r})"
+
+def _resolve_timezone(timezone: Union[str, tzinfo, None]) -> Optional[tzinfo]:
+    if timezone is None or isinstance(timezone, tzinfo):
+        return timezone
+    if ZoneInfo is None:
+        raise ValueError("Named cron timezones require Python 3.9+ (zoneinfo)")
+    return ZoneInfo(timezone)
+
+@lru_cache(maxsize=4096)
+def parse_cron(expression: str, timezone: Union[str, tzinfo, None] = None) -> CronExpression:
+    """
+    Parse a cron expression once; repeated schedules share the result
+    """
+    return CronExpression(expression, timezone)
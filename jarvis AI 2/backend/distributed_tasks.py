@@ -0,0 +1,513 @@
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import redis.asyncio as aioredis
+
+from .config import Config
+from .metrics import TASK_RUNS, TASK_RUN_SECONDS
+from .task_history import ExecutionRecord
+from .task_manager import SmartTaskManager
+from .task_store import encode_schedule, decode_schedule
+
+# KEYS: definitions, schedule. ARGV: task id, definition, first fire time
+# ('' for none). A definition is only written, and its first run only
+# scheduled, by the first worker to register the id.
+ADD_SCRIPT = """
+if redis.call('HSETNX', KEYS[1], ARGV[1], ARGV[2]) == 0 then
+    return 0
+end
+if ARGV[3] ~= '' then
+    redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+end
+return 1
+"""
+
+# KEYS: leader, schedule, queue. ARGV: worker id, task id, fire time being
+# claimed, next fire time ('' to unschedule), run message. Fenced by the
+# leader lease and by the expected fire time, so a run is queued at most
+# once even if two workers briefly both believe they lead.
+CLAIM_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return -1
+end
+local score = redis.call('ZSCORE', KEYS[2], ARGV[2])
+if not score or tonumber(score) ~= tonumber(ARGV[3]) then
+    return 0
+end
+if ARGV[4] == '' then
+    redis.call('ZREM', KEYS[2], ARGV[2])
+else
+    redis.call('ZADD', KEYS[2], ARGV[4], ARGV[2])
+end
+redis.call('RPUSH', KEYS[3], ARGV[5])
+return 1
+"""
+
+# KEYS: leader. ARGV: worker id, lease in milliseconds
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# KEYS: leader. ARGV: worker id
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+class DistributedTaskManager(SmartTaskManager):
+    """
+    SmartTaskManager for several workers sharing one Redis.
+    
+    Task definitions live in a Redis hash and their next fire times in a
+    sorted set, so every worker sees the same tasks whichever one created
+    them. One worker at a time holds a leader lease (SET NX PX, renewed
+    every third of the lease). The leader claims due runs with a Lua
+    script that reschedules the task and pushes a run message onto a
+    shared list in one atomic step, pipelining all runs due at once.
+    Every worker, the leader included, pops run messages in batches of
+    up to its free concurrency and executes them, so each recurring run
+    fires once per interval across the cluster.
+    
+    Only tasks whose function is registered by name are distributed;
+    other callables are scheduled on this worker alone by the inherited
+    local loop. The client must decode responses
+    (decode_responses=True); tests can pass a
+    fakeredis.aioredis.FakeRedis sharing one FakeServer per cluster.
+    
+    A run is popped from the queue before it executes, so a worker dying
+    mid-run loses that run (at-most-once delivery). Runs are claimed when
+    due rather than when the previous run finishes, so a task running
+    longer than its interval can overlap with itself on another worker.
+    """
+    def __init__(
+        self,
+        redis: aioredis.Redis = None,
+        max_concurrency: int = None,
+        prefix: str = None,
+        lease: float = None,
+        poll_interval: float = None,
+        batch_size: int = None,
+        worker_id: str = None
+    ):
+        super().__init__(max_concurrency=max_concurrency)
+        self.redis = redis or aioredis.from_url(Config.REDIS_URL, decode_responses=True)
+        self.lease = lease or Config.TASK_LEADER_LEASE
+        self.poll_interval = poll_interval or Config.TASK_REDIS_POLL_INTERVAL
+        self.batch_size = batch_size or Config.TASK_QUEUE_BATCH_SIZE
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        
+        prefix = prefix or Config.TASK_REDIS_PREFIX
+        self.keys = {
+            name: f"{prefix}:{name}"
+            for name in ('definitions', 'schedule', 'queue', 'leader', 'failures', 'status')
+        }
+        self._add = self.redis.register_script(ADD_SCRIPT)
+        self._claim = self.redis.register_script(CLAIM_SCRIPT)
+        self._renew = self.redis.register_script(RENEW_SCRIPT)
+        self._release = self.redis.register_script(RELEASE_SCRIPT)
+        
+        self.is_leader = False
+        self.cluster_tasks = set()
+        self._dispatch_wakeup = None
+        self._writes: List[Callable] = []
+        self._write_task = None
+        self._workers = []
+        self._serving = False
+        
+        # Metrics
+        self.runs_dispatched = 0
+        self.runs_consumed = 0
+    
+    def add_task(
+        self,
+        name: str,
+        function: Callable = None,
+        schedule: Dict[str, Any] = None,
+        kwargs: Dict[str, Any] = None,
+        task_id: str = None
+    ) -> str:
+        """
+        Register a task cluster-wide; the Redis write is pipelined with
+        other pending writes (create_task waits for it).
+        
+        Re-adding an existing task_id keeps the cluster's schedule, so
+        every worker can register the same fixed-id task at startup.
+        """
+        if task_id is not None and task_id in self.tasks:
+            return task_id
+        
+        registered = self.registry.get(name)
+        if registered is None or (function is not None and function is not registered):
+            # Not resolvable by name on other workers
+            return super().add_task(name, function, schedule, kwargs, task_id)
+        
+        task_id = task_id or f"{name}_{uuid.uuid4().hex}"
+        schedule = schedule or {}
+        task = self._local_task(task_id, name, schedule, kwargs or {}, Config.TASK_RETRY_LIMIT)
+        self.tasks[task_id] = task
+        self.cluster_tasks.add(task_id)
+        if 'interval' in schedule or 'cron' in schedule:
+            self.recurring_tasks[task_id] = schedule.get('interval') or schedule['cron']
+        
+        first_run = self._next_run(schedule, None) if schedule else None
+        task['next_run'] = first_run
+        definition = json.dumps({
+            'id': task_id,
+            'name': name,
+            'schedule': encode_schedule(schedule),
+            'kwargs': task['kwargs'],
+            'created_at': time.time(),
+            'max_attempts': task['max_attempts'],
+        })
+        self._queue_write(lambda pipe: self._add(
+            keys=[self.keys['definitions'], self.keys['schedule']],
+            args=[task_id, definition, '' if first_run is None else repr(first_run)],
+            client=pipe
+        ))
+        return task_id
+    
+    async def create_task(
+        self,
+        name: str,
+        function: Callable = None,
+        schedule: Dict[str, Any] = None,
+        kwargs: Dict[str, Any] = None,
+        task_id: str = None
+    ):
+        task_id = self.add_task(name, function, schedule, kwargs, task_id)
+        await self.flush_writes()
+        return task_id
+    
+    def remove_task(self, task_id: str):
+        """
+        Remove a task; ids unknown to this worker may belong to a task
+        created by another one and are removed from Redis
+        """
+        if task_id in self.tasks and task_id not in self.cluster_tasks:
+            return super().remove_task(task_id)
+        task = self.tasks.pop(task_id, None)
+        if task is not None:
+            task['status'] = 'cancelled'
+        self.cluster_tasks.discard(task_id)
+        self.recurring_tasks.pop(task_id, None)
+        
+        async def remove(pipe):
+            pipe.hdel(self.keys['definitions'], task_id)
+            pipe.zrem(self.keys['schedule'], task_id)
+            pipe.hdel(self.keys['failures'], task_id)
+            pipe.hdel(self.keys['status'], task_id)
+        self._queue_write(remove)
+    
+    def _local_task(self, task_id: str, name: str, schedule: Dict, kwargs: Dict, max_attempts: int) -> Dict[str, Any]:
+        return {
+            'id': task_id,
+            'name': name,
+            'function': self.registry[name],
+            'kwargs': kwargs,
+            'created_at': datetime.now(),
+            'schedule': schedule,
+            'status': 'pending',
+            'attempts': 0,
+            'failures': 0,
+            'max_attempts': max_attempts,
+            'next_run': None,
+            'last_run': None
+        }
+    
+    def _queue_write(self, write: Callable):
+        self._writes.append(write)
+        self._ensure_started()
+        if self._loop is not None and (self._write_task is None or self._write_task.done()):
+            # One round trip for everything queued before the loop gets here
+            self._write_task = self._loop.create_task(self._flush_in_background())
+    
+    async def flush_writes(self):
+        """
+        Send all queued task writes in one pipeline
+        """
+        while self._writes:
+            writes, self._writes = self._writes, []
+            pipe = self.redis.pipeline(transaction=False)
+            for write in writes:
+                await write(pipe)
+            await pipe.execute()
+        if self._dispatch_wakeup is not None:
+            # New tasks may be due now
+            self._dispatch_wakeup.set()
+    
+    async def _flush_in_background(self):
+        try:
+            await self.flush_writes()
+        except Exception as e:
+            self.logger.error(f"Writing tasks to Redis failed: {e}")
+    
+    def start(self):
+        """
+        Start the local scheduler loop plus leader election, dispatching
+        and queue consumption on the running event loop
+        """
+        if self._runner is not None and not self._runner.done():
+            return
+        super().start()
+        self._serving = True
+        self._dispatch_wakeup = asyncio.Event()
+        self._workers = [
+            self._loop.create_task(self._lease_loop()),
+            self._loop.create_task(self._dispatch_loop()),
+            self._loop.create_task(self._consume_loop()),
+        ]
+        if self._writes:
+            self._write_task = self._loop.create_task(self._flush_in_background())
+    
+    async def stop(self):
+        """
+        Stop all loops, give up the lease and wait for running tasks
+        """
+        # wait_for can swallow a cancellation that races with a wake-up,
+        # so the loops also check this flag
+        self._serving = False
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        await super().stop()
+        
+        try:
+            await self.flush_writes()
+            if self.is_leader:
+                await self._release(keys=[self.keys['leader']], args=[self.worker_id])
+        except Exception as e:
+            self.logger.warning(f"Could not release task leadership cleanly: {e}")
+        self.is_leader = False
+    
+    async def _lease_loop(self):
+        lease_ms = int(self.lease * 1000)
+        while self._serving:
+            try:
+                if self.is_leader:
+                    if not await self._renew(keys=[self.keys['leader']], args=[self.worker_id, lease_ms]):
+                        self.is_leader = False
+                        self.logger.warning(f"Worker {self.worker_id} lost task leadership")
+                elif await self.redis.set(self.keys['leader'], self.worker_id, nx=True, px=lease_ms):
+                    self.is_leader = True
+                    self.logger.info(f"Worker {self.worker_id} is now the task leader")
+                    self._dispatch_wakeup.set()
+            except Exception as e:
+                # Without Redis the lease cannot be renewed; stepping down
+                # is safe because claims are fenced by the lease anyway
+                self.is_leader = False
+                self.logger.warning(f"Task leader election failed: {e}")
+            await asyncio.sleep(self.lease / 3)
+    
+    async def _dispatch_loop(self):
+        while self._serving:
+            delay = self.poll_interval
+            if self.is_leader:
+                try:
+                    delay = await self._dispatch_due()
+                except Exception as e:
+                    self.logger.warning(f"Dispatching due tasks failed: {e}")
+            
+            self._dispatch_wakeup.clear()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._dispatch_wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                # More runs are due; let other tasks in before the next batch
+                await asyncio.sleep(0)
+    
+    async def _dispatch_due(self) -> float:
+        """
+        Queue every due run once; returns how long to wait before the next
+        """
+        now = time.time()
+        due = await self.redis.zrangebyscore(
+            self.keys['schedule'], '-inf', now, start=0, num=self.batch_size, withscores=True
+        )
+        if due:
+            definitions = await self.redis.hmget(self.keys['definitions'], [task_id for task_id, _ in due])
+            pipe = self.redis.pipeline(transaction=False)
+            removed = []
+            for (task_id, fire_time), definition in zip(due, definitions):
+                if definition is None:
+                    # Removed while scheduled
+                    removed.append(task_id)
+                    continue
+                schedule = decode_schedule(json.loads(definition)['schedule'])
+                next_run = self._next_run(schedule, fire_time)
+                await self._claim(
+                    keys=[self.keys['leader'], self.keys['schedule'], self.keys['queue']],
+                    args=[
+                        self.worker_id, task_id, repr(fire_time),
+                        '' if next_run is None else repr(next_run),
+                        json.dumps({'id': task_id, 'fire_time': fire_time}),
+                    ],
+                    client=pipe
+                )
+            if removed:
+                pipe.zrem(self.keys['schedule'], *removed)
+            results = await pipe.execute()
+            if removed:
+                results.pop()
+            self.runs_dispatched += results.count(1)
+            if -1 in results:
+                self.is_leader = False
+                self.logger.warning(f"Worker {self.worker_id} lost task leadership while dispatching")
+                return self.poll_interval
+            if len(due) == self.batch_size:
+                return 0
+        
+        head = await self.redis.zrange(self.keys['schedule'], 0, 0, withscores=True)
+        if not head:
+            return self.poll_interval
+        # Poll even when idle so tasks added by other workers are noticed
+        return min(self.poll_interval, max(0.0, head[0][1] - time.time()))
+    
+    async def _consume_loop(self):
+        while self._serving:
+            # Only take work while a slot is free
+            await self._semaphore.acquire()
+            try:
+                popped = await self.redis.blpop(self.keys['queue'], timeout=self.poll_interval)
+                messages = [popped[1]] if popped else []
+                free = self.max_concurrency - len(self._running) - 1
+                if messages and free > 0:
+                    # Drain more runs in the same round trip
+                    messages += await self.redis.lpop(self.keys['queue'], min(free, self.batch_size - 1)) or []
+            except asyncio.CancelledError:
+                self._semaphore.release()
+                raise
+            except Exception as e:
+                self._semaphore.release()
+                self.logger.warning(f"Reading the task queue failed: {e}")
+                await asyncio.sleep(self.poll_interval)
+                continue
+            
+            if not messages:
+                self._semaphore.release()
+                continue
+            for index, message in enumerate(messages):
+                if index:
+                    await self._semaphore.acquire()
+                execution = self._loop.create_task(self._run_message(message))
+                self._running.add(execution)
+                execution.add_done_callback(self._running.discard)
+    
+    async def _definition(self, task_id: str) -> Optional[Dict[str, Any]]:
+        task = self.tasks.get(task_id)
+        if task is not None:
+            return task
+        
+        raw = await self.redis.hget(self.keys['definitions'], task_id)
+        if raw is None:
+            return None
+        definition = json.loads(raw)
+        if definition['name'] not in self.registry:
+            self.logger.warning(f"Skipping task {task_id}: no function registered as {definition['name']!r}")
+            return None
+        task = self._local_task(
+            task_id, definition['name'], decode_schedule(definition['schedule']),
+            definition['kwargs'], definition['max_attempts']
+        )
+        self.tasks[task_id] = task
+        self.cluster_tasks.add(task_id)
+        return task
+    
+    async def _run_message(self, message: str):
+        try:
+            run = json.loads(message)
+            task_id = run['id']
+            task = await self._definition(task_id)
+            if task is None:
+                return
+            self.runs_consumed += 1
+            
+            task['status'] = 'running'
+            task['attempts'] += 1
+            started_at = time.time()
+            task['last_run'] = started_at
+            started = time.perf_counter()
+            error = None
+            try:
+                await self._call(task['function'], task['kwargs'])
+                task['status'] = 'completed'
+            except Exception as e:
+                task['status'] = 'failed'
+                error = str(e)
+                self.logger.error(f"Task {task_id} failed: {e}")
+            duration = time.perf_counter() - started
+            self.task_history.append(ExecutionRecord(task_id, started_at, duration, task['status'], error))
+            TASK_RUNS.inc(task['status'])
+            TASK_RUN_SECONDS.observe(duration)
+            
+            await self._record_run(task, run['fire_time'], started_at, error)
+        except Exception as e:
+            self.logger.error(f"Task run {message} could not be processed: {e}")
+        finally:
+            self._semaphore.release()
+    
+    async def _record_run(self, task: Dict[str, Any], fire_time: float, started_at: float, error: Optional[str]):
+        task_id = task['id']
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(self.keys['status'], task_id, json.dumps({
+            'status': task['status'],
+            'fire_time': fire_time,
+            'last_run': started_at,
+            'worker': self.worker_id,
+            'error': error,
+        }))
+        if error is None:
+            pipe.hdel(self.keys['failures'], task_id)
+            await pipe.execute()
+            task['failures'] = 0
+            return
+        
+        pipe.hincrby(self.keys['failures'], task_id, 1)
+        failures = (await pipe.execute())[-1]
+        task['failures'] = failures
+        if failures >= task['max_attempts']:
+            # Stop scheduling a task that keeps failing
+            self.recurring_tasks.pop(task_id, None)
+            await self.redis.zrem(self.keys['schedule'], task_id)
+    
+    async def list_cluster_tasks(self) -> List[Dict[str, Any]]:
+        """
+        Every task in the cluster with its next fire time and last run
+        """
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hgetall(self.keys['definitions'])
+        pipe.zrange(self.keys['schedule'], 0, -1, withscores=True)
+        pipe.hgetall(self.keys['status'])
+        definitions, schedule, statuses = await pipe.execute()
+        next_runs = dict(schedule)
+        
+        tasks = []
+        for task_id, raw in definitions.items():
+            definition = json.loads(raw)
+            definition['next_run'] = next_runs.get(task_id)
+            definition.update(json.loads(statuses[task_id]) if task_id in statuses else {'status': 'pending'})
+            tasks.append(definition)
+        return tasks
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            'coordination': 'redis',
+            'worker_id': self.worker_id,
+            'leader': self.is_leader,
+            'runs_dispatched': self.runs_dispatched,
+            'runs_consumed': self.runs_consumed,
+        }
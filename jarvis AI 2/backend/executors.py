@@ -0,0 +1,87 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Dict
+
+from .config import Config
+
+def call_engine(method: str, *args) -> Any:
+    """
+    Invoke an AdvancedNLPEngine method on this process's engine singleton.
+    
+    Module-level so it can be pickled into the CPU process pool; each
+    worker process lazily loads only the models its calls touch.
+    """
+    from .nlp_engine import nlp_engine
+    return getattr(nlp_engine, method)(*args)
+
+class ExecutionLayer:
+    """
+    Bounded pools that keep blocking work off the event loop.
+    
+    io:    threads for blocking I/O (sync clients, file access)
+    cpu:   threads for in-process CPU work on unpicklable objects such as
+           spaCy docs; torch and spaCy release the GIL in their kernels
+    procs: optional process pool for picklable model inference calls
+    """
+    def __init__(
+        self,
+        io_workers: int = None,
+        cpu_threads: int = None,
+        cpu_processes: int = None
+    ):
+        self.io_workers = io_workers or Config.IO_THREAD_POOL_SIZE
+        self.cpu_threads = cpu_threads or Config.CPU_THREAD_POOL_SIZE
+        self.cpu_processes = Config.CPU_PROCESS_POOL_SIZE if cpu_processes is None else cpu_processes
+        
+        self.io_pool = ThreadPoolExecutor(self.io_workers, thread_name_prefix='jarvis-io')
+        self.cpu_pool = ThreadPoolExecutor(self.cpu_threads, thread_name_prefix='jarvis-cpu')
+        self.process_pool = (
+            ProcessPoolExecutor(self.cpu_processes) if self.cpu_processes > 0 else None
+        )
+    
+    def install(self, loop: asyncio.AbstractEventLoop = None):
+        """
+        Make the bounded I/O pool the loop's default executor
+        """
+        (loop or asyncio.get_event_loop()).set_default_executor(self.io_pool)
+    
+    async def _run(self, executor, fn: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        if kwargs:
+            fn = functools.partial(fn, **kwargs)
+        if executor is not self.process_pool:
+            # Threads see the caller's context variables (request traces)
+            fn = functools.partial(contextvars.copy_context().run, fn)
+        return await loop.run_in_executor(executor, fn, *args)
+    
+    async def run_io(self, fn: Callable, *args, **kwargs) -> Any:
+        return await self._run(self.io_pool, fn, *args, **kwargs)
+    
+    async def run_local(self, fn: Callable, *args, **kwargs) -> Any:
+        return await self._run(self.cpu_pool, fn, *args, **kwargs)
+    
+    async def run_cpu(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run CPU-bound work in the process pool when one is configured,
+        otherwise on the CPU thread pool. fn and its arguments must be
+        picklable in process mode.
+        """
+        return await self._run(self.process_pool or self.cpu_pool, fn, *args, **kwargs)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'io_workers': self.io_workers,
+            'cpu_threads': self.cpu_threads,
+            'cpu_processes': self.cpu_processes,
+        }
+    
+    def shutdown(self, wait: bool = True):
+        self.io_pool.shutdown(wait=wait)
+        self.cpu_pool.shutdown(wait=wait)
+        if self.process_pool is not None:
+            self.process_pool.shutdown(wait=wait)
+
+# Shared execution layer
+execution_layer = ExecutionLayer()
@@ -0,0 +1,294 @@
+"""
+Inference backends for the transformer models in AdvancedNLPEngine.
+
+torch:     the eager fp32 model as loaded
+quantized: int8 dynamic quantization of the Linear layers
+onnx:      a graph exported once to ONNX_CACHE_DIRECTORY and run with
+           ONNX Runtime; the export is checked against the eager model
+           before it is cached
+
+Prebuild the ONNX cache (for example in an image build) with
+    python -m backend.inference_backends --models qa_model sentiment ner
+"""
+import argparse
+import hashlib
+import inspect
+import logging
+import os
+import re
+from typing import Dict, List
+
+from .config import Config
+
+logger = logging.getLogger('InferenceBackends')
+
+BACKENDS = ('torch', 'quantized', 'onnx')
+
+# Output tensors per task, in the order the exported graph returns them,
+# with their dynamic axes
+TASK_OUTPUTS = {
+    'question-answering': {
+        'start_logits': {0: 'batch', 1: 'sequence'},
+        'end_logits': {0: 'batch', 1: 'sequence'},
+    },
+    'sentiment-analysis': {'logits': {0: 'batch'}},
+    'ner': {'logits': {0: 'batch', 1: 'sequence'}},
+}
+
+MODEL_INPUTS = ('input_ids', 'attention_mask', 'token_type_ids')
+
+ONNX_OPSET = 14
+
+# Inputs used for export tracing, parity checks and the benchmark
+SAMPLE_TEXTS = [
+    "Schedule a backup of my documents every night at two.",
+    "What is the weather like in Paris today?",
+    "Open the browser and restart the deployment server.",
+    "Thanks, I really enjoyed talking with you about Ada Lovelace!",
+]
+
+SAMPLE_QA = [
+    (
+        "The Eiffel Tower was completed in 1889 for the World's Fair in Paris. "
+        "It was designed by the engineering company of Gustave Eiffel.",
+        "When was the Eiffel Tower completed?"
+    ),
+    (
+        "Python was created by Guido van Rossum and first released in 1991. "
+        "Its design philosophy emphasizes code readability.",
+        "Who created Python?"
+    ),
+    (
+        "The backup job copies the documents folder to the network drive every "
+        "night and keeps the last fourteen snapshots.",
+        "How many snapshots are kept?"
+    ),
+]
+
+def encode_samples(tokenizer, task: str, count: int = None):
+    """
+    Tokenize the sample inputs for a task as one padded batch
+    """
+    if task == 'question-answering':
+        pairs = SAMPLE_QA[:count]
+        return tokenizer(
+            [question for _, question in pairs], [context for context, _ in pairs],
+            padding=True, truncation='only_second', return_tensors='pt'
+        )
+    return tokenizer(SAMPLE_TEXTS[:count], padding=True, truncation=True, return_tensors='pt')
+
+class OnnxOutputs(dict):
+    """
+    Named output tensors readable by key, attribute or position, like the
+    ModelOutput objects transformers models return
+    """
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return list(self.values())[key]
+        return super().__getitem__(key)
+    
+    def __getattr__(self, name: str):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+    
+    def to_tuple(self) -> tuple:
+        return tuple(self.values())
+
+class OnnxModel:
+    """
+    ONNX Runtime session with the calling convention of a transformers
+    model: keyword tensors in, named logits out. Drops into the engine
+    and into pipelines in place of the torch model.
+    """
+    def __init__(self, path: str, config, output_names: List[str], threads: int = None):
+        import onnxruntime
+        import torch
+        
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = Config.ONNX_INTRA_OP_THREADS if threads is None else threads
+        if threads:
+            options.intra_op_num_threads = threads
+        
+        self.path = path
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_names = [node.name for node in self.session.get_inputs()]
+        self.output_names = list(output_names)
+        self.config = config
+        self.name_or_path = getattr(config, '_name_or_path', path)
+        self.device = torch.device('cpu')
+        self.dtype = torch.float32
+    
+    def forward(self, input_ids=None, attention_mask=None, token_type_ids=None, **kwargs) -> OnnxOutputs:
+        import torch
+        
+        inputs = {
+            'input_ids': input_ids,
+            'attention_mask': attention_mask,
+            'token_type_ids': token_type_ids,
+        }
+        feed = {name: inputs[name].cpu().numpy() for name in self.input_names}
+        outputs = self.session.run(self.output_names, feed)
+        return OnnxOutputs(zip(self.output_names, map(torch.from_numpy, outputs)))
+    
+    def __call__(self, **inputs) -> OnnxOutputs:
+        return self.forward(**inputs)
+    
+    # No-ops so code written for nn.Module keeps working
+    def eval(self) -> 'OnnxModel':
+        return self
+    
+    def to(self, *args, **kwargs) -> 'OnnxModel':
+        return self
+
+def quantize_model(model):
+    """
+    int8 dynamic quantization of every Linear layer; weights are
+    quantized once, activations per batch at run time
+    """
+    import torch
+    
+    model.eval()
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def parity_report(reference, candidate, encoded, output_names: List[str]) -> Dict[str, float]:
+    """
+    Compare a candidate backend against the eager model on the same inputs.
+    
+    max_abs_diff is the largest logit difference across all outputs;
+    agreement is the fraction of argmax predictions (class, token label
+    or span boundary) that match.
+    """
+    import torch
+    
+    with torch.no_grad():
+        expected = reference(**encoded)
+        actual = candidate(**encoded)
+    
+    max_abs_diff = 0.0
+    matches = total = 0
+    for name in output_names:
+        max_abs_diff = max(max_abs_diff, float((expected[name] - actual[name]).abs().max()))
+        agree = expected[name].argmax(-1) == actual[name].argmax(-1)
+        matches += int(agree.sum())
+        total += agree.numel()
+    
+    return {'max_abs_diff': max_abs_diff, 'agreement': matches / total}
+
+def onnx_cache_path(model, task: str) -> str:
+    """
+    Cache location keyed by model, task and the exporting library versions
+    """
+    import torch
+    import transformers
+    
+    name = getattr(model.config, '_name_or_path', '') or type(model).__name__
+    fingerprint = hashlib.sha1(
+        f"{name}|{task}|{torch.__version__}|{transformers.__version__}|{ONNX_OPSET}".encode()
+    ).hexdigest()[:12]
+    slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', name).strip('_')
+    return os.path.join(Config.ONNX_CACHE_DIRECTORY, f"{slug}-{task}-{fingerprint}.onnx")
+
+def export_onnx(model, tokenizer, task: str) -> str:
+    """
+    Export a model to ONNX once and return the cached file path.
+    
+    The graph is written to a temporary file and only moved into the
+    cache after it matches the eager model within ONNX_PARITY_TOLERANCE.
+    """
+    import torch
+    
+    path = onnx_cache_path(model, task)
+    if os.path.exists(path):
+        return path
+    
+    output_names = list(TASK_OUTPUTS[task])
+    encoded = encode_samples(tokenizer, task)
+    input_names = [name for name in MODEL_INPUTS if name in encoded]
+    
+    class ExportWrapper(torch.nn.Module):
+        # Positional tensors in, a tuple of the task's outputs out
+        def __init__(self):
+            super().__init__()
+            self.model = model
+        
+        def forward(self, *tensors):
+            outputs = self.model(**dict(zip(input_names, tensors)))
+            return tuple(outputs[name] for name in output_names)
+    
+    # Use the TorchScript exporter, which honours dynamic_axes; newer torch
+    # releases default to the dynamo-based one
+    export_options = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+    
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial_path = f"{path}.{os.getpid()}.partial"
+    logger.info(f"Exporting {task} model to {path}")
+    # The exporter restores the wrapper's training flag afterwards, so it
+    # has to start (and leave the model) in eval mode
+    with torch.no_grad():
+        torch.onnx.export(
+            ExportWrapper().eval(),
+            tuple(encoded[name] for name in input_names),
+            partial_path,
+            input_names=input_names,
+            output_names=output_names,
+            dynamic_axes={
+                **{name: {0: 'batch', 1: 'sequence'} for name in input_names},
+                **TASK_OUTPUTS[task],
+            },
+            opset_version=ONNX_OPSET,
+            **export_options
+        )
+    
+    try:
+        report = parity_report(model, OnnxModel(partial_path, model.config, output_names), encoded, output_names)
+        if report['max_abs_diff'] > Config.ONNX_PARITY_TOLERANCE:
+            raise RuntimeError(
+                f"ONNX export of {task} model differs from eager by {report['max_abs_diff']:.2e}"
+            )
+        os.replace(partial_path, path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    
+    logger.info(f"Exported {task} model (max abs diff {report['max_abs_diff']:.2e})")
+    return path
+
+def prepare_model(model, tokenizer, task: str, backend: str = None):
+    """
+    Convert a freshly loaded eager model to the configured backend
+    """
+    backend = backend or Config.NLP_INFERENCE_BACKEND
+    if backend == 'torch':
+        return model.eval()
+    if backend == 'quantized':
+        return quantize_model(model)
+    if backend == 'onnx':
+        return OnnxModel(export_onnx(model, tokenizer, task), model.config, list(TASK_OUTPUTS[task]))
+    raise ValueError(f"Unknown inference backend: {backend} (expected one of {', '.join(BACKENDS)})")
+
+def prepare_pipeline(pipe, task: str, backend: str = None):
+    """
+    Swap a transformers pipeline's model for the configured backend
+    """
+    pipe.model = prepare_model(pipe.model, pipe.tokenizer, task, backend)
+    return pipe
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and verify ONNX models ahead of time")
+    parser.add_argument('--models', nargs='+', default=['qa_model', 'sentiment', 'ner'])
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    Config.NLP_INFERENCE_BACKEND = 'onnx'
+    
+    from .nlp_engine import AdvancedNLPEngine
+    engine = AdvancedNLPEngine(preload=[])
+    for name in args.models:
+        engine.get_model(name)
+        print(f"{name}: cached in {Config.ONNX_CACHE_DIRECTORY}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+import asyncio
+import functools
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List
+
+from .config import Config
+from .executors import execution_layer, call_engine
+from .metrics import stage
+
+class MicroBatcher:
+    """
+    Gather concurrent single-item requests into one batch call.
+    
+    A batch is dispatched when it reaches max_batch_size or when the
+    oldest pending request has waited window_ms, whichever comes first.
+    batch_fn is a blocking callable taking a list of items and returning
+    a list of results in the same order; runner decides where it executes
+    (by default the execution layer's CPU pool).
+    """
+    def __init__(
+        self,
+        name: str,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = None,
+        window_ms: float = None,
+        runner: Callable[..., Awaitable[Any]] = None
+    ):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.runner = runner or execution_layer.run_cpu
+        self.max_batch_size = max_batch_size or Config.INFERENCE_MAX_BATCH_SIZE
+        self.window = (Config.INFERENCE_BATCH_WINDOW_MS if window_ms is None else window_ms) / 1000
+        
+        self._pending = []
+        self._timer = None
+        self._inflight = set()
+        
+        # Metrics
+        self.batch_sizes = Counter()
+        self.items_processed = 0
+        self.batch_errors = 0
+    
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue one item and wait for its result
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        
+        # Queueing plus the shared batch, as seen by this request
+        with stage(f'{self.name}_batched'):
+            return await future
+    
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+    
+    async def _run_batch(self, batch: list):
+        items = [item for item, _ in batch]
+        self.batch_sizes[len(items)] += 1
+        self.items_processed += len(items)
+        
+        try:
+            results = await self.runner(self.batch_fn, items)
+        except Exception as e:
+            self.batch_errors += 1
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), result in zip(batch, results):
+            # The awaiting coroutine may have been cancelled meanwhile
+            if not future.done():
+                future.set_result(result)
+    
+    def stats(self) -> Dict[str, Any]:
+        batches = sum(self.batch_sizes.values())
+        return {
+            'batches': batches,
+            'items': self.items_processed,
+            'errors': self.batch_errors,
+            'mean_batch_size': self.items_processed / batches if batches else 0.0,
+            'batch_size_distribution': dict(sorted(self.batch_sizes.items())),
+        }
+
+class InferenceScheduler:
+    """
+    Async front end for AdvancedNLPEngine that micro-batches sentiment,
+    NER and question answering requests.
+    
+    With forward=True (the default when USE_MODEL_SERVER is set) each
+    request is sent to the model server as a single call instead, so the
+    server's batchers see every worker's items and can combine them.
+    Batching here as well would only send pre-built batches that the
+    server runs as they arrive.
+    """
+    BATCH_METHODS = {
+        'sentiment': 'analyze_sentiment_batch',
+        'ner': 'extract_ner_batch',
+        'qa': 'answer_spans_batch',
+    }
+    
+    def __init__(self, forward: bool = None):
+        self.forward = Config.USE_MODEL_SERVER if forward is None else forward
+        # Batches call the engine by method name so they can run in the
+        # CPU process pool as well as in-process
+        self.batchers = {
+            name: MicroBatcher(name, functools.partial(call_engine, method))
+            for name, method in self.BATCH_METHODS.items()
+        }
+    
+    async def _forward(self, method: str, *args) -> Any:
+        # Blocking socket call, one I/O thread per request in flight
+        return await execution_layer.run_io(call_engine, method, *args)
+    
+    async def analyze_sentiment(self, text: str) -> Dict[str, float]:
+        if self.forward:
+            return await self._forward('analyze_sentiment', text)
+        return await self.batchers['sentiment'].submit(text)
+    
+    async def extract_ner(self, text: str) -> List[Dict[str, Any]]:
+        if self.forward:
+            return await self._forward('extract_ner', text)
+        return await self.batchers['ner'].submit(text)
+    
+    async def answer_question(self, context: str, question: str) -> str:
+        return (await self.find_answer(context, question))['answer']
+    
+    async def find_answer(self, context: str, question: str) -> Dict[str, Any]:
+        if self.forward:
+            return await self._forward('find_answer', context, question)
+        return await self.batchers['qa'].submit((context, question))
+    
+    def stats(self) -> Dict[str, Any]:
+        return {name: batcher.stats() for name, batcher in self.batchers.items()}
+
+# Singleton scheduler bound to the global engine
+inference_scheduler = InferenceScheduler()
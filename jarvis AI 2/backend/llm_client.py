@@ -0,0 +1,83 @@
+import json
+import time
+import httpx
+from typing import Any, AsyncIterator, Dict, List
+
+from .config import Config
+from .metrics import observe_stage, stage
+
+class LLMClient:
+    """
+    Async chat-completion client over a pooled keep-alive HTTP connection
+    """
+    def __init__(
+        self,
+        api_key: str = None,
+        base_url: str = None,
+        model: str = None,
+        timeout: float = None
+    ):
+        self.api_key = api_key or Config.OPENAI_API_KEY
+        self.base_url = base_url or Config.OPENAI_API_BASE
+        self.model = model or Config.LANGUAGE_MODEL
+        self.timeout = timeout or Config.LLM_TIMEOUT
+        self._client = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Created on first use so the connection pool binds to the running loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={'Authorization': f"Bearer {self.api_key}"},
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=Config.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=Config.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                ),
+            )
+        return self._client
+    
+    async def chat(self, messages: List[Dict[str, str]], **params: Any) -> str:
+        """
+        Run a chat completion and return the assistant message content
+        """
+        payload = {'model': self.model, 'messages': messages, **params}
+        with stage('llm'):
+            response = await self.client.post('/chat/completions', json=payload)
+            response.raise_for_status()
+            return response.json()['choices'][0]['message']['content']
+    
+    async def stream_chat(self, messages: List[Dict[str, str]], **params: Any) -> AsyncIterator[str]:
+        """
+        Run a streaming chat completion, yielding content deltas as the
+        server-sent events arrive
+        """
+        payload = {'model': self.model, 'messages': messages, 'stream': True, **params}
+        started = time.perf_counter()
+        first_token = True
+        try:
+            async with self.client.stream('POST', '/chat/completions', json=payload) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith('data:'):
+                        continue
+                    data = line[len('data:'):].strip()
+                    if data == '[DONE]':
+                        break
+                    delta = json.loads(data)['choices'][0].get('delta', {})
+                    if delta.get('content'):
+                        if first_token:
+                            observe_stage('llm_first_token', time.perf_counter() - started, started)
+                            first_token = False
+                        yield delta['content']
+        finally:
+            observe_stage('llm_stream', time.perf_counter() - started, started)
+    
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+# Shared client for the whole worker
+llm_client = LLMClient()
@@ -0,0 +1,279 @@
+import glob
+import json
+import logging
+import logging.config
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import Counter, deque
+from typing import Any, Dict
+
+from .config import Config
+
+# Attributes every LogRecord has; anything else was passed with extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+# json.dumps builds a new encoder per call when given options
+_encoder = json.JSONEncoder(default=str, separators=(',', ':'))
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per record: UTC time, level, logger, message, any
+    extra= fields and the formatted exception
+    """
+    def __init__(self):
+        super().__init__()
+        # Records arrive in bursts within the same second
+        self._second = None
+        self._second_text = ''
+    
+    def _timestamp(self, created: float) -> str:
+        second = int(created)
+        if second != self._second:
+            self._second = second
+            self._second_text = time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(second))
+        return f"{self._second_text}.{int((created - second) * 1000):03d}Z"
+    
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': self._timestamp(record.created),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        for key in record.__dict__.keys() - _RECORD_ATTRIBUTES:
+            if not key.startswith('_'):
+                entry[key] = record.__dict__[key]
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return _encoder.encode(entry)
+
+class RotatingFile:
+    """
+    Append-only log file rolled over by size and by age.
+    
+    Rotated files are renamed with a timestamp suffix and only the newest
+    backup_count are kept. Size is checked before each batch, so a file
+    can exceed max_bytes by at most one batch.
+    """
+    def __init__(self, path: str, max_bytes: int, rotate_interval: float, backup_count: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.rotations = 0
+        
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._open()
+    
+    def _open(self):
+        self._file = open(self.path, 'ab')
+        self.size = self._file.tell()
+        self._rotate_at = time.time() + self.rotate_interval if self.rotate_interval > 0 else float('inf')
+    
+    def write(self, data: bytes):
+        if self.size and (
+            (self.max_bytes and self.size + len(data) > self.max_bytes) or time.time() >= self._rotate_at
+        ):
+            self.rotate()
+        self._file.write(data)
+        self._file.flush()
+        self.size += len(data)
+    
+    def rotate(self):
+        self._file.close()
+        target = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}"
+        suffix = 1
+        while os.path.exists(target):
+            target = f"{self.path}.{time.strftime('%Y%m%d-%H%M%S')}.{suffix}"
+            suffix += 1
+        os.replace(self.path, target)
+        self.rotations += 1
+        
+        backups = sorted(glob.glob(glob.escape(self.path) + '.*'), key=os.path.getmtime)
+        for old in backups[:max(0, len(backups) - self.backup_count)]:
+            os.remove(old)
+        self._open()
+    
+    def close(self):
+        self._file.close()
+
+class QueuedJSONHandler(logging.Handler):
+    """
+    Logging handler that never touches the disk on the calling thread.
+    
+    emit() only copies the record onto a bounded in-memory queue. A
+    background thread formats queued records as JSON lines and writes
+    them in batches of up to batch_size (or every flush_interval) to a
+    RotatingFile.
+    
+    Under backpressure nothing blocks. Once the queue is 80% full,
+    records below drop_level are dropped so the remaining space is kept
+    for warnings and errors. A full queue drops everything. Drops are
+    counted per level in stats().
+    """
+    def __init__(
+        self,
+        filename: str = None,
+        queue_size: int = None,
+        batch_size: int = None,
+        flush_interval: float = None,
+        max_bytes: int = None,
+        rotate_interval: float = None,
+        backup_count: int = None,
+        drop_level: str = None,
+        level=logging.NOTSET
+    ):
+        super().__init__(level)
+        self.setFormatter(JSONFormatter())
+        self.queue_size = queue_size or Config.LOG_QUEUE_SIZE
+        self.batch_size = batch_size or Config.LOG_BATCH_SIZE
+        self.flush_interval = flush_interval or Config.LOG_FLUSH_INTERVAL
+        self.drop_level = logging.getLevelName(drop_level or Config.LOG_DROP_LEVEL)
+        self.shed_depth = int(self.queue_size * 0.8)
+        
+        self._file = RotatingFile(
+            filename or Config.LOG_FILE,
+            Config.LOG_MAX_BYTES if max_bytes is None else max_bytes,
+            Config.LOG_ROTATE_INTERVAL if rotate_interval is None else rotate_interval,
+            Config.LOG_BACKUP_COUNT if backup_count is None else backup_count
+        )
+        # deque appends and pops are atomic, so producers never take a lock
+        self._queue = deque()
+        self._ready = threading.Event()
+        self._write_lock = threading.Lock()
+        self._drop_lock = threading.Lock()
+        self._closed = False
+        
+        # Metrics
+        self.dropped = Counter()
+        self.written = 0
+        self.batches = 0
+        self.write_errors = 0
+        
+        self._writer = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._writer.start()
+        _handlers.add(self)
+    
+    def handle(self, record: logging.LogRecord) -> bool:
+        # Handler.handle would serialize every caller on the handler lock
+        accepted = self.filter(record)
+        if accepted:
+            self.emit(record)
+        return bool(accepted)
+    
+    def emit(self, record: logging.LogRecord):
+        depth = len(self._queue)
+        if self._closed or (
+            depth >= self.shed_depth and (record.levelno < self.drop_level or depth >= self.queue_size)
+        ):
+            with self._drop_lock:
+                self.dropped[record.levelname] += 1
+            return
+        
+        try:
+            self._queue.append(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+            return
+        if depth + 1 >= self.batch_size:
+            self._ready.set()
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Fix a record's contents for the writer thread: merge the arguments
+        and render the traceback now, while they still describe this call.
+        
+        The record is updated in place rather than copied. Other handlers
+        format it the same way, since getMessage() of a merged message
+        without arguments returns it unchanged and formatters reuse exc_text.
+        """
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatter.formatException(record.exc_info)
+        return record
+    
+    def _run(self):
+        while not self._closed:
+            self._ready.wait(self.flush_interval)
+            self._ready.clear()
+            self._drain()
+    
+    def _drain(self):
+        with self._write_lock:
+            while self._queue:
+                batch = []
+                try:
+                    for _ in range(self.batch_size):
+                        batch.append(self._queue.popleft())
+                except IndexError:
+                    pass
+                
+                lines = []
+                for record in batch:
+                    try:
+                        lines.append(self.format(record))
+                    except Exception:
+                        self.handleError(record)
+                try:
+                    self._file.write(('\n'.join(lines) + '\n').encode('utf-8'))
+                except Exception as e:
+                    self.write_errors += 1
+                    print(f"Writing {len(lines)} log records failed: {e}", file=sys.stderr)
+                    continue
+                self.written += len(lines)
+                self.batches += 1
+    
+    def flush(self):
+        """
+        Write everything queued so far before returning
+        """
+        self._drain()
+    
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._ready.set()
+            self._writer.join(timeout=5)
+            self._drain()
+            self._file.close()
+            _handlers.discard(self)
+        super().close()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queued': len(self._queue),
+            'written': self.written,
+            'batches': self.batches,
+            'rotations': self._file.rotations,
+            'write_errors': self.write_errors,
+            'dropped': dict(self.dropped),
+        }
+
+_handlers = weakref.WeakSet()
+
+def log_stats() -> Dict[str, Any]:
+    """
+    Combined stats of the queued handlers in this process
+    """
+    totals = {'queued': 0, 'written': 0, 'batches': 0, 'rotations': 0, 'write_errors': 0, 'dropped': Counter()}
+    for handler in list(_handlers):
+        for key, value in handler.stats().items():
+            totals[key] += Counter(value) if key == 'dropped' else value
+    totals['dropped'] = dict(totals['dropped'])
+    return totals
+
+def configure_logging():
+    """
+    Apply Config.LOGGING_CONFIG to this process
+    """
+    logging.config.dictConfig(Config.LOGGING_CONFIG)
@@ -1,140 +1,605 @@
 import os
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-import speech_recognition as sr
-import pyttsx3
-import openai
 import uvicorn
 import asyncio
+import json
+import logging
+import math
+import time
+import uuid
+from contextlib import asynccontextmanager
 from datetime import timedelta
+from typing import AsyncIterator, Dict, List, Optional
 
 # Import new advanced modules
-from .nlp_engine import nlp_engine
+from .nlp_engine import nlp_engine, QueryAnalysis
+from .inference_scheduler import inference_scheduler
+from .executors import execution_layer
+from .llm_client import llm_client
+from .response_cache import response_cache
+from .bulk_analysis import spool_body, stream_analysis
 from .task_manager import task_manager
 from .task_automation import TaskAutomator
+from .multiplexer import ConnectionMultiplexer
+from .admission import AdmissionRejected, DeadlineExceeded, admission_controller
+from .metrics import INTENTS, REQUEST_SECONDS, loop_lag_monitor, observe_stage, registry, stage, trace
+from .log_writer import configure_logging, log_stats
+from .voice import EnergyVAD, speech_recognizer, speech_synthesizer
 from .config import Config
 
-# Configuration and Environment Setup
-openai.api_key = Config.OPENAI_API_KEY
-
 class AIAssistant:
     def __init__(self):
         # Speech Recognition
-        self.recognizer = sr.Recognizer()
+        self.recognizer = speech_recognizer
         
-        # Text-to-Speech
-        self.engine = pyttsx3.init()
+        # Text-to-Speech (cached on disk, synthesized off the event loop)
+        self.synthesizer = speech_synthesizer
         
         # Task Automation
         self.task_automator = TaskAutomator()
     
-    async def process_query(self, query: str) -> str:
+    async def analyze_query(self, query: str) -> tuple:
         """
-        Advanced query processing with intent classification
+        Parse the query and determine its primary intent
         """
-        # Analyze intent
-        intents = nlp_engine.intent_classification(query)
+        # Parse once; every handler reuses the same analysis. The parse runs
+        # on the CPU pool so the event loop keeps serving other sockets.
+        analysis = nlp_engine.analyze(query)
+        primary_intent = await execution_layer.run_local(lambda: analysis.primary_intent)
         
-        # Determine primary intent
-        primary_intent = max(intents, key=intents.get)
+        return analysis, primary_intent
+    
+    async def process_query(self, query: str, deadline: float = None) -> str:
+        """
+        Advanced query processing with intent classification. Handling is
+        admitted by intent class and bounded by the deadline (seconds).
+        """
+        started = time.perf_counter()
+        with stage('analyze'):
+            analysis, primary_intent = await self.analyze_query(query)
         
+        async with self.admitted(primary_intent, deadline, started) as ticket:
+            return await ticket.run(self.dispatch(query, analysis, primary_intent))
+    
+    @asynccontextmanager
+    async def admitted(self, primary_intent: str, deadline: float, started: float):
+        """
+        Admission for one query, recording its intent, queueing time and
+        end-to-end latency by outcome
+        """
+        INTENTS.inc(primary_intent)
+        outcome = 'error'
+        try:
+            async with admission_controller.admit(primary_intent, deadline) as ticket:
+                observe_stage('admission_wait', ticket.queued)
+                yield ticket
+            outcome = 'ok'
+        except AdmissionRejected:
+            outcome = 'busy'
+            raise
+        except DeadlineExceeded:
+            outcome = 'deadline'
+            raise
+        except asyncio.CancelledError:
+            outcome = 'cancelled'
+            raise
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - started, primary_intent, outcome)
+    
+    async def dispatch(self, query: str, analysis: QueryAnalysis, primary_intent: str) -> str:
         # Process based on intent
         if primary_intent == 'task_automation':
-            return await self.handle_task_automation(query)
+            return await self.handle_task_automation(query, analysis)
         
         elif primary_intent == 'information_retrieval':
-            return await self.handle_information_query(query)
+            return await self.handle_information_query(query, analysis)
         
         elif primary_intent == 'system_control':
-            return await self.handle_system_control(query)
+            return await self.handle_system_control(query, analysis)
         
         else:
-            return await self.handle_general_conversation(query)
+            return await self.handle_general_conversation(query, analysis)
     
-    async def handle_task_automation(self, query: str) -> str:
+    async def process_query_stream(
+        self,
+        query: str,
+        deadline: float = None
+    ) -> AsyncIterator[str]:
         """
-        Handle task automation requests
+        Like process_query, but yield LLM responses chunk by chunk as they
+        arrive. Intents answered without the LLM yield a single chunk.
         """
-        # Extract task details using NLP
-        entities = nlp_engine.extract_entities(query)
+        started = time.perf_counter()
+        with stage('analyze'):
+            analysis, primary_intent = await self.analyze_query(query)
         
-        # Create and schedule task
-        async def example_task():
-            print(f"Executing automated task for: {query}")
+        # The slot is held until the last chunk has been relayed
+        async with self.admitted(primary_intent, deadline, started) as ticket:
+            async for chunk in ticket.stream(self.dispatch_stream(query, analysis, primary_intent)):
+                yield chunk
+    
+    async def dispatch_stream(self, query: str, analysis: QueryAnalysis, primary_intent: str) -> AsyncIterator[str]:
+        if primary_intent == 'information_retrieval':
+            cached = self.cached_answer(query, analysis)
+            if cached is not None:
+                yield cached
+                return
+            
+            chunks = []
+            async for chunk in llm_client.stream_chat(self.information_messages(query)):
+                chunks.append(chunk)
+                yield chunk
+            self.cache_answer(query, analysis, ''.join(chunks))
+            return
+        elif primary_intent == 'general_conversation':
+            messages = await self.conversation_messages(query, analysis)
+        elif primary_intent == 'task_automation':
+            yield await self.handle_task_automation(query, analysis)
+            return
+        else:
+            yield await self.handle_system_control(query, analysis)
+            return
         
+        async for chunk in llm_client.stream_chat(messages):
+            yield chunk
+    
+    async def handle_task_automation(self, query: str, analysis: QueryAnalysis = None) -> str:
+        """
+        Handle task automation requests
+        """
+        # Create and schedule task
         task_id = await task_manager.create_task(
             name="user_requested_task",
-            function=example_task,
-            schedule={'interval': timedelta(hours=1)}
+            schedule={'interval': timedelta(hours=1)},
+            kwargs={'query': query}
         )
         
         return f"Task created with ID: {task_id}"
     
-    async def handle_information_query(self, query: str) -> str:
+    async def handle_information_query(self, query: str, analysis: QueryAnalysis = None) -> str:
         """
         Handle information retrieval queries
         """
+        cached = self.cached_answer(query, analysis)
+        if cached is not None:
+            return cached
+        
         # Use OpenAI for complex queries
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful AI assistant."},
-                {"role": "user", "content": query}
-            ]
-        )
-        return response.choices[0].message.content
+        response = await llm_client.chat(self.information_messages(query))
+        self.cache_answer(query, analysis, response)
+        return response
     
-    async def handle_system_control(self, query: str) -> str:
+    def cached_answer(self, query: str, analysis: QueryAnalysis = None) -> Optional[str]:
+        """
+        Look up an exact or near-duplicate earlier answer
+        """
+        if not Config.RESPONSE_CACHE_ENABLED:
+            return None
+        vector = analysis.vector if analysis is not None else None
+        return response_cache.get(query, vector)
+    
+    def cache_answer(self, query: str, analysis: QueryAnalysis, response: str):
+        if Config.RESPONSE_CACHE_ENABLED and response:
+            vector = analysis.vector if analysis is not None else None
+            response_cache.put(query, response, vector)
+    
+    def information_messages(self, query: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": "You are a helpful AI assistant."},
+            {"role": "user", "content": query}
+        ]
+    
+    async def handle_system_control(self, query: str, analysis: QueryAnalysis = None) -> str:
         """
         Handle system control commands
         """
         # Implement system control logic
         return "System control command processed"
     
-    async def handle_general_conversation(self, query: str) -> str:
+    async def handle_general_conversation(self, query: str, analysis: QueryAnalysis = None) -> str:
         """
         Handle general conversation
         """
-        # Sentiment analysis
-        sentiment = nlp_engine.analyze_sentiment(query)
-        
         # Generate conversational response
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": f"Respond with {sentiment['sentiment']} tone"},
-                {"role": "user", "content": query}
-            ]
-        )
-        return response.choices[0].message.content
+        return await llm_client.chat(await self.conversation_messages(query, analysis))
+    
+    async def conversation_messages(self, query: str, analysis: QueryAnalysis = None) -> List[Dict[str, str]]:
+        # The model-server client makes socket calls; keep them off the loop
+        analysis = analysis or await execution_layer.run_local(nlp_engine.analyze, query)
+        
+        # Sentiment analysis, batched with concurrent requests
+        sentiment = await inference_scheduler.analyze_sentiment(analysis.text)
+        
+        return [
+            {"role": "system", "content": f"Respond with {sentiment['sentiment']} tone"},
+            {"role": "user", "content": query}
+        ]
+
+logger = logging.getLogger('AIAssistant')
+
+# Task functions are registered by name so persisted tasks can be restored
+@task_manager.register()
+async def user_requested_task(query: str):
+    print(f"Executing automated task for: {query}")
+
+@task_manager.register()
+async def system_health_check():
+    # Implement system health monitoring
+    print("Performing periodic system health check")
 
 # FastAPI Application
 app = FastAPI()
 assistant = AIAssistant()
 
+class InvalidFrame(ValueError):
+    """
+    Raised for a JSON object that is neither a valid request nor a
+    known control frame
+    """
+    def __init__(self, message: str, request_id: str = None):
+        super().__init__(message)
+        self.request_id = request_id
+
+def parse_frame(data: str) -> Optional[dict]:
+    """
+    Return the frame in a websocket message, or None for the plain-text
+    protocol. Requests are JSON objects such as
+    {"id": "...", "query": "...", "stream": true, "deadline_ms": 10000};
+    control frames such as
+    {"type": "cancel", "id": "..."} carry a type instead of a query.
+    Any other JSON object raises InvalidFrame.
+    """
+    if not data.startswith('{'):
+        return None
+    try:
+        frame = json.loads(data)
+    except ValueError:
+        return None
+    if not isinstance(frame, dict):
+        return None
+    
+    request_id = str(frame['id']) if frame.get('id') is not None else None
+    if 'query' in frame:
+        if not isinstance(frame['query'], str):
+            raise InvalidFrame("query must be a string", request_id)
+        deadline_ms = frame.get('deadline_ms')
+        if deadline_ms is not None and (
+            isinstance(deadline_ms, bool)
+            or not isinstance(deadline_ms, (int, float))
+            or not math.isfinite(deadline_ms)
+            or deadline_ms <= 0
+        ):
+            raise InvalidFrame("deadline_ms must be a positive number", request_id)
+        frame['id'] = request_id or uuid.uuid4().hex
+        frame.setdefault('stream', True)
+        return frame
+    if frame.get('type') == 'cancel':
+        if request_id is None:
+            raise InvalidFrame("A cancel frame needs the id of the request to cancel")
+        frame['id'] = request_id
+        return frame
+    raise InvalidFrame("Expected a frame with a query or a known type", request_id)
+
+async def handle_frame(connection: ConnectionMultiplexer, frame: dict, session_id: str = None):
+    """
+    Answer a framed request. Streaming requests get a "chunk" frame per
+    LLM delta followed by an "end" frame; others get one "response" frame.
+    A request shed by admission control gets a "busy" frame with a
+    retry_after hint (seconds) instead.
+    """
+    request_id = frame['id']
+    deadline = frame['deadline_ms'] / 1000 if frame.get('deadline_ms') else None
+    try:
+        with trace('ws', request_id=request_id, session_id=session_id, stream=frame['stream']):
+            if frame['stream']:
+                stream = assistant.process_query_stream(frame['query'], deadline)
+                async for chunk in stream:
+                    await connection.send({'type': 'chunk', 'id': request_id, 'data': chunk})
+                await connection.send({'type': 'end', 'id': request_id})
+            else:
+                response = await assistant.process_query(frame['query'], deadline)
+                await connection.send({'type': 'response', 'id': request_id, 'data': response})
+    except WebSocketDisconnect:
+        raise
+    except AdmissionRejected as e:
+        await connection.send({
+            'type': 'busy',
+            'id': request_id,
+            'error': e.reason,
+            'retry_after': round(e.retry_after, 3),
+        })
+    except DeadlineExceeded as e:
+        await connection.send({'type': 'error', 'id': request_id, 'error': str(e)})
+    except Exception as e:
+        logger.exception(f"Request {request_id} failed")
+        await connection.send({'type': 'error', 'id': request_id, 'error': str(e)})
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
+    
+    # Context memory is scoped to the connection
+    session_id = uuid.uuid4().hex
+    
+    async def answer_frame(connection: ConnectionMultiplexer, frame: dict):
+        await handle_frame(connection, frame, session_id)
+    
+    async def answer_text(connection: ConnectionMultiplexer, text: str):
+        # Plain-text clients get the whole answer in one message
+        try:
+            with trace('ws', session_id=session_id, stream=False):
+                response = await assistant.process_query(text)
+        except (AdmissionRejected, DeadlineExceeded) as e:
+            response = str(e)
+        await connection.send_text(response)
+    
+    connection = ConnectionMultiplexer(websocket, answer_frame, answer_text)
     try:
         while True:
             data = await websocket.receive_text()
-            response = await assistant.process_query(data)
-            await websocket.send_text(response)
+            try:
+                frame = parse_frame(data)
+            except InvalidFrame as e:
+                await connection.send({'type': 'error', 'id': e.request_id, 'error': str(e)})
+                continue
+            if frame is None:
+                await connection.submit_text(data)
+            elif frame.get('type') == 'cancel':
+                await connection.cancel(frame['id'])
+            else:
+                await connection.submit(frame)
     except WebSocketDisconnect:
         print("WebSocket disconnected")
+    finally:
+        await connection.close()
+        nlp_engine.context_memory.clear_session(session_id)
+
+async def answer_speech(websocket: WebSocket, segments: asyncio.Queue, session_id: str):
+    """
+    Transcribe, answer and speak each voice segment in arrival order.
+    Runs beside the receive loop so audio keeps flowing into the VAD
+    while earlier segments are being answered.
+    """
+    while True:
+        segment, sample_rate = await segments.get()
+        request_id = uuid.uuid4().hex
+        try:
+            with trace('voice', request_id=request_id, session_id=session_id):
+                with stage('transcribe'):
+                    text = await execution_layer.run_local(speech_recognizer.transcribe, segment, sample_rate)
+                if not text:
+                    continue
+                await websocket.send_text(json.dumps({'type': 'transcript', 'id': request_id, 'text': text}))
+                
+                try:
+                    response = await assistant.process_query(text)
+                except AdmissionRejected as e:
+                    await websocket.send_text(json.dumps({
+                        'type': 'busy',
+                        'id': request_id,
+                        'error': e.reason,
+                        'retry_after': round(e.retry_after, 3),
+                    }))
+                    continue
+                except DeadlineExceeded as e:
+                    await websocket.send_text(json.dumps({'type': 'error', 'id': request_id, 'error': str(e)}))
+                    continue
+                await websocket.send_text(json.dumps({'type': 'response', 'id': request_id, 'text': response}))
+                
+                # The audio frame follows the response frame with the same id
+                with stage('synthesize'):
+                    audio = await speech_synthesizer.synthesize(response)
+                await websocket.send_bytes(audio)
+        except WebSocketDisconnect:
+            return
+        except Exception as e:
+            logger.exception(f"Voice request {request_id} failed")
+            await websocket.send_text(json.dumps({'type': 'error', 'id': request_id, 'error': str(e)}))
+
+@app.websocket("/ws/voice")
+async def voice_endpoint(websocket: WebSocket):
+    """
+    Voice protocol: binary frames carry 16-bit little-endian mono PCM.
+    An optional {"type": "start", "sample_rate": N} text frame sets the
+    rate (default VOICE_SAMPLE_RATE) and {"type": "end"} flushes the
+    last utterance. Every detected utterance yields a transcript frame,
+    a response frame and a binary WAV frame with the spoken reply.
+    """
+    await websocket.accept()
+    
+    session_id = uuid.uuid4().hex
+    vad = EnergyVAD()
+    segments = asyncio.Queue(maxsize=Config.VOICE_MAX_PENDING_SEGMENTS)
+    worker = asyncio.ensure_future(answer_speech(websocket, segments, session_id))
+    try:
+        while True:
+            message = await websocket.receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            
+            # Segments are queued with the rate of the VAD that produced them,
+            # even when a start frame replaces it below
+            sample_rate = vad.sample_rate
+            if message.get('bytes') is not None:
+                completed = vad.feed(message['bytes'])
+            else:
+                control = json.loads(message.get('text') or '{}')
+                if control.get('type') == 'start':
+                    completed = vad.flush()
+                    vad = EnergyVAD(int(control.get('sample_rate') or Config.VOICE_SAMPLE_RATE))
+                elif control.get('type') == 'end':
+                    completed = vad.flush()
+                else:
+                    continue
+            
+            for segment in completed:
+                if segments.full():
+                    # Answers are falling behind the speech; keep the newest
+                    segments.get_nowait()
+                    logger.warning(f"Voice session {session_id} dropped an unanswered utterance")
+                segments.put_nowait((segment, sample_rate))
+    except (WebSocketDisconnect, ValueError):
+        pass
+    finally:
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        nlp_engine.context_memory.clear_session(session_id)
+
+@app.post("/analyze/batch")
+async def analyze_batch(
+    request: Request,
+    include: str = 'intents,entities,sentiment',
+    batch_size: Optional[int] = Query(None, ge=1, le=Config.BULK_MAX_BATCH_SIZE),
+    n_process: Optional[int] = Query(None, ge=1, le=Config.BULK_MAX_N_PROCESS)
+):
+    """
+    Bulk analysis: the request body is NDJSON (one JSON string or
+    {"text": ..., ...} object per line) and results stream back as NDJSON
+    in input order. batch_size and n_process above the configured
+    maximums are rejected with 422.
+    """
+    options = {
+        'include': [name.strip() for name in include.split(',') if name.strip()],
+        'batch_size': batch_size,
+        'n_process': n_process,
+    }
+    body = await spool_body(request.stream())
+    return StreamingResponse(
+        stream_analysis(body, options),
+        media_type='application/x-ndjson'
+    )
+
+@app.get("/ready")
+async def readiness():
+    """
+    Report whether the preloaded models are warm and traffic can be served
+    """
+    status = await execution_layer.run_local(nlp_engine.status)
+    return JSONResponse(status, status_code=200 if status['ready'] else 503)
+
+@app.get("/stats")
+async def stats():
+    """
+    Runtime statistics for the inference and scheduling layers
+    """
+    return {
+        'inference': inference_scheduler.stats(),
+        'executors': execution_layer.stats(),
+        'response_cache': response_cache.stats(),
+        'context': nlp_engine.context_memory.stats(),
+        'tasks': task_manager.stats(),
+        'voice': speech_synthesizer.stats(),
+        'admission': admission_controller.stats(),
+        'logging': log_stats(),
+    }
+
+# Counters the components already keep, read when /metrics is scraped
+registry.collect(
+    'jarvis_response_cache_lookups_total', "Response cache lookups by result", 'counter', ['result'],
+    lambda: {
+        ('exact_hit',): response_cache.exact_hits,
+        ('semantic_hit',): response_cache.semantic_hits,
+        ('miss',): response_cache.misses,
+    }
+)
+registry.collect(
+    'jarvis_admission_queue_depth', "Queries waiting for admission by intent class", 'gauge', ['intent'],
+    lambda: {
+        (intent,): queue['depth'] for intent, queue in admission_controller.stats()['classes'].items()
+    }
+)
+registry.collect(
+    'jarvis_admission_active', "Queries holding an admission slot", 'gauge', [],
+    lambda: {(): admission_controller.stats()['active']}
+)
+registry.collect(
+    'jarvis_admission_rejected_total', "Queries shed by admission control", 'counter', ['intent', 'reason'],
+    lambda: {
+        (intent, reason): count
+        for intent, queue in admission_controller.stats()['classes'].items()
+        for reason, count in queue['rejected'].items()
+    }
+)
+registry.collect(
+    'jarvis_inference_batch_items_total', "Items run through each inference batcher", 'counter', ['batcher'],
+    lambda: {
+        (name,): batcher.items_processed for name, batcher in inference_scheduler.batchers.items()
+    }
+)
+registry.collect(
+    'jarvis_inference_batches_total', "Batches run by each inference batcher", 'counter', ['batcher'],
+    lambda: {
+        (name,): sum(batcher.batch_sizes.values()) for name, batcher in inference_scheduler.batchers.items()
+    }
+)
+registry.collect(
+    'jarvis_scheduled_tasks', "Tasks known to the task manager", 'gauge', [],
+    lambda: {(): len(task_manager.tasks)}
+)
+registry.collect(
+    'jarvis_tts_cache_lookups_total', "TTS cache lookups by result", 'counter', ['result'],
+    lambda: {('hit',): speech_synthesizer.hits, ('miss',): speech_synthesizer.misses}
+)
+registry.collect(
+    'jarvis_log_records_dropped_total', "Log records dropped by the queued handler under backpressure", 'counter',
+    ['level'],
+    lambda: {(level,): count for level, count in log_stats()['dropped'].items()}
+)
+registry.collect(
+    'jarvis_log_queue_depth', "Log records waiting for the writer thread", 'gauge', [],
+    lambda: {(): log_stats()['queued']}
+)
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Stage latency histograms, counters and event loop lag in the
+    Prometheus text format
+    """
+    return PlainTextResponse(registry.render(), media_type='text/plain; version=0.0.4')
+
+def log_warm_up_failure(future: asyncio.Future):
+    # Otherwise /ready stays at 503 with nothing in the logs to say why
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Model warm-up failed", exc_info=future.exception())
 
 # Background task for periodic system checks
 @app.on_event("startup")
 async def startup_event():
-    async def system_health_check():
-        # Implement system health monitoring
-        print("Performing periodic system health check")
+    # Applied here rather than at import so the server's own logging
+    # setup, which runs after the app is imported, cannot replace it
+    configure_logging()
+    
+    # Route default-executor work through the bounded I/O pool
+    execution_layer.install()
+    loop_lag_monitor.start()
+    
+    # Warm up models off the event loop so the server accepts connections
+    # (and answers /ready) while loading
+    loop = asyncio.get_event_loop()
+    app.state.warm_up = loop.run_in_executor(execution_layer.cpu_pool, nlp_engine.warm_up)
+    app.state.warm_up.add_done_callback(log_warm_up_failure)
+    
+    # Single background loop that fires every scheduled task; persisted
+    # tasks are reloaded first so the health check is not duplicated
+    task_manager.start()
+    task_manager.restore()
     
     await task_manager.create_task(
         name="system_health_check",
-        function=system_health_check,
-        schedule={'interval': timedelta(hours=1)}
+        schedule={'interval': timedelta(hours=1)},
+        task_id="system_health_check"
     )
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await loop_lag_monitor.stop()
+    await task_manager.stop()
+    await llm_client.aclose()
+    speech_synthesizer.shutdown()
+    execution_layer.shutdown(wait=False)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
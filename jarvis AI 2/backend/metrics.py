@@ -0,0 +1,368 @@
+import asyncio
+import bisect
+import contextvars
+import functools
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+from .config import Config
+
+trace_logger = logging.getLogger('Trace')
+
+# Latency buckets in seconds, from sub-millisecond parsing to LLM calls
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return f'{{{pairs}}}'
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Metric:
+    """
+    Base for metrics in the Prometheus text exposition format.
+    
+    Observations may come from the event loop and from pool threads, so
+    each metric guards its values with a lock; the critical sections
+    are a few arithmetic operations.
+    """
+    type = 'untyped'
+    
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+    
+    def _check(self, labels: LabelValues):
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {labels}")
+    
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[str], float]]:
+        """
+        (suffix, label names, label values, value) for every sample
+        """
+        raise NotImplementedError
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for suffix, names, values, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+class Counter(Metric):
+    type = 'counter'
+    
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[LabelValues, float] = {}
+    
+    def inc(self, *labels: str, amount: float = 1.0):
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+    
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0.0)
+    
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield '', self.label_names, labels, value
+
+class Gauge(Metric):
+    type = 'gauge'
+    
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[LabelValues, float] = {}
+    
+    def set(self, value: float, *labels: str):
+        self._check(labels)
+        with self._lock:
+            self._values[labels] = value
+    
+    def samples(self):
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield '', self.label_names, labels, value
+
+class Histogram(Metric):
+    """
+    Cumulative-bucket histogram; observations are bisected into
+    per-bucket counts and the cumulative sums are built at scrape time
+    """
+    type = 'histogram'
+    
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last is +Inf), sum]
+        self._values: Dict[LabelValues, list] = {}
+    
+    def observe(self, value: float, *labels: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                self._check(labels)
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+    
+    @contextmanager
+    def time(self, *labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+    
+    def count(self, *labels: str) -> int:
+        entry = self._values.get(labels)
+        return sum(entry[0]) if entry else 0
+    
+    def samples(self):
+        with self._lock:
+            values = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        bucket_names = self.label_names + ('le',)
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield '_bucket', bucket_names, labels + (_format_value(bound),), cumulative
+            yield '_sum', self.label_names, labels, total
+            yield '_count', self.label_names, labels, cumulative
+
+class CollectedMetric(Metric):
+    """
+    Values read at scrape time from a function returning
+    {label values: value}; exports counters the components already keep
+    """
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        type: str,
+        labels: Sequence[str],
+        function: Callable[[], Dict[LabelValues, float]]
+    ):
+        super().__init__(name, help, labels)
+        self.type = type
+        self.function = function
+    
+    def samples(self):
+        for labels, value in self.function().items():
+            yield '', self.label_names, labels, value
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+    
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+    
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labels))
+    
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+    
+    def collect(
+        self,
+        name: str,
+        help: str,
+        type: str,
+        labels: Sequence[str],
+        function: Callable[[], Dict[LabelValues, float]]
+    ) -> CollectedMetric:
+        return self.register(CollectedMetric(name, help, type, labels, function))
+    
+    def render(self) -> str:
+        """
+        All metrics in the Prometheus text format (version 0.0.4)
+        """
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                logging.getLogger('Metrics').exception(f"Collecting {metric.name} failed")
+        return '\n'.join(lines) + '\n'
+
+class RequestTrace:
+    """
+    Stage spans of one sampled request, logged as a JSON line when the
+    request finishes
+    """
+    def __init__(self, kind: str, attributes: Dict[str, Any]):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.attributes = attributes
+        self.started = time.perf_counter()
+        self.spans = []
+    
+    def add(self, stage: str, started: float, duration: float):
+        # list.append is atomic, so pool threads can record spans too
+        self.spans.append((stage, started, duration))
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'trace_id': self.trace_id,
+            'kind': self.kind,
+            **self.attributes,
+            'total_ms': round((time.perf_counter() - self.started) * 1000, 3),
+            'spans': [
+                {
+                    'stage': stage,
+                    'start_ms': round((started - self.started) * 1000, 3),
+                    'duration_ms': round(duration * 1000, 3),
+                } for stage, started, duration in sorted(self.spans, key=lambda span: span[1])
+            ],
+        }
+
+_current_trace = contextvars.ContextVar('jarvis_trace', default=None)
+
+# Shared registry and the metrics recorded by the instrumented code
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    'jarvis_stage_seconds', "Time spent in each processing stage", ['stage']
+)
+REQUEST_SECONDS = registry.histogram(
+    'jarvis_request_seconds', "Query handling time from arrival to the last reply", ['intent', 'outcome']
+)
+INTENTS = registry.counter('jarvis_intents_total', "Queries by primary intent", ['intent'])
+TASK_RUNS = registry.counter('jarvis_task_runs_total', "Scheduled task runs by outcome", ['status'])
+TASK_RUN_SECONDS = registry.histogram('jarvis_task_run_seconds', "Scheduled task run time")
+LOOP_LAG_SECONDS = registry.histogram(
+    'jarvis_event_loop_lag_seconds', "Delay of event loop wake-ups past their due time",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+LOOP_LAG_MAX = registry.gauge(
+    'jarvis_event_loop_lag_max_seconds', "Largest event loop lag in the last sampling window"
+)
+
+def observe_stage(stage: str, duration: float, started: float = None):
+    """
+    Record a stage duration (seconds), and a span when the request is traced
+    """
+    STAGE_SECONDS.observe(duration, stage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, time.perf_counter() - duration if started is None else started, duration)
+
+@contextmanager
+def stage(name: str):
+    """
+    Time a block as one processing stage
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - started, started)
+
+def timed(name: str):
+    """
+    Decorator timing every call of a function as one processing stage
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                observe_stage(name, time.perf_counter() - started, started)
+        return wrapper
+    return decorator
+
+@contextmanager
+def trace(kind: str, **attributes: Any):
+    """
+    Sample a request for a trace log; stages timed inside the block
+    (including on pool threads) become its spans
+    """
+    if Config.METRICS_TRACE_SAMPLE_RATE <= 0 or random.random() >= Config.METRICS_TRACE_SAMPLE_RATE:
+        yield None
+        return
+    
+    request_trace = RequestTrace(kind, attributes)
+    token = _current_trace.set(request_trace)
+    try:
+        yield request_trace
+    finally:
+        _current_trace.reset(token)
+        trace_logger.info(json.dumps(request_trace.to_dict()))
+
+class LoopLagMonitor:
+    """
+    Measures event loop responsiveness: a task sleeps for a fixed
+    interval and records how late it wakes up. Sustained lag means
+    blocking work is running on the loop.
+    """
+    def __init__(self, interval: float = None):
+        self.interval = interval or Config.METRICS_LOOP_LAG_INTERVAL
+        self._task = None
+    
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        window_max = 0.0
+        window_end = loop.time() + 10 * self.interval
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            LOOP_LAG_SECONDS.observe(lag)
+            
+            window_max = max(window_max, lag)
+            if loop.time() >= window_end:
+                LOOP_LAG_MAX.set(window_max)
+                window_max = 0.0
+                window_end = loop.time() + 10 * self.interval
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+loop_lag_monitor = LoopLagMonitor()
@@ -0,0 +1,240 @@
+import itertools
+import json
+import socket
+import struct
+import threading
+import time
+from functools import cached_property
+from typing import Any, Dict, Iterable, Iterator, List, Union
+
+import numpy as np
+
+from .config import Config
+from .context_store import SessionContextStore
+
+# Frames are a 4-byte big-endian length followed by a JSON object
+HEADER = struct.Struct('!I')
+MAX_FRAME_SIZE = 64 * 1024 * 1024
+
+class ModelServerError(RuntimeError):
+    """
+    Raised when the model server reports a failed call
+    """
+
+def _to_json(value):
+    # numpy scalars and arrays coming out of the models
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def encode_frame(message: Dict[str, Any]) -> bytes:
+    payload = json.dumps(message, separators=(',', ':'), default=_to_json).encode()
+    if len(payload) > MAX_FRAME_SIZE:
+        raise ValueError(f"Frame of {len(payload)} bytes exceeds {MAX_FRAME_SIZE}")
+    return HEADER.pack(len(payload)) + payload
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            raise ConnectionResetError("Model server closed the connection")
+        buffer += chunk
+    return bytes(buffer)
+
+class ModelServerClient:
+    """
+    Drop-in stand-in for AdvancedNLPEngine that forwards model calls to
+    the shared model server.
+    
+    Calls stay blocking like the engine's, so the execution layer and
+    micro-batchers use it unchanged. Each thread keeps its own connection;
+    context memory is per connection and therefore stays in this worker.
+    """
+    def __init__(self, socket_path: str = None, timeout: float = None):
+        self.socket_path = socket_path or Config.MODEL_SERVER_SOCKET
+        self.timeout = timeout or Config.MODEL_SERVER_TIMEOUT
+        self._local = threading.local()
+        self._ids = itertools.count()
+        self.ready = False
+        
+        # Context Management
+        self.context_memory = SessionContextStore()
+    
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                raise
+            self._local.sock = sock
+        return sock
+    
+    def _drop_connection(self):
+        sock = getattr(self._local, 'sock', None)
+        self._local.sock = None
+        if sock is not None:
+            sock.close()
+    
+    def call(self, method: str, *args) -> Any:
+        """
+        Invoke a method on the server's engine and wait for the result
+        """
+        request_id = next(self._ids)
+        frame = encode_frame({'id': request_id, 'method': method, 'args': list(args)})
+        
+        # One retry covers a server restart that left a stale connection;
+        # model calls have no side effects so replaying is safe
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                sock.sendall(frame)
+                (size,) = HEADER.unpack(_recv_exact(sock, HEADER.size))
+                reply = json.loads(_recv_exact(sock, size))
+                break
+            except ConnectionError:
+                self._drop_connection()
+                if attempt:
+                    raise
+            except OSError:
+                # Timeouts leave a late reply on the socket
+                self._drop_connection()
+                raise
+        
+        if reply.get('id') != request_id:
+            self._drop_connection()
+            raise ModelServerError(f"Out of sequence reply for {method}")
+        if 'error' in reply:
+            raise ModelServerError(reply['error'])
+        return reply['result']
+    
+    def warm_up(self):
+        """
+        Wait until the model server is reachable and has warmed its models
+        """
+        deadline = time.monotonic() + Config.MODEL_SERVER_STARTUP_TIMEOUT
+        while True:
+            try:
+                if self.call('status')['ready']:
+                    break
+            except OSError:
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Model server at {self.socket_path} did not become ready")
+            time.sleep(0.5)
+        
+        self.ready = True
+    
+    def status(self) -> Dict[str, Any]:
+        """
+        Report readiness of this worker and the server it talks to
+        """
+        try:
+            server = self.call('status')
+        except (OSError, ModelServerError) as e:
+            server = {'error': str(e)}
+        return {
+            'ready': self.ready and server.get('ready', False),
+            'model_server': self.socket_path,
+            'server': server,
+        }
+    
+    def analyze(self, text: str, disable: Iterable[str] = None) -> 'RemoteQueryAnalysis':
+        return RemoteQueryAnalysis(self, text, disable)
+    
+    def analyze_many(
+        self,
+        items: Iterable[Union[str, Dict[str, Any]]],
+        include: Iterable[str] = ('intents', 'entities', 'sentiment'),
+        batch_size: int = None,
+        n_process: int = None,
+        model_batch_size: int = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream items to the server one model batch at a time
+        """
+        include = list(include)
+        model_batch_size = model_batch_size or Config.BULK_MODEL_BATCH_SIZE
+        items = iter(items)
+        while True:
+            chunk = list(itertools.islice(items, model_batch_size))
+            if not chunk:
+                break
+            yield from self.call('analyze_many', chunk, include)
+    
+    def extract_entities(self, text: str) -> List[Dict[str, str]]:
+        return self.call('extract_entities', text)
+    
+    def intent_classification(self, text: str) -> Dict[str, float]:
+        return self.call('intent_classification', text)
+    
+    def analyze_sentiment(self, text: str) -> Dict[str, float]:
+        return self.call('analyze_sentiment', text)
+    
+    def analyze_sentiment_batch(self, texts: List[str]) -> List[Dict[str, float]]:
+        return self.call('analyze_sentiment_batch', list(texts))
+    
+    def extract_ner(self, text: str) -> List[Dict[str, Any]]:
+        return self.call('extract_ner', text)
+    
+    def extract_ner_batch(self, texts: List[str]) -> List[List[Dict[str, Any]]]:
+        return self.call('extract_ner_batch', list(texts))
+    
+    def answer_question(self, context: str, question: str) -> str:
+        return self.call('answer_question', context, question)
+    
+    def find_answer(self, context: str, question: str) -> Dict[str, Any]:
+        return self.call('find_answer', context, question)
+    
+    def answer_question_batch(self, pairs: List[tuple]) -> List[str]:
+        return self.call('answer_question_batch', [list(pair) for pair in pairs])
+    
+    def answer_spans_batch(self, pairs: List[tuple]) -> List[Dict[str, Any]]:
+        return self.call('answer_spans_batch', [list(pair) for pair in pairs])
+    
+    def update_context_memory(self, key: str, value: Any, session_id: str = 'global', ttl: float = None):
+        self.context_memory.set(session_id, key, value, ttl)
+    
+    def retrieve_context(self, key: str, max_age_minutes: int = 60, session_id: str = 'global') -> Any:
+        return self.context_memory.get(session_id, key, max_age=max_age_minutes * 60)
+
+class RemoteQueryAnalysis:
+    """
+    QueryAnalysis counterpart whose parse runs on the model server.
+    Intents, entities and vector arrive together in one call made on
+    first access; sentiment is a separate call.
+    """
+    def __init__(self, engine: ModelServerClient, text: str, disable: Iterable[str] = None):
+        self.engine = engine
+        self.text = text
+        self.disable = None if disable is None else list(disable)
+    
+    @cached_property
+    def _parsed(self) -> Dict[str, Any]:
+        return self.engine.call('analysis', self.text, self.disable)
+    
+    @cached_property
+    def intents(self) -> Dict[str, float]:
+        return self._parsed['intents']
+    
+    @cached_property
+    def primary_intent(self) -> str:
+        return max(self.intents, key=self.intents.get)
+    
+    @cached_property
+    def entities(self) -> List[Dict[str, str]]:
+        return self._parsed['entities']
+    
+    @cached_property
+    def vector(self) -> np.ndarray:
+        return np.asarray(self._parsed['vector'], dtype=np.float32)
+    
+    @cached_property
+    def sentiment(self) -> Dict[str, float]:
+        return self.engine.analyze_sentiment(self.text)
@@ -0,0 +1,167 @@
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import os
+import signal
+from collections import Counter
+from typing import Any, Dict, List
+
+from .config import Config
+from .executors import execution_layer, call_engine
+from .inference_scheduler import InferenceScheduler, MicroBatcher
+from .model_client import HEADER, MAX_FRAME_SIZE, ModelServerClient, encode_frame
+from .nlp_engine import nlp_engine
+
+logger = logging.getLogger('ModelServer')
+
+class ModelServer:
+    """
+    Owns the NLP models for every web worker on the host.
+    
+    Requests are length-prefixed JSON frames {id, method, args} answered
+    by id, so a connection may pipeline calls. Single-item calls from all
+    connections share the micro-batchers, so concurrent workers end up
+    in the same padded batches.
+    """
+    # Engine methods that already take a batch and run as-is
+    BATCH_METHODS = {
+        'analyze_sentiment_batch', 'extract_ner_batch', 'answer_question_batch', 'answer_spans_batch'
+    }
+    
+    # Cheap spaCy-only calls run on the CPU thread pool
+    LOCAL_METHODS = {'extract_entities', 'intent_classification'}
+    
+    def __init__(self, socket_path: str = None):
+        if isinstance(nlp_engine, ModelServerClient):
+            raise RuntimeError("The model server needs USE_MODEL_SERVER unset so it loads the models itself")
+        
+        self.socket_path = socket_path or Config.MODEL_SERVER_SOCKET
+        self.scheduler = InferenceScheduler()
+        self.analysis = MicroBatcher('analysis', functools.partial(call_engine, 'analysis_batch'))
+        
+        # Metrics
+        self.connections = 0
+        self.requests = Counter()
+        self.errors = 0
+    
+    async def dispatch(self, method: str, args: List[Any]) -> Any:
+        if method == 'analysis':
+            text, disable = args
+            if disable is None:
+                return await self.analysis.submit(text)
+            results = await execution_layer.run_local(nlp_engine.analysis_batch, [text], disable)
+            return results[0]
+        if method == 'analyze_sentiment':
+            return await self.scheduler.analyze_sentiment(*args)
+        if method == 'extract_ner':
+            return await self.scheduler.extract_ner(*args)
+        if method == 'answer_question':
+            return await self.scheduler.answer_question(*args)
+        if method == 'find_answer':
+            return await self.scheduler.find_answer(*args)
+        if method in self.BATCH_METHODS:
+            return await execution_layer.run_cpu(call_engine, method, *args)
+        if method in self.LOCAL_METHODS:
+            return await execution_layer.run_local(getattr(nlp_engine, method), *args)
+        if method == 'analyze_many':
+            items, include = args
+            return await execution_layer.run_local(lambda: list(nlp_engine.analyze_many(items, include)))
+        if method == 'status':
+            return self.status()
+        raise ValueError(f"Unknown method: {method}")
+    
+    async def handle_request(self, request: Dict[str, Any], writer: asyncio.StreamWriter):
+        method = request.get('method')
+        self.requests[method] += 1
+        reply = {'id': request.get('id')}
+        try:
+            reply['result'] = await self.dispatch(method, request.get('args') or [])
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"{method} failed: {e}")
+            reply['error'] = f"{type(e).__name__}: {e}"
+        
+        try:
+            writer.write(encode_frame(reply))
+            await writer.drain()
+        except ConnectionError:
+            pass
+    
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        pending = set()
+        try:
+            while True:
+                (size,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+                if size > MAX_FRAME_SIZE:
+                    logger.warning(f"Dropping connection after {size} byte frame")
+                    break
+                request = json.loads(await reader.readexactly(size))
+                
+                # Replies go out as soon as each call finishes
+                task = asyncio.ensure_future(self.handle_request(request, writer))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ValueError as e:
+            logger.warning(f"Malformed frame: {e}")
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            writer.close()
+            self.connections -= 1
+    
+    def status(self) -> Dict[str, Any]:
+        return {
+            **nlp_engine.status(),
+            'connections': self.connections,
+            'requests': dict(self.requests),
+            'errors': self.errors,
+            'inference': self.scheduler.stats(),
+            'analysis': self.analysis.stats(),
+        }
+    
+    async def serve(self):
+        """
+        Listen on the socket, warming the models in the background
+        """
+        execution_layer.install()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        
+        server = await asyncio.start_unix_server(self.handle_connection, path=self.socket_path)
+        os.chmod(self.socket_path, 0o660)
+        logger.info(f"Model server listening on {self.socket_path}")
+        
+        # supervisord stops programs with SIGTERM; unwind so the socket is removed
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        
+        warm_up = loop.run_in_executor(execution_layer.cpu_pool, nlp_engine.warm_up)
+        try:
+            async with server:
+                await warm_up
+                logger.info(f"Models ready: {nlp_engine.status()['loaded']}")
+                await server.serve_forever()
+        finally:
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            execution_layer.shutdown(wait=False)
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared NLP model server")
+    parser.add_argument('--socket', default=Config.MODEL_SERVER_SOCKET)
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(ModelServer(args.socket).serve())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+
+if __name__ == '__main__':
+    main()
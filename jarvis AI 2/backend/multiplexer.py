@@ -0,0 +1,129 @@
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from fastapi import WebSocket
+
+from .config import Config
+
+logger = logging.getLogger('Multiplexer')
+
+FrameHandler = Callable[['ConnectionMultiplexer', Dict[str, Any]], Awaitable[None]]
+TextHandler = Callable[['ConnectionMultiplexer', str], Awaitable[None]]
+
+class ConnectionMultiplexer:
+    """
+    Runs the requests of one websocket connection concurrently.
+    
+    Framed requests become tasks keyed by their id; up to max_inflight of
+    them run at once and the rest wait their turn, so replies can arrive
+    out of order and a quick command is not stuck behind a slow answer.
+    Any request can be cancelled by id. Plain-text messages carry no id,
+    so they are answered one at a time in arrival order, as before. At
+    most max_pending of each kind are accepted; further ones are refused
+    with an error reply.
+    """
+    def __init__(
+        self,
+        websocket: WebSocket,
+        frame_handler: FrameHandler,
+        text_handler: TextHandler,
+        max_inflight: int = None,
+        max_pending: int = None
+    ):
+        self.websocket = websocket
+        self.frame_handler = frame_handler
+        self.text_handler = text_handler
+        self.max_inflight = max_inflight or Config.WS_MAX_INFLIGHT
+        self.max_pending = max_pending or Config.WS_MAX_PENDING
+        
+        self._slots = asyncio.Semaphore(self.max_inflight)
+        self._send_lock = asyncio.Lock()
+        self._requests: Dict[str, asyncio.Task] = {}
+        self._texts = asyncio.Queue(maxsize=self.max_pending)
+        self._text_worker = None
+    
+    async def send(self, message: Dict[str, Any]):
+        """
+        Send one JSON frame; concurrent requests never interleave writes
+        """
+        async with self._send_lock:
+            await self.websocket.send_text(json.dumps(message))
+    
+    async def send_text(self, text: str):
+        async with self._send_lock:
+            await self.websocket.send_text(text)
+    
+    async def submit(self, frame: Dict[str, Any]):
+        """
+        Start a framed request without waiting for it
+        """
+        request_id = frame['id']
+        if request_id in self._requests:
+            await self.send({'type': 'error', 'id': request_id, 'error': "A request with this id is already in flight"})
+            return
+        if len(self._requests) >= self.max_pending:
+            await self.send({'type': 'error', 'id': request_id, 'error': "Too many requests in flight"})
+            return
+        
+        task = asyncio.ensure_future(self._run(frame))
+        self._requests[request_id] = task
+        task.add_done_callback(lambda _: self._requests.pop(request_id, None))
+    
+    async def _run(self, frame: Dict[str, Any]):
+        try:
+            async with self._slots:
+                await self.frame_handler(self, frame)
+        except Exception as e:
+            # Handlers report their own failures; this is a lost socket
+            logger.debug(f"Request {frame['id']} ended without a reply: {e}")
+    
+    async def cancel(self, request_id: str):
+        """
+        Cancel an in-flight request and confirm with a "cancelled" frame
+        """
+        task = self._requests.get(request_id)
+        if task is None:
+            await self.send({'type': 'error', 'id': request_id, 'error': "No such request in flight"})
+            return
+        
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await self.send({'type': 'cancelled', 'id': request_id})
+    
+    async def submit_text(self, text: str):
+        """
+        Queue a plain-text message; these are answered strictly in order
+        """
+        if self._texts.full():
+            # Plain-text clients read plain-text replies
+            await self.send_text("Error: too many requests in flight")
+            return
+        if self._text_worker is None:
+            self._text_worker = asyncio.ensure_future(self._answer_texts())
+        self._texts.put_nowait(text)
+    
+    async def _answer_texts(self):
+        while True:
+            text = await self._texts.get()
+            try:
+                async with self._slots:
+                    await self.text_handler(self, text)
+            except Exception:
+                logger.exception("Plain-text request failed")
+    
+    @property
+    def inflight(self) -> int:
+        return len(self._requests)
+    
+    async def close(self):
+        """
+        Cancel everything still running for this connection
+        """
+        tasks = list(self._requests.values())
+        if self._text_worker is not None:
+            tasks.append(self._text_worker)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,32 +1,231 @@
-import spacy
+import itertools
+import math
+import threading
+from functools import cached_property
 import numpy as np
-import torch
-from transformers import pipeline, AutoModelForQuestionAnswering, AutoTokenizer
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List, Union
+
+from .config import Config
+from .context_store import SessionContextStore
+from .inference_backends import prepare_model, prepare_pipeline
+from .metrics import stage, timed
 
 class AdvancedNLPEngine:
-    def __init__(self):
-        # Load advanced NLP models
-        self.nlp = spacy.load('en_core_web_lg')
+    # Heavy models are loaded on first use. Each loader returns the ready
+    # object; spaCy, transformers and torch are imported inside the loaders
+    # so that importing this module stays cheap.
+    MODEL_LOADERS = {
+        'spacy': '_load_spacy',
+        'qa_model': '_load_qa_model',
+        'qa_tokenizer': '_load_qa_tokenizer',
+        'sentiment': '_load_sentiment',
+        'ner': '_load_ner',
+    }
+    
+    def __init__(self, preload: List[str] = None):
+        self._models = {}
+        # Re-entrant: a loader may fetch another model (its tokenizer)
+        self._model_lock = threading.RLock()
+        self.preload = list(Config.NLP_PRELOAD_MODELS if preload is None else preload)
+        self.ready = False
+        
+        # Context Management
+        self.context_memory = SessionContextStore()
+    
+    def _load_spacy(self):
+        import spacy
+        return spacy.load(Config.SPACY_MODEL)
+    
+    def _load_qa_model(self):
+        from transformers import AutoModelForQuestionAnswering
+        model = AutoModelForQuestionAnswering.from_pretrained(Config.QA_MODEL_NAME)
+        return prepare_model(model, self.qa_tokenizer, 'question-answering')
+    
+    def _load_qa_tokenizer(self):
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(Config.QA_MODEL_NAME)
+    
+    def _load_sentiment(self):
+        from transformers import pipeline
+        return prepare_pipeline(pipeline('sentiment-analysis'), 'sentiment-analysis')
+    
+    def _load_ner(self):
+        from transformers import pipeline
+        return prepare_pipeline(pipeline('ner'), 'ner')
+    
+    def get_model(self, name: str):
+        """
+        Return a model, loading it on first access
+        """
+        model = self._models.get(name)
+        if model is not None:
+            return model
         
-        # Question Answering Model
-        self.qa_model = AutoModelForQuestionAnswering.from_pretrained('deepset/roberta-base-squad2')
-        self.qa_tokenizer = AutoTokenizer.from_pretrained('deepset/roberta-base-squad2')
+        if name not in self.MODEL_LOADERS:
+            raise ValueError(f"Unknown model: {name}")
         
-        # Sentiment Analysis
-        self.sentiment_analyzer = pipeline('sentiment-analysis')
+        with self._model_lock:
+            # Another thread may have finished loading while we waited
+            if name not in self._models:
+                with stage(f'load_{name}'):
+                    self._models[name] = getattr(self, self.MODEL_LOADERS[name])()
+            return self._models[name]
+    
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+    
+    @property
+    def nlp(self):
+        return self.get_model('spacy')
+    
+    @property
+    def qa_model(self):
+        return self.get_model('qa_model')
+    
+    @property
+    def qa_tokenizer(self):
+        return self.get_model('qa_tokenizer')
+    
+    @property
+    def sentiment_analyzer(self):
+        return self.get_model('sentiment')
+    
+    @property
+    def ner_model(self):
+        return self.get_model('ner')
+    
+    def warm_up(self):
+        """
+        Load the configured preload models and run one inference through
+        each so the first real request does not pay for lazy initialization
+        """
+        for name in self.preload:
+            self.get_model(name)
         
-        # Named Entity Recognition
-        self.ner_model = pipeline('ner')
+        if self.is_loaded('spacy'):
+            self.nlp("warm up")
+        if self.is_loaded('sentiment'):
+            self.sentiment_analyzer("warm up")
+        if self.is_loaded('ner'):
+            self.ner_model("warm up")
+        if self.is_loaded('qa_model') and self.is_loaded('qa_tokenizer'):
+            self.answer_question("Warm up context.", "What is this?")
         
-        # Context Management
-        self.context_memory = {}
+        self.ready = True
+    
+    def status(self) -> Dict[str, Any]:
+        """
+        Report readiness and which models are resident
+        """
+        return {
+            'ready': self.ready,
+            'backend': Config.NLP_INFERENCE_BACKEND,
+            'preload': self.preload,
+            'loaded': sorted(self._models),
+        }
+    
+    @timed('spacy_parse')
+    def parse(self, text: str, disable: Iterable[str] = None):
+        """
+        Run the spaCy pipeline once, skipping the given components
+        """
+        disable = Config.NLP_DISABLED_COMPONENTS if disable is None else disable
+        nlp = self.nlp
+        return nlp(text, disable=[name for name in disable if name in nlp.pipe_names])
+    
+    def analyze(self, text: str, disable: Iterable[str] = None) -> 'QueryAnalysis':
+        """
+        Build a shared analysis object that parses the text at most once
+        """
+        return QueryAnalysis(self, text, disable)
+    
+    def analyze_many(
+        self,
+        items: Iterable[Union[str, Dict[str, Any]]],
+        include: Iterable[str] = ('intents', 'entities', 'sentiment'),
+        batch_size: int = None,
+        n_process: int = None,
+        model_batch_size: int = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Analyze a stream of texts, yielding one result per input in order.
+        
+        Items are plain strings or dicts with a 'text' key; any other keys
+        of a dict item (such as an id) are copied into its result. spaCy
+        runs through nlp.pipe and sentiment through batched pipeline calls,
+        so only one batch of results is held in memory at a time.
+        """
+        include = set(include)
+        batch_size = batch_size or Config.BULK_BATCH_SIZE
+        n_process = n_process or Config.BULK_N_PROCESS
+        model_batch_size = model_batch_size or Config.BULK_MODEL_BATCH_SIZE
+        
+        def as_tuples():
+            for item in items:
+                if isinstance(item, str):
+                    yield item, {}
+                else:
+                    meta = dict(item)
+                    yield meta.pop('text'), meta
+        
+        nlp = self.nlp
+        disable = [name for name in Config.NLP_DISABLED_COMPONENTS if name in nlp.pipe_names]
+        if 'entities' not in include and 'ner' in nlp.pipe_names:
+            disable.append('ner')
+        
+        docs = nlp.pipe(
+            as_tuples(), as_tuples=True,
+            batch_size=batch_size, n_process=n_process, disable=disable
+        )
+        
+        while True:
+            chunk = list(itertools.islice(docs, model_batch_size))
+            if not chunk:
+                break
+            
+            sentiments = (
+                self.analyze_sentiment_batch([doc.text for doc, _ in chunk])
+                if 'sentiment' in include else [None] * len(chunk)
+            )
+            
+            for (doc, meta), sentiment in zip(chunk, sentiments):
+                result = dict(meta, text=doc.text)
+                if 'intents' in include:
+                    intents = self.intents_from_doc(doc)
+                    result['intents'] = intents
+                    result['primary_intent'] = max(intents, key=intents.get)
+                if 'entities' in include:
+                    result['entities'] = self.entities_from_doc(doc)
+                if sentiment is not None:
+                    result['sentiment'] = sentiment
+                yield result
+    
+    @timed('spacy_pipe')
+    def analysis_batch(self, texts: List[str], disable: Iterable[str] = None) -> List[Dict[str, Any]]:
+        """
+        Intents, entities and vector for a batch of texts from one nlp.pipe
+        pass, as plain values that can be sent to another process
+        """
+        disable = Config.NLP_DISABLED_COMPONENTS if disable is None else disable
+        nlp = self.nlp
+        docs = nlp.pipe(texts, disable=[name for name in disable if name in nlp.pipe_names])
+        return [
+            {
+                'intents': self.intents_from_doc(doc),
+                'entities': self.entities_from_doc(doc),
+                'vector': doc.vector.tolist()
+            } for doc in docs
+        ]
     
     def extract_entities(self, text: str) -> List[Dict[str, str]]:
         """
         Extract named entities from text
         """
-        doc = self.nlp(text)
+        return self.entities_from_doc(self.parse(text))
+    
+    @staticmethod
+    @timed('entities')
+    def entities_from_doc(doc) -> List[Dict[str, str]]:
         return [
             {
                 'text': ent.text,
@@ -38,60 +237,159 @@ class AdvancedNLPEngine:
         """
         Perform sentiment analysis on text
         """
-        result = self.sentiment_analyzer(text)[0]
-        return {
-            'sentiment': result['label'],
-            'confidence': result['score']
-        }
+        return self.analyze_sentiment_batch([text])[0]
+    
+    @timed('sentiment')
+    def analyze_sentiment_batch(self, texts: List[str]) -> List[Dict[str, float]]:
+        """
+        Perform sentiment analysis on a padded batch of texts
+        """
+        results = self.sentiment_analyzer(list(texts), batch_size=len(texts), truncation=True)
+        return [
+            {
+                'sentiment': result['label'],
+                'confidence': result['score']
+            } for result in results
+        ]
+    
+    @timed('ner')
+    def extract_ner_batch(self, texts: List[str]) -> List[List[Dict[str, Any]]]:
+        """
+        Transformer NER over a padded batch of texts
+        """
+        results = self.ner_model(list(texts), batch_size=len(texts))
+        return [
+            [
+                {
+                    'text': entity['word'],
+                    'label': entity['entity'],
+                    'score': float(entity['score'])
+                } for entity in entities
+            ] for entities in results
+        ]
     
     def answer_question(self, context: str, question: str) -> str:
         """
         Answer questions based on given context
         """
-        inputs = self.qa_tokenizer(question, context, return_tensors='pt')
-        outputs = self.qa_model(**inputs)
+        return self.answer_spans_batch([(context, question)])[0]['answer']
+    
+    def find_answer(self, context: str, question: str) -> Dict[str, Any]:
+        """
+        Best answer span with its score and character offsets
+        """
+        return self.answer_spans_batch([(context, question)])[0]
+    
+    def answer_question_batch(self, pairs: List[tuple]) -> List[str]:
+        """
+        Answer a batch of (context, question) pairs
+        """
+        return [span['answer'] for span in self.answer_spans_batch(pairs)]
+    
+    @timed('qa')
+    def answer_spans_batch(self, pairs: List[tuple]) -> List[Dict[str, Any]]:
+        """
+        Extractive QA over (context, question) pairs of any length.
+        
+        Contexts are split into overlapping windows of QA_MAX_SEQ_LENGTH
+        tokens that share QA_DOC_STRIDE tokens with their neighbour. The
+        windows of every pair run through the model together, and the
+        best valid span across a pair's windows wins. Each answer carries
+        its probability and character offsets into the context.
+        """
+        import torch
+        
+        contexts = [context for context, _ in pairs]
+        questions = [question for _, question in pairs]
+        encoded = self.qa_tokenizer(
+            questions, contexts,
+            truncation='only_second', max_length=Config.QA_MAX_SEQ_LENGTH, stride=Config.QA_DOC_STRIDE,
+            return_overflowing_tokens=True, return_offsets_mapping=True,
+            padding=True, return_tensors='pt'
+        )
+        window_pairs = encoded.pop('overflow_to_sample_mapping').tolist()
+        offsets = encoded.pop('offset_mapping')
         
-        start_logits = outputs.start_logits
-        end_logits = outputs.end_logits
+        # Only context tokens may start or end an answer
+        context_mask = torch.tensor([
+            [sequence_id == 1 for sequence_id in encoded.sequence_ids(window)]
+            for window in range(len(window_pairs))
+        ])
         
-        start_index = torch.argmax(start_logits)
-        end_index = torch.argmax(end_logits)
+        start_logits, end_logits = [], []
+        with torch.no_grad():
+            for begin in range(0, len(window_pairs), Config.QA_WINDOW_BATCH_SIZE):
+                outputs = self.qa_model(**{
+                    name: tensor[begin:begin + Config.QA_WINDOW_BATCH_SIZE]
+                    for name, tensor in encoded.items()
+                })
+                start_logits.append(outputs.start_logits)
+                end_logits.append(outputs.end_logits)
         
-        answer_tokens = inputs['input_ids'][0][start_index:end_index+1]
-        answer = self.qa_tokenizer.decode(answer_tokens)
+        floor = torch.finfo(torch.float32).min
+        start_logits = torch.cat(start_logits).float().masked_fill(~context_mask, floor).log_softmax(-1)
+        end_logits = torch.cat(end_logits).float().masked_fill(~context_mask, floor).log_softmax(-1)
         
-        return answer
+        # Score the top-k starts against the top-k ends of every window at
+        # once; spans that are reversed, too long or outside the context
+        # are masked out
+        k = min(Config.QA_TOP_K, start_logits.shape[1])
+        start_scores, start_index = start_logits.topk(k, dim=-1)
+        end_scores, end_index = end_logits.topk(k, dim=-1)
+        scores = start_scores[:, :, None] + end_scores[:, None, :]
+        length = end_index[:, None, :] - start_index[:, :, None]
+        valid = (
+            (length >= 0) & (length < Config.QA_MAX_ANSWER_TOKENS)
+            & context_mask.gather(1, start_index)[:, :, None]
+            & context_mask.gather(1, end_index)[:, None, :]
+        )
+        scores = scores.masked_fill(~valid, float('-inf')).flatten(1)
+        best_scores, best = scores.max(dim=1)
+        best_start = start_index.gather(1, (best // k)[:, None]).squeeze(1)
+        best_end = end_index.gather(1, (best % k)[:, None]).squeeze(1)
+        
+        # Keep the highest scoring window of each pair
+        spans = [{'answer': '', 'score': 0.0, 'start': 0, 'end': 0} for _ in pairs]
+        best_window_scores = [float('-inf')] * len(pairs)
+        for window, pair in enumerate(window_pairs):
+            score = float(best_scores[window])
+            if score > best_window_scores[pair]:
+                best_window_scores[pair] = score
+                start_char = int(offsets[window, best_start[window], 0])
+                end_char = int(offsets[window, best_end[window], 1])
+                spans[pair] = {
+                    'answer': contexts[pair][start_char:end_char],
+                    'score': math.exp(score),
+                    'start': start_char,
+                    'end': end_char,
+                }
+        
+        return spans
     
-    def update_context_memory(self, key: str, value: Any):
+    def update_context_memory(self, key: str, value: Any, session_id: str = 'global', ttl: float = None):
         """
         Store and manage contextual information
         """
-        self.context_memory[key] = {
-            'value': value,
-            'timestamp': np.datetime64('now')
-        }
+        self.context_memory.set(session_id, key, value, ttl)
     
-    def retrieve_context(self, key: str, max_age_minutes: int = 60) -> Any:
+    def retrieve_context(self, key: str, max_age_minutes: int = 60, session_id: str = 'global') -> Any:
         """
         Retrieve context with age validation
         """
-        if key not in self.context_memory:
-            return None
-        
-        current_time = np.datetime64('now')
-        memory_time = self.context_memory[key]['timestamp']
-        
-        # Check if memory is within max age
-        if (current_time - memory_time) / np.timedelta64(1, 'm') > max_age_minutes:
-            del self.context_memory[key]
-            return None
-        
-        return self.context_memory[key]['value']
+        return self.context_memory.get(session_id, key, max_age=max_age_minutes * 60)
     
     def intent_classification(self, text: str) -> Dict[str, float]:
         """
         Classify user intent with confidence scores
         """
+        return self.intents_from_doc(self.parse(text))
+    
+    @staticmethod
+    @timed('intents')
+    def intents_from_doc(doc) -> Dict[str, float]:
+        """
+        Rule-based intent scores from an already parsed document
+        """
         intents = {
             'task_automation': 0.0,
             'information_retrieval': 0.0,
@@ -99,17 +397,16 @@ class AdvancedNLPEngine:
             'general_conversation': 0.0
         }
         
-        # Basic intent classification using spaCy
-        doc = self.nlp(text.lower())
+        # Rule-based intent detection on lowercased tokens
+        tokens = {token.lower_ for token in doc}
         
-        # Rule-based intent detection
-        if any(token.text in ['automate', 'schedule', 'run'] for token in doc):
+        if tokens & {'automate', 'schedule', 'run'}:
             intents['task_automation'] = 0.8
         
-        if any(token.text in ['what', 'who', 'when', 'where', 'why', 'how'] for token in doc):
+        if tokens & {'what', 'who', 'when', 'where', 'why', 'how'}:
             intents['information_retrieval'] = 0.7
         
-        if any(token.text in ['open', 'close', 'start', 'stop', 'restart'] for token in doc):
+        if tokens & {'open', 'close', 'start', 'stop', 'restart'}:
             intents['system_control'] = 0.6
         
         # Default to general conversation if no strong intent detected
@@ -118,5 +415,45 @@ class AdvancedNLPEngine:
         
         return intents
 
-# Singleton instance for global use
-nlp_engine = AdvancedNLPEngine()
+class QueryAnalysis:
+    """
+    Per-query view over a single spaCy parse. Intents, entities and
+    sentiment are computed on first access and then reused by every
+    handler that touches the same query.
+    """
+    def __init__(self, engine: AdvancedNLPEngine, text: str, disable: Iterable[str] = None):
+        self.engine = engine
+        self.text = text
+        self.disable = disable
+    
+    @cached_property
+    def doc(self):
+        return self.engine.parse(self.text, self.disable)
+    
+    @cached_property
+    def intents(self) -> Dict[str, float]:
+        return self.engine.intents_from_doc(self.doc)
+    
+    @cached_property
+    def primary_intent(self) -> str:
+        return max(self.intents, key=self.intents.get)
+    
+    @cached_property
+    def entities(self) -> List[Dict[str, str]]:
+        return self.engine.entities_from_doc(self.doc)
+    
+    @cached_property
+    def vector(self) -> np.ndarray:
+        return self.doc.vector
+    
+    @cached_property
+    def sentiment(self) -> Dict[str, float]:
+        return self.engine.analyze_sentiment(self.text)
+
+# Singleton instance for global use. Web workers running against the shared
+# model server get a client with the same interface instead.
+if Config.USE_MODEL_SERVER:
+    from .model_client import ModelServerClient
+    nlp_engine = ModelServerClient()
+else:
+    nlp_engine = AdvancedNLPEngine()
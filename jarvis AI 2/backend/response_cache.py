@@ -0,0 +1,184 @@
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .config import Config
+
+# Words that do not change what a question asks for
+STOPWORDS = frozenset('''
+a an the this that these those is are was were be been being am do does did
+i me my you your we our it its he she they them his her their
+what whats which who whos whom whose where wheres when why how hows
+of in on at to for from by with about into over as and or
+can could would should will shall may might must tell please give show
+'''.split())
+
+class CacheEntry:
+    __slots__ = ('slot', 'response', 'expires_at', 'size', 'content')
+    
+    def __init__(self, slot: int, response: str, expires_at: float, size: int, content: frozenset):
+        self.slot = slot
+        self.response = response
+        self.expires_at = expires_at
+        self.size = size
+        self.content = content
+
+class SemanticResponseCache:
+    """
+    LRU + TTL response cache with exact and near-duplicate lookup.
+    
+    Exact hits match on normalized text. Near-duplicates are found with a
+    single matrix-vector product over a fixed-size matrix of unit-length
+    document vectors. A near-duplicate is only accepted when its content
+    words (the normalized words minus stopwords) are the same as the
+    query's: averaged word vectors score "capital of France" and "capital
+    of Germany" as near-identical, but they need different answers. The
+    most similar candidate above the threshold that passes this check wins.
+    """
+    def __init__(
+        self,
+        capacity: int = None,
+        similarity_threshold: float = None,
+        ttl: float = None,
+        max_bytes: int = None
+    ):
+        self.capacity = capacity or Config.RESPONSE_CACHE_CAPACITY
+        self.similarity_threshold = (
+            Config.RESPONSE_CACHE_SIMILARITY if similarity_threshold is None else similarity_threshold
+        )
+        self.ttl = ttl or Config.RESPONSE_CACHE_TTL
+        self.max_bytes = max_bytes or Config.RESPONSE_CACHE_MAX_BYTES
+        
+        # Key -> entry, in LRU order (oldest first)
+        self.entries = OrderedDict()
+        self.slot_keys = [None] * self.capacity
+        self.free_slots = list(range(self.capacity - 1, -1, -1))
+        self.bytes_used = 0
+        
+        # Allocated on first insert, once the vector width is known
+        self.vectors = None
+        self.has_vector = np.zeros(self.capacity, dtype=bool)
+        self.expires = np.zeros(self.capacity, dtype=np.float64)
+        
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def normalize(text: str) -> str:
+        return re.sub(r'\s+', ' ', re.sub(r'[^\w\s]', '', text.lower())).strip()
+    
+    @staticmethod
+    def content_words(key: str) -> frozenset:
+        return frozenset(word for word in key.split() if word not in STOPWORDS)
+    
+    @staticmethod
+    def _unit(vector) -> Optional[np.ndarray]:
+        if vector is None:
+            return None
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        # Texts made only of out-of-vocabulary tokens have zero vectors
+        return vector / norm if norm > 0 else None
+    
+    def get(self, text: str, vector=None) -> Optional[str]:
+        """
+        Return a cached response for the text or a near-duplicate of it
+        """
+        now = time.time()
+        key = self.normalize(text)
+        
+        entry = self.entries.get(key)
+        if entry is not None:
+            if entry.expires_at > now:
+                self.entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry.response
+            self._remove(key)
+        
+        unit = self._unit(vector)
+        if unit is not None and self.vectors is not None and unit.shape[0] == self.vectors.shape[1]:
+            live = self.has_vector & (self.expires > now)
+            if live.any():
+                scores = self.vectors @ unit
+                scores[~live] = -np.inf
+                candidates = np.flatnonzero(scores >= self.similarity_threshold)
+                if candidates.size:
+                    content = self.content_words(key)
+                    for slot in candidates[np.argsort(-scores[candidates])]:
+                        hit_key = self.slot_keys[slot]
+                        if self.entries[hit_key].content == content:
+                            self.entries.move_to_end(hit_key)
+                            self.semantic_hits += 1
+                            return self.entries[hit_key].response
+        
+        self.misses += 1
+        return None
+    
+    def put(self, text: str, response: str, vector=None):
+        """
+        Cache a response, evicting expired then least recently used entries
+        """
+        key = self.normalize(text)
+        size = len(key.encode()) + len(response.encode())
+        if size > self.max_bytes:
+            return
+        
+        if key in self.entries:
+            self._remove(key)
+        
+        self._purge_expired()
+        while not self.free_slots or self.bytes_used + size > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+        
+        slot = self.free_slots.pop()
+        expires_at = time.time() + self.ttl
+        self.entries[key] = CacheEntry(slot, response, expires_at, size, self.content_words(key))
+        self.slot_keys[slot] = key
+        self.expires[slot] = expires_at
+        self.bytes_used += size
+        
+        unit = self._unit(vector)
+        if unit is not None:
+            if self.vectors is None:
+                self.vectors = np.zeros((self.capacity, unit.shape[0]), dtype=np.float32)
+            if unit.shape[0] == self.vectors.shape[1]:
+                self.vectors[slot] = unit
+                self.has_vector[slot] = True
+    
+    def _remove(self, key: str):
+        entry = self.entries.pop(key)
+        self.slot_keys[entry.slot] = None
+        self.has_vector[entry.slot] = False
+        self.expires[entry.slot] = 0.0
+        self.free_slots.append(entry.slot)
+        self.bytes_used -= entry.size
+    
+    def _purge_expired(self):
+        occupied = self.expires > 0
+        expired = np.flatnonzero(occupied & (self.expires <= time.time()))
+        for slot in expired:
+            self._remove(self.slot_keys[slot])
+            self.evictions += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'capacity': self.capacity,
+            'bytes': self.bytes_used,
+            'matrix_bytes': self.vectors.nbytes if self.vectors is not None else 0,
+            'exact_hits': self.exact_hits,
+            'semantic_hits': self.semantic_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0,
+        }
+
+# Cache for information-retrieval answers
+response_cache = SemanticResponseCache()
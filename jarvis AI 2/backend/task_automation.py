@@ -1,10 +1,21 @@
 import os
-import schedule
-import time
+import asyncio
 import subprocess
+from datetime import timedelta
 from selenium import webdriver
 from typing import Dict, Any
 
+from .config import Config
+from .command_runner import command_runner, CommandResult, OutputCallback
+from .task_manager import task_manager
+
+# Named intervals accepted by TaskAutomator.schedule_task
+INTERVALS = {
+    'hourly': timedelta(hours=1),
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+
 class TaskAutomator:
     def __init__(self):
         self.scheduled_tasks = {}
@@ -18,27 +29,50 @@ class TaskAutomator:
     
     def schedule_task(self, task_name: str, function, interval: str):
         """
-        Schedule recurring tasks
+        Schedule recurring tasks on the shared task manager. The first run
+        is one interval from now; plain functions run on a worker thread.
+        Call from the event loop thread (or before the loop starts).
         """
-        if interval == 'daily':
-            schedule.every().day.do(function)
-        elif interval == 'hourly':
-            schedule.every().hour.do(function)
-        elif interval == 'weekly':
-            schedule.every().week.do(function)
+        if interval not in INTERVALS:
+            raise ValueError(f"Unknown interval {interval!r}; expected one of {sorted(INTERVALS)}")
+        
+        # Rescheduling a name replaces the previous schedule
+        if task_name in self.scheduled_tasks:
+            task_manager.remove_task(self.scheduled_tasks[task_name])
         
-        self.scheduled_tasks[task_name] = function
+        self.scheduled_tasks[task_name] = task_manager.add_task(
+            task_name,
+            function,
+            {'interval': INTERVALS[interval], 'immediate': False}
+        )
     
-    def execute_system_command(self, command: str) -> str:
+    def execute_system_command(self, command: str, timeout: float = None) -> str:
         """
         Execute system commands safely
         """
         try:
-            result = subprocess.run(command, shell=True, capture_output=True, text=True)
+            result = subprocess.run(
+                command, shell=True, capture_output=True, text=True,
+                timeout=timeout or Config.DEFAULT_TIMEOUT
+            )
             return result.stdout
         except Exception as e:
             return f"Error executing command: {str(e)}"
     
+    async def execute_system_command_async(
+        self,
+        command: str,
+        timeout: float = None,
+        on_output: OutputCallback = None
+    ) -> CommandResult:
+        """
+        Execute a system command without blocking the event loop.
+        
+        Output lines are passed to on_output(stream, line) as they arrive,
+        e.g. to forward them to a websocket.
+        """
+        return await command_runner.run(command, timeout=timeout, on_output=on_output)
+    
     def web_automation(self, url: str, actions: Dict[str, Any]):
         """
         Perform web automation tasks
@@ -63,11 +97,22 @@ class TaskAutomator:
     
     def run_scheduled_tasks(self):
         """
-        Run all scheduled tasks
+        Run all scheduled tasks.
+        
+        Scheduling is event driven: the task manager sleeps until the next
+        due task. Inside a running event loop this just makes sure the
+        manager is started; standalone, it blocks serving the schedule.
         """
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(self._serve_forever())
+            return
+        task_manager.start()
+    
+    async def _serve_forever(self):
+        task_manager.start()
+        await asyncio.Event().wait()
 
 # Example usage and predefined automation workflows
 def file_backup():
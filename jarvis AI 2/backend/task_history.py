@@ -0,0 +1,135 @@
+import json
+import os
+import threading
+from typing import Iterator, List, NamedTuple, Optional
+
+from .config import Config
+
+class ExecutionRecord(NamedTuple):
+    """
+    One task run; immutable and free of references to the task itself
+    """
+    task_id: str
+    started_at: float
+    duration: float
+    status: str
+    error: Optional[str] = None
+    
+    def to_json(self) -> str:
+        return json.dumps(self._asdict(), separators=(',', ':'))
+
+class TaskHistory:
+    """
+    Fixed-capacity ring buffer of recent execution records, mirrored to an
+    append-only JSON-lines log.
+    
+    Memory is bounded by the ring capacity. Records are appended to the
+    log in completion order, which is close to start order, so time-range
+    queries binary-search the file by byte offset instead of scanning it.
+    """
+    def __init__(self, capacity: int = None, log_path: Optional[str] = None):
+        self.capacity = capacity or Config.TASK_HISTORY_CAPACITY
+        self.log_path = Config.TASK_HISTORY_LOG if log_path is None else log_path
+        
+        self._ring: List[Optional[ExecutionRecord]] = [None] * self.capacity
+        self._next = 0
+        self._count = 0
+        
+        self._lock = threading.Lock()
+        self._log = None
+        if self.log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+            self._log = open(self.log_path, 'a', encoding='utf-8', buffering=1)
+    
+    def append(self, record: ExecutionRecord):
+        with self._lock:
+            self._ring[self._next] = record
+            self._next = (self._next + 1) % self.capacity
+            self._count = min(self._count + 1, self.capacity)
+            if self._log is not None:
+                self._log.write(record.to_json() + '\n')
+    
+    def recent(self, limit: int = 50) -> List[ExecutionRecord]:
+        """
+        Most recent records in the ring, oldest first
+        """
+        with self._lock:
+            limit = min(limit, self._count)
+            start = (self._next - limit) % self.capacity
+            if start + limit <= self.capacity:
+                return self._ring[start:start + limit]
+            return self._ring[start:] + self._ring[:self._next]
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def read_range(self, start: float, end: float = None, task_id: str = None) -> Iterator[ExecutionRecord]:
+        """
+        Stream records from the on-disk log with start <= started_at < end
+        """
+        if not self.log_path or not os.path.exists(self.log_path):
+            return
+        if self._log is not None:
+            self._log.flush()
+        
+        with open(self.log_path, 'rb') as log:
+            log.seek(self._seek_time(log, start))
+            for line in log:
+                try:
+                    record = ExecutionRecord(**json.loads(line))
+                except (ValueError, TypeError):
+                    # A torn final line after a crash
+                    continue
+                if end is not None and record.started_at >= end:
+                    # Allow for small completion-order skew before stopping
+                    if record.started_at >= end + Config.TASK_HISTORY_SKEW:
+                        break
+                    continue
+                if record.started_at < start:
+                    continue
+                if task_id is None or record.task_id == task_id:
+                    yield record
+    
+    @staticmethod
+    def _line_time(log, offset: int) -> Optional[float]:
+        """
+        started_at of the first complete line at or after offset
+        """
+        log.seek(offset)
+        if offset:
+            log.readline()
+        line = log.readline()
+        if not line:
+            return None
+        try:
+            return json.loads(line)['started_at']
+        except (ValueError, KeyError):
+            return None
+    
+    def _seek_time(self, log, start: float) -> int:
+        """
+        Byte offset of a line boundary shortly before the first record that
+        started at or after start (minus the allowed skew)
+        """
+        target = start - Config.TASK_HISTORY_SKEW
+        log.seek(0, os.SEEK_END)
+        low, high = 0, log.tell()
+        while high - low > 4096:
+            middle = (low + high) // 2
+            started_at = self._line_time(log, middle)
+            if started_at is not None and started_at < target:
+                low = middle
+            else:
+                high = middle
+        
+        # Align to the start of a line
+        log.seek(low)
+        if low:
+            log.readline()
+        return log.tell()
+    
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
@@ -1,97 +1,427 @@
 import asyncio
+import functools
+import heapq
+import inspect
+import itertools
 import json
-from typing import Dict, Any, Callable
-from datetime import datetime, timedelta
+import time
+from typing import Dict, Any, Callable, Optional
+from datetime import datetime
 import logging
 
+from .config import Config
+from .cron import parse_cron
+from .metrics import TASK_RUNS, TASK_RUN_SECONDS
+from .task_history import TaskHistory, ExecutionRecord
+from .task_store import TaskStore, encode_schedule, decode_schedule
+
 class SmartTaskManager:
-    def __init__(self):
+    """
+    Task registry driven by a single background scheduler loop.
+    
+    Upcoming runs are kept in a min-heap of (fire_time, seq, task_id). The
+    loop sleeps until the earliest deadline (or until a new, earlier task
+    is added), runs every due task under a concurrency limit and pushes
+    recurring tasks back with their next fire time. Cancelled or
+    rescheduled tasks leave stale heap entries that are skipped when they
+    surface, so insertion and cancellation stay O(log n).
+    
+    Tasks whose callable is registered by name (see register) are saved to
+    the task store and can be restored after a restart.
+    """
+    def __init__(self, max_concurrency: int = None, store: Optional[TaskStore] = None):
         self.tasks = {}
         self.recurring_tasks = {}
-        self.task_history = []
+        self.task_history = TaskHistory()
         self.logger = logging.getLogger('TaskManager')
+        self.max_concurrency = max_concurrency or Config.TASK_MAX_CONCURRENCY
+        
+        # Task name -> callable, used to re-bind persisted tasks
+        self.registry = {}
+        self.store = store
+        self._flush_timer = None
+        
+        self._heap = []
+        self._seq = itertools.count()
+        self._loop = None
+        self._wakeup = None
+        self._semaphore = None
+        self._runner = None
+        self._running = set()
+    
+    def register(self, name: str = None) -> Callable:
+        """
+        Decorator registering a task callable under a stable name so tasks
+        using it can be persisted and restored
+        """
+        def decorator(function: Callable) -> Callable:
+            self.registry[name or function.__name__] = function
+            return function
+        return decorator
     
     async def create_task(
         self, 
         name: str, 
-        function: Callable, 
-        schedule: Dict[str, Any] = None
+        function: Callable = None, 
+        schedule: Dict[str, Any] = None,
+        kwargs: Dict[str, Any] = None,
+        task_id: str = None
     ):
         """
         Create a sophisticated task with advanced scheduling
         """
-        task_id = f"{name}_{datetime.now().timestamp()}"
+        return self.add_task(name, function, schedule, kwargs, task_id)
+    
+    def add_task(
+        self,
+        name: str,
+        function: Callable = None,
+        schedule: Dict[str, Any] = None,
+        kwargs: Dict[str, Any] = None,
+        task_id: str = None
+    ) -> str:
+        """
+        Register a task and queue its first run; returns immediately.
+        
+        function defaults to the callable registered under name. Passing a
+        task_id that already exists (e.g. restored from the store) keeps
+        the existing task instead of creating a duplicate.
+        """
+        if task_id is not None and task_id in self.tasks:
+            return task_id
+        
+        if function is None:
+            if name not in self.registry:
+                raise ValueError(f"No task function registered as {name!r}")
+            function = self.registry[name]
+        
+        task_id = task_id or f"{name}_{datetime.now().timestamp()}_{next(self._seq)}"
         
         task_config = {
             'id': task_id,
             'name': name,
             'function': function,
+            'kwargs': kwargs or {},
             'created_at': datetime.now(),
             'schedule': schedule or {},
             'status': 'pending',
             'attempts': 0,
-            'max_attempts': 3
+            'failures': 0,
+            'max_attempts': Config.TASK_RETRY_LIMIT,
+            'next_run': None,
+            'last_run': None
         }
         
         self.tasks[task_id] = task_config
         
         if schedule:
-            await self._schedule_task(task_id, schedule)
+            self._schedule_task(task_id, schedule)
+        
+        if self._is_durable(task_config):
+            self.store.save(task_config)
         
         return task_id
     
-    async def _schedule_task(self, task_id: str, schedule: Dict[str, Any]):
+    def _is_durable(self, task: Dict[str, Any]) -> bool:
+        return self.store is not None and self.registry.get(task['name']) is task['function']
+    
+    def restore(self) -> int:
+        """
+        Reload persisted tasks and reschedule them, applying the catch-up
+        policy to runs missed while the process was down. Returns the
+        number of tasks scheduled.
+        """
+        if self.store is None:
+            return 0
+        
+        now = time.time()
+        policy = Config.TASK_CATCHUP_POLICY
+        restored = 0
+        for task in self.store.load_all():
+            if task['id'] in self.tasks:
+                continue
+            function = self.registry.get(task['name'])
+            if function is None:
+                self.logger.warning(f"Not restoring task {task['id']}: no function registered as {task['name']!r}")
+                continue
+            
+            task['function'] = function
+            self.tasks[task['id']] = task
+            if task['status'] in ('completed', 'failed') and 'interval' not in task['schedule'] and 'cron' not in task['schedule']:
+                # Finished one-shot task
+                continue
+            if task['failures'] >= task['max_attempts']:
+                continue
+            
+            next_run = task['next_run']
+            if next_run is None:
+                next_run = self._next_run(task['schedule'], task['last_run'])
+            elif next_run < now:
+                next_run = self._catch_up(task, next_run, now, policy)
+            if next_run is None:
+                task['status'] = 'missed'
+                self.store.update(task)
+                continue
+            
+            if 'interval' in task['schedule'] or 'cron' in task['schedule']:
+                self.recurring_tasks[task['id']] = task['schedule'].get('interval') or task['schedule']['cron']
+            task['next_run'] = next_run
+            # Bulk load: append now, heapify once below
+            self._heap.append((next_run, next(self._seq), task['id']))
+            restored += 1
+        
+        heapq.heapify(self._heap)
+        self._ensure_started()
+        if self._wakeup is not None:
+            self._wake()
+        self._request_flush()
+        return restored
+    
+    def _catch_up(self, task: Dict[str, Any], missed_at: float, now: float, policy: str) -> Optional[float]:
+        """
+        Next fire time for a task whose scheduled run passed while down.
+        
+        skip: drop missed runs and resume at the next regular slot
+        once: run once now, then resume the regular schedule
+        all:  replay each missed run (up to TASK_CATCHUP_LIMIT), then resume
+        """
+        schedule = task['schedule']
+        if policy == 'skip':
+            return self._next_run(schedule, missed_at)
+        
+        if policy == 'all' and 'interval' in schedule:
+            interval = schedule['interval'].total_seconds()
+            missed = int((now - missed_at) // interval) + 1
+            task['catch_up'] = min(missed, Config.TASK_CATCHUP_LIMIT) - 1
+        return now
+    
+    def _schedule_task(self, task_id: str, schedule: Dict[str, Any]):
         """
         Advanced task scheduling with multiple strategies
         """
-        if 'interval' in schedule:
-            await self._schedule_interval_task(task_id, schedule)
-        elif 'cron' in schedule:
-            await self._schedule_cron_task(task_id, schedule)
-        elif 'datetime' in schedule:
-            await self._schedule_datetime_task(task_id, schedule)
+        next_run = self._next_run(schedule, None)
+        if next_run is None:
+            self.logger.warning(f"Task {task_id} has no runnable schedule: {schedule}")
+            return
+        
+        if 'interval' in schedule or 'cron' in schedule:
+            self.recurring_tasks[task_id] = schedule.get('interval') or schedule['cron']
+        self._push(task_id, next_run)
     
-    async def _schedule_interval_task(self, task_id: str, schedule: Dict[str, Any]):
+    def _next_run(self, schedule: Dict[str, Any], last_run: Optional[float]) -> Optional[float]:
         """
-        Schedule tasks with interval-based repetition
+        Compute the next fire time (epoch seconds) after last_run, or the
+        first one when last_run is None
         """
-        interval = schedule.get('interval', timedelta(hours=1))
+        now = time.time()
+        
+        if 'interval' in schedule:
+            interval = schedule['interval'].total_seconds()
+            if last_run is None:
+                # Interval tasks run once immediately, then every interval,
+                # unless {'immediate': False} delays the first run
+                return now if schedule.get('immediate', True) else now + interval
+            next_run = last_run + interval
+            if next_run <= now:
+                # Missed runs are skipped rather than fired back to back
+                next_run += interval * (int((now - next_run) // interval) + 1)
+            return next_run
+        
+        if 'datetime' in schedule:
+            if last_run is not None:
+                return None
+            return schedule['datetime'].timestamp()
+        
+        if 'cron' in schedule:
+            # e.g. {'cron': '*/15 9-17 * * mon-fri', 'timezone': 'Europe/Berlin'}
+            cron = parse_cron(schedule['cron'], schedule.get('timezone', Config.CRON_TIMEZONE))
+            return cron.next_fire_time(now if last_run is None else max(last_run, now))
+        
+        return None
+    
+    def _push(self, task_id: str, fire_time: float):
+        task = self.tasks[task_id]
+        task['next_run'] = fire_time
+        self._record(task)
+        is_earliest = not self._heap or fire_time < self._heap[0][0]
+        heapq.heappush(self._heap, (fire_time, next(self._seq), task_id))
         
+        self._ensure_started()
+        if is_earliest and self._wakeup is not None:
+            self._wake()
+    
+    def _wake(self):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wakeup.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+    
+    def _ensure_started(self):
+        if self._runner is not None:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop yet; start() will pick up queued tasks
+            return
+        self.start()
+    
+    def start(self):
+        """
+        Start the scheduler loop on the running event loop
+        """
+        if self._runner is not None and not self._runner.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._runner = self._loop.create_task(self._run_loop())
+        self._request_flush()
+    
+    async def stop(self):
+        """
+        Stop the scheduler loop and wait for running tasks to finish
+        """
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if self.store is not None:
+            self.store.flush()
+    
+    def _record(self, task: Dict[str, Any]):
+        """
+        Queue a task's status for the next batched store write
+        """
+        if not self._is_durable(task):
+            return
+        pending = self.store.update(task)
+        if pending >= Config.TASK_STORE_BATCH_SIZE:
+            self._flush_now()
+        else:
+            self._request_flush()
+    
+    def _request_flush(self):
+        # Armed only while updates are pending, so an idle manager never wakes
+        if self._flush_timer is None and self._loop is not None and self.store is not None:
+            self._flush_timer = self._loop.call_later(Config.TASK_STORE_FLUSH_INTERVAL, self._flush_now)
+    
+    def _flush_now(self):
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if self._loop is None or self._loop.is_closed():
+            self.store.flush()
+            return
+        self._loop.run_in_executor(None, self.store.flush)
+    
+    def _is_current(self, fire_time: float, task_id: str) -> bool:
+        task = self.tasks.get(task_id)
+        return task is not None and task['next_run'] == fire_time
+    
+    async def _run_loop(self):
+        heap = self._heap
         while True:
-            task = self.tasks[task_id]
+            # Drop entries for cancelled or rescheduled tasks
+            while heap and not self._is_current(heap[0][0], heap[0][2]):
+                heapq.heappop(heap)
+            
+            self._wakeup.clear()
+            if not heap:
+                await self._wakeup.wait()
+                continue
+            
+            delay = heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            fire_time, _, task_id = heapq.heappop(heap)
+            if not self._is_current(fire_time, task_id):
+                continue
+            self.tasks[task_id]['next_run'] = None
+            
+            # Backpressure: wait for a free slot before dispatching
+            await self._semaphore.acquire()
+            execution = self._loop.create_task(self._execute(task_id, fire_time))
+            self._running.add(execution)
+            execution.add_done_callback(self._running.discard)
+    
+    async def _execute(self, task_id: str, fire_time: float):
+        try:
+            task = self.tasks.get(task_id)
+            if task is None:
+                return
+            
+            task['status'] = 'running'
+            task['attempts'] += 1
+            started_at = time.time()
+            task['last_run'] = started_at
+            started = time.perf_counter()
             try:
-                await task['function']()
+                await self._call(task['function'], task['kwargs'])
                 task['status'] = 'completed'
-                task['attempts'] += 1
-                self.task_history.append(task)
+                task['failures'] = 0
+                duration = time.perf_counter() - started
+                self.task_history.append(ExecutionRecord(task_id, started_at, duration, 'completed'))
+                TASK_RUNS.inc('completed')
+                TASK_RUN_SECONDS.observe(duration)
             except Exception as e:
                 task['status'] = 'failed'
+                task['failures'] += 1
                 self.logger.error(f"Task {task_id} failed: {e}")
+                duration = time.perf_counter() - started
+                self.task_history.append(ExecutionRecord(task_id, started_at, duration, 'failed', str(e)))
+                TASK_RUNS.inc('failed')
+                TASK_RUN_SECONDS.observe(duration)
                 
-                if task['attempts'] >= task['max_attempts']:
-                    break
+                if task['failures'] >= task['max_attempts']:
+                    self.recurring_tasks.pop(task_id, None)
+                    self._record(task)
+                    return
             
-            await asyncio.sleep(interval.total_seconds())
-    
-    async def _schedule_cron_task(self, task_id: str, schedule: Dict[str, Any]):
-        """
-        Implement cron-like scheduling
-        """
-        # Placeholder for advanced cron scheduling
-        pass
+            # The task may have been cancelled while it was running
+            if task_id not in self.tasks:
+                return
+            if task.get('catch_up'):
+                # Replaying runs missed while the process was down
+                task['catch_up'] -= 1
+                next_run = time.time()
+            else:
+                next_run = self._next_run(task['schedule'], fire_time)
+            if next_run is not None:
+                self._push(task_id, next_run)
+            else:
+                self._record(task)
+        finally:
+            self._semaphore.release()
     
-    async def _schedule_datetime_task(self, task_id: str, schedule: Dict[str, Any]):
+    async def _call(self, function: Callable, kwargs: Dict[str, Any]):
         """
-        Schedule task at a specific datetime
+        Await coroutine functions; run plain functions on the default
+        executor so blocking task code cannot stall the loop
         """
-        target_time = schedule.get('datetime')
-        
-        # Wait until target time
-        delay = (target_time - datetime.now()).total_seconds()
-        await asyncio.sleep(max(delay, 0))
-        
-        task = self.tasks[task_id]
-        await task['function']()
+        if inspect.iscoroutinefunction(function):
+            return await function(**kwargs)
+        result = await self._loop.run_in_executor(None, functools.partial(function, **kwargs))
+        if inspect.isawaitable(result):
+            result = await result
+        return result
     
     def list_tasks(self, status: str = None) -> list:
         """
@@ -108,15 +438,49 @@ class SmartTaskManager:
         """
         Retrieve recent task execution history
         """
-        return self.task_history[-limit:]
+        return self.task_history.recent(limit)
+    
+    def get_task_history_range(self, start: datetime, end: datetime = None, task_id: str = None) -> list:
+        """
+        Retrieve executions that started in [start, end) from the durable log
+        """
+        return list(self.task_history.read_range(
+            start.timestamp(), end.timestamp() if end else None, task_id
+        ))
     
     async def cancel_task(self, task_id: str):
         """
         Cancel a specific task
         """
+        self.remove_task(task_id)
+    
+    def remove_task(self, task_id: str):
         if task_id in self.tasks:
-            self.tasks[task_id]['status'] = 'cancelled'
-            del self.tasks[task_id]
+            task = self.tasks.pop(task_id)
+            task['status'] = 'cancelled'
+            self.recurring_tasks.pop(task_id, None)
+            if self._is_durable(task):
+                self.store.delete(task_id)
+            
+            # Compact once stale entries dominate the heap
+            if len(self._heap) > 2 * len(self.tasks) + 1024:
+                # In place: the scheduler loop holds a reference to the list
+                self._heap[:] = [
+                    entry for entry in self._heap
+                    if self._is_current(entry[0], entry[2])
+                ]
+                heapq.heapify(self._heap)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'tasks': len(self.tasks),
+            'recurring': len(self.recurring_tasks),
+            'queued': len(self._heap),
+            'running': len(self._running),
+            'max_concurrency': self.max_concurrency,
+            'next_run': self._heap[0][0] if self._heap else None,
+            'history': len(self.task_history),
+        }
     
     def export_task_config(self, task_id: str) -> str:
         """
@@ -127,9 +491,26 @@ class SmartTaskManager:
             return json.dumps({
                 'name': task['name'],
                 'created_at': str(task['created_at']),
-                'schedule': task['schedule']
+                'schedule': encode_schedule(task['schedule']),
+                'kwargs': task.get('kwargs') or {}
             })
         return None
+    
+    def import_task_config(self, config: str) -> str:
+        """
+        Create a task from export_task_config output; the task name must
+        be registered
+        """
+        data = json.loads(config)
+        return self.add_task(
+            data['name'],
+            schedule=decode_schedule(data.get('schedule') or {}),
+            kwargs=data.get('kwargs')
+        )
 
 # Singleton task manager
-task_manager = SmartTaskManager()
+if Config.TASK_COORDINATION == 'redis':
+    from .distributed_tasks import DistributedTaskManager
+    task_manager = DistributedTaskManager()
+else:
+    task_manager = SmartTaskManager(store=TaskStore() if Config.TASK_STORE_PATH else None)
@@ -0,0 +1,146 @@
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from .config import Config
+
+# Task fields persisted alongside the id; 'function' is not stored, tasks
+# are re-bound to their callable through the registry on restore
+COLUMNS = (
+    'name', 'kwargs', 'schedule', 'status', 'attempts', 'failures',
+    'max_attempts', 'created_at', 'next_run', 'last_run'
+)
+
+def encode_schedule(schedule: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    JSON-safe form of a schedule dict
+    """
+    encoded = dict(schedule)
+    if isinstance(encoded.get('interval'), timedelta):
+        encoded['interval'] = encoded['interval'].total_seconds()
+    if isinstance(encoded.get('datetime'), datetime):
+        encoded['datetime'] = encoded['datetime'].isoformat()
+    return encoded
+
+def decode_schedule(encoded: Dict[str, Any]) -> Dict[str, Any]:
+    schedule = dict(encoded)
+    if 'interval' in schedule and not isinstance(schedule['interval'], timedelta):
+        schedule['interval'] = timedelta(seconds=schedule['interval'])
+    if 'datetime' in schedule and isinstance(schedule['datetime'], str):
+        schedule['datetime'] = datetime.fromisoformat(schedule['datetime'])
+    return schedule
+
+class TaskStore:
+    """
+    SQLite (WAL mode) persistence for scheduled tasks.
+    
+    Creating or deleting a task is written immediately. Status and
+    next-run updates are coalesced per task and written in one transaction
+    by flush(), which the task manager calls on a short timer.
+    """
+    def __init__(self, path: str = None):
+        self.path = path or Config.TASK_STORE_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.closed = False
+        self.connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS tasks ('
+            'id TEXT PRIMARY KEY, name TEXT NOT NULL, kwargs TEXT, schedule TEXT, '
+            'status TEXT, attempts INTEGER, failures INTEGER, max_attempts INTEGER, '
+            'created_at REAL, next_run REAL, last_run REAL)'
+        )
+    
+    @staticmethod
+    def _row(task: Dict[str, Any]) -> tuple:
+        return (
+            task['id'],
+            task['name'],
+            json.dumps(task.get('kwargs') or {}),
+            json.dumps(encode_schedule(task['schedule'])),
+            task['status'],
+            task['attempts'],
+            task['failures'],
+            task['max_attempts'],
+            task['created_at'].timestamp(),
+            task.get('next_run'),
+            task.get('last_run'),
+        )
+    
+    def save(self, task: Dict[str, Any]):
+        """
+        Insert or replace a task right away
+        """
+        with self._lock:
+            self._pending.pop(task['id'], None)
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO tasks (id, {', '.join(COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (len(COLUMNS) + 1))})",
+                self._row(task)
+            )
+    
+    def update(self, task: Dict[str, Any]) -> int:
+        """
+        Queue the task's mutable fields for the next flush; returns the
+        number of pending updates
+        """
+        with self._lock:
+            self._pending[task['id']] = (
+                task['status'], task['attempts'], task['failures'],
+                task.get('next_run'), task.get('last_run'), task['id']
+            )
+            return len(self._pending)
+    
+    def flush(self) -> int:
+        """
+        Write all pending updates in a single transaction
+        """
+        with self._lock:
+            if self.closed or not self._pending:
+                return 0
+            rows = list(self._pending.values())
+            self._pending.clear()
+            with self.connection:
+                self.connection.execute('BEGIN')
+                self.connection.executemany(
+                    'UPDATE tasks SET status = ?, attempts = ?, failures = ?, '
+                    'next_run = ?, last_run = ? WHERE id = ?',
+                    rows
+                )
+            return len(rows)
+    
+    def delete(self, task_id: str):
+        with self._lock:
+            self._pending.pop(task_id, None)
+            self.connection.execute('DELETE FROM tasks WHERE id = ?', (task_id,))
+    
+    def load_all(self) -> List[Dict[str, Any]]:
+        """
+        All stored tasks as task dicts (without their callables)
+        """
+        with self._lock:
+            rows = self.connection.execute(
+                f"SELECT id, {', '.join(COLUMNS)} FROM tasks"
+            ).fetchall()
+        
+        tasks = []
+        for row in rows:
+            task = dict(zip(('id',) + COLUMNS, row))
+            task['kwargs'] = json.loads(task['kwargs'] or '{}')
+            task['schedule'] = decode_schedule(json.loads(task['schedule'] or '{}'))
+            task['created_at'] = datetime.fromtimestamp(task['created_at'])
+            tasks.append(task)
+        return tasks
+    
+    def close(self):
+        self.flush()
+        with self._lock:
+            self.closed = True
+            self.connection.close()
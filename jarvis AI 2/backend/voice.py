@@ -0,0 +1,260 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pyttsx3
+import speech_recognition as sr
+
+from .config import Config
+from .executors import execution_layer
+
+logger = logging.getLogger('Voice')
+
+SAMPLE_WIDTH = 2  # 16-bit PCM
+
+class EnergyVAD:
+    """
+    Energy-based voice activity detection over 16-bit mono PCM.
+    
+    Audio is cut into frame_ms frames and a frame counts as speech when
+    its RMS reaches the threshold. A segment opens on the first speech
+    frame (keeping padding_ms of audio before it) and closes after
+    silence_ms of non-speech or at max_segment_ms. Segments with less
+    than min_speech_ms of speech are dropped as noise.
+    """
+    def __init__(
+        self,
+        sample_rate: int = None,
+        threshold: float = None,
+        frame_ms: int = 30,
+        padding_ms: int = 300,
+        silence_ms: int = None,
+        min_speech_ms: int = None,
+        max_segment_ms: int = None
+    ):
+        self.sample_rate = sample_rate or Config.VOICE_SAMPLE_RATE
+        self.threshold = Config.VOICE_VAD_THRESHOLD if threshold is None else threshold
+        self.frame_samples = max(1, self.sample_rate * frame_ms // 1000)
+        self.frame_bytes = self.frame_samples * SAMPLE_WIDTH
+        
+        def frames(ms: int) -> int:
+            return max(1, ms // frame_ms)
+        
+        self.silence_frames = frames(silence_ms or Config.VOICE_VAD_SILENCE_MS)
+        self.min_speech_frames = frames(min_speech_ms or Config.VOICE_VAD_MIN_SPEECH_MS)
+        self.max_segment_frames = frames(max_segment_ms or Config.VOICE_MAX_SEGMENT_MS)
+        
+        self._pending = bytearray()
+        self._padding = deque(maxlen=frames(padding_ms))
+        self._segment = None
+        self._segment_frames = 0
+        self._speech_frames = 0
+        self._silent_frames = 0
+    
+    def feed(self, pcm: bytes) -> List[bytes]:
+        """
+        Add audio and return any segments it completed
+        """
+        self._pending += pcm
+        usable = len(self._pending) - len(self._pending) % self.frame_bytes
+        if not usable:
+            return []
+        
+        data = bytes(self._pending[:usable])
+        del self._pending[:usable]
+        
+        # RMS of every frame at once; only the state machine is per frame
+        samples = np.frombuffer(data, dtype='<i2').astype(np.float32).reshape(-1, self.frame_samples)
+        speech = np.sqrt(np.mean(samples * samples, axis=1)) >= self.threshold
+        
+        segments = []
+        for index, is_speech in enumerate(speech.tolist()):
+            frame = data[index * self.frame_bytes:(index + 1) * self.frame_bytes]
+            if self._segment is None:
+                if is_speech:
+                    self._segment = bytearray().join(self._padding)
+                    self._segment_frames = 0
+                    self._speech_frames = 0
+                    self._silent_frames = 0
+                else:
+                    self._padding.append(frame)
+                    continue
+            
+            self._segment += frame
+            self._segment_frames += 1
+            if is_speech:
+                self._speech_frames += 1
+                self._silent_frames = 0
+            else:
+                self._silent_frames += 1
+            
+            if self._silent_frames >= self.silence_frames or self._segment_frames >= self.max_segment_frames:
+                segments.extend(self._close())
+        
+        return segments
+    
+    def flush(self) -> List[bytes]:
+        """
+        Close the open segment at the end of the stream
+        """
+        self._pending.clear()
+        return self._close() if self._segment is not None else []
+    
+    def _close(self) -> List[bytes]:
+        segment = bytes(self._segment)
+        keep = self._speech_frames >= self.min_speech_frames
+        self._segment = None
+        self._padding.clear()
+        return [segment] if keep else []
+
+class SpeechRecognizer:
+    """
+    Offline transcription through speech_recognition (pocketsphinx by
+    default). Blocking; callers run it on the CPU pool.
+    """
+    def __init__(self, backend: str = None):
+        self.backend = backend or Config.VOICE_RECOGNIZER
+        self.recognizer = sr.Recognizer()
+    
+    def transcribe(self, pcm: bytes, sample_rate: int) -> str:
+        audio = sr.AudioData(pcm, sample_rate, SAMPLE_WIDTH)
+        try:
+            text = getattr(self.recognizer, f"recognize_{self.backend}")(audio)
+        except sr.UnknownValueError:
+            return ''
+        
+        # recognize_vosk returns its raw JSON result
+        if text.startswith('{'):
+            text = json.loads(text).get('text', '')
+        return text.strip()
+
+class SpeechSynthesizer:
+    """
+    Text-to-speech with a content-addressed WAV cache on disk.
+    
+    pyttsx3 engines are not thread-safe, so one engine lives on a
+    dedicated thread and every synthesis runs there. Cache hits are read
+    on the I/O pool and never wait for the engine. Files are named by
+    the hash of the voice settings and text; the least recently used
+    ones are pruned once the cache exceeds its byte budget.
+    """
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        self.cache_dir = cache_dir or Config.TTS_CACHE_DIRECTORY
+        self.max_bytes = Config.TTS_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix='jarvis-tts')
+        self._engine = None
+        self._cache_bytes = None
+        
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+    
+    def cache_path(self, text: str) -> str:
+        key = hashlib.sha256(
+            f"{Config.VOICE_TTS_VOICE}|{Config.VOICE_TTS_RATE}|{text}".encode()
+        ).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], f"{key}.wav")
+    
+    async def synthesize(self, text: str) -> bytes:
+        """
+        WAV audio for the text, from the cache when possible
+        """
+        path = self.cache_path(text)
+        audio = await execution_layer.run_io(self._read_cached, path)
+        if audio is not None:
+            self.hits += 1
+            return audio
+        
+        self.misses += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._synthesize, text, path)
+    
+    @staticmethod
+    def _read_cached(path: str) -> Optional[bytes]:
+        try:
+            with open(path, 'rb') as f:
+                audio = f.read()
+            # Refresh the mtime so pruning evicts least recently used files
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return audio
+    
+    def _synthesize(self, text: str, path: str) -> bytes:
+        # Runs on the TTS thread; an earlier queued call may have made it
+        audio = self._read_cached(path)
+        if audio is not None:
+            return audio
+        
+        if self._engine is None:
+            self._engine = pyttsx3.init()
+            if Config.VOICE_TTS_RATE:
+                self._engine.setProperty('rate', Config.VOICE_TTS_RATE)
+            if Config.VOICE_TTS_VOICE:
+                self._engine.setProperty('voice', Config.VOICE_TTS_VOICE)
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial_path = f"{path[:-len('.wav')]}.{uuid.uuid4().hex}.partial.wav"
+        try:
+            self._engine.save_to_file(text, partial_path)
+            self._engine.runAndWait()
+            with open(partial_path, 'rb') as f:
+                audio = f.read()
+            os.replace(partial_path, path)
+        finally:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        
+        self._account(len(audio))
+        return audio
+    
+    def _account(self, size: int):
+        if self._cache_bytes is None:
+            self._cache_bytes = sum(size for _, size, _ in self._cache_files())
+        else:
+            self._cache_bytes += size
+        
+        if self._cache_bytes > self.max_bytes:
+            # Prune to 90% of the budget so this does not run on every miss
+            logger.info(f"Pruning TTS cache at {self._cache_bytes} bytes")
+            for path, file_size, _ in sorted(self._cache_files(), key=lambda entry: entry[2]):
+                if self._cache_bytes <= self.max_bytes * 0.9:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    continue
+                self._cache_bytes -= file_size
+    
+    def _cache_files(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.wav') or name.endswith('.partial.wav'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'cache_bytes': self._cache_bytes,
+        }
+    
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+# Shared speech components
+speech_recognizer = SpeechRecognizer()
+speech_synthesizer = SpeechSynthesizer()
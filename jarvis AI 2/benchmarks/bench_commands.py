@@ -0,0 +1,65 @@
+"""
+Command runner benchmark: many short shell commands through
+AsyncCommandRunner at several concurrency caps, against a sequential
+blocking subprocess.run baseline:
+
+    python -m benchmarks.bench_commands --commands 500 --concurrency 1 4 8 16
+"""
+import argparse
+import asyncio
+import subprocess
+import time
+
+from .common import percentiles, print_table
+
+from backend.command_runner import AsyncCommandRunner
+
+COMMAND = 'echo benchmark'
+
+def bench_blocking(count: int) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(count):
+        began = time.perf_counter()
+        subprocess.run(COMMAND, shell=True, capture_output=True, text=True)
+        latencies.append(time.perf_counter() - began)
+    elapsed = time.perf_counter() - start
+    return {'runner': 'subprocess.run', 'concurrency': 1, 'commands_per_s': count / elapsed,
+            **_latency_columns(latencies)}
+
+async def bench_async(count: int, concurrency: int) -> dict:
+    runner = AsyncCommandRunner(max_concurrency=concurrency)
+    
+    async def timed():
+        # Latency includes time spent queued behind the concurrency cap
+        began = time.perf_counter()
+        result = await runner.run(COMMAND)
+        assert result.returncode == 0
+        return time.perf_counter() - began
+    
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(timed() for _ in range(count)))
+    elapsed = time.perf_counter() - start
+    return {'runner': 'async', 'concurrency': concurrency, 'commands_per_s': count / elapsed,
+            **_latency_columns(latencies)}
+
+def _latency_columns(latencies) -> dict:
+    stats = percentiles(latencies)
+    return {key: stats[key] for key in ('p50_ms', 'p95_ms', 'p99_ms')}
+
+async def run(count: int, levels):
+    rows = [bench_blocking(count)]
+    for concurrency in levels:
+        rows.append(await bench_async(count, concurrency))
+    print_table(f"{count} x {COMMAND!r}", rows)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the async command runner")
+    parser.add_argument('--commands', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8, 16])
+    args = parser.parse_args()
+    asyncio.run(run(args.commands, args.concurrency))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Cron benchmark: parse cost and next-fire-time computation over many
+schedules, including sparse ones (yearly, leap day) that would take
+hundreds of thousands of steps with minute-by-minute iteration:
+
+    python -m benchmarks.bench_cron --schedules 100000
+"""
+import argparse
+import random
+import time
+
+from .common import print_table, stopwatch
+
+from backend.cron import CronExpression
+
+def random_field(low: int, high: int) -> str:
+    kind = random.random()
+    if kind < 0.3:
+        return '*'
+    if kind < 0.5:
+        return f"*/{random.randint(2, max(2, (high - low) // 2))}"
+    if kind < 0.7:
+        start = random.randint(low, high - 1)
+        return f"{start}-{random.randint(start + 1, high)}"
+    if kind < 0.85:
+        return ','.join(str(v) for v in sorted(random.sample(range(low, high + 1), 3)))
+    return str(random.randint(low, high))
+
+def random_expression() -> str:
+    return ' '.join([
+        random_field(0, 59),
+        random_field(0, 23),
+        random_field(1, 28),
+        random_field(1, 12),
+        random_field(0, 6),
+    ])
+
+SPARSE = ['0 0 1 1 *', '0 0 29 2 *', '59 23 31 12 *', '0 0 13 * 5']
+
+def run(count: int, fires: int, timezone: str):
+    random.seed(42)
+    expressions = [random_expression() for _ in range(count)]
+    timings = {}
+    
+    with stopwatch(timings, 'parse'):
+        schedules = [CronExpression(expression, timezone) for expression in expressions]
+    
+    now = time.time()
+    with stopwatch(timings, 'next'):
+        for schedule in schedules:
+            schedule.next_fire_time(now)
+    
+    # Walk a chain of consecutive fire times for a subset
+    chain = schedules[:max(1, count // 100)]
+    with stopwatch(timings, 'chain'):
+        for schedule in chain:
+            moment = now
+            for _ in range(fires):
+                moment = schedule.next_fire_time(moment)
+    
+    rows = [{
+        'schedules': count,
+        'parse_us': timings['parse'] / count * 1e6,
+        'next_us': timings['next'] / count * 1e6,
+        'chain_next_us': timings['chain'] / (len(chain) * fires) * 1e6,
+    }]
+    
+    sparse_rows = []
+    for expression in SPARSE:
+        schedule = CronExpression(expression, timezone)
+        start = time.perf_counter()
+        for _ in range(1000):
+            schedule.next_fire_time(now)
+        sparse_rows.append({
+            'expression': expression,
+            'next_us': (time.perf_counter() - start) / 1000 * 1e6,
+        })
+    
+    print_table("Cron parse and next fire time", rows)
+    print_table("Sparse schedules", sparse_rows)
+    return rows + sparse_rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark cron next-fire computation")
+    parser.add_argument('--schedules', type=int, default=100000)
+    parser.add_argument('--fires', type=int, default=100, help="consecutive fire times per chained schedule")
+    parser.add_argument('--timezone', default='UTC')
+    args = parser.parse_args()
+    run(args.schedules, args.fires, args.timezone)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Latency, throughput and accuracy parity of the transformer inference
+backends (eager torch, int8 dynamic quantization, ONNX Runtime).
+
+Each backend runs the same padded batches; parity is measured against
+the eager model on the shared sample inputs:
+
+    python -m benchmarks.bench_inference_backends --tasks question-answering sentiment-analysis
+"""
+import argparse
+import itertools
+import time
+
+from .common import percentiles, print_table
+
+from backend import inference_backends
+from backend.config import Config
+
+def load_eager(task: str, model_name: str = None):
+    """
+    Eager model and tokenizer for a task, loaded the way the engine does
+    """
+    if task == 'question-answering':
+        from transformers import AutoModelForQuestionAnswering, AutoTokenizer
+        name = model_name or Config.QA_MODEL_NAME
+        return AutoModelForQuestionAnswering.from_pretrained(name).eval(), AutoTokenizer.from_pretrained(name)
+    
+    from transformers import pipeline
+    pipe = pipeline(task, model=model_name) if model_name else pipeline(task)
+    return pipe.model.eval(), pipe.tokenizer
+
+def encode_batch(tokenizer, task: str, size: int):
+    if task == 'question-answering':
+        pairs = list(itertools.islice(itertools.cycle(inference_backends.SAMPLE_QA), size))
+        return tokenizer(
+            [question for _, question in pairs], [context for context, _ in pairs],
+            padding=True, truncation='only_second', return_tensors='pt'
+        )
+    texts = list(itertools.islice(itertools.cycle(inference_backends.SAMPLE_TEXTS), size))
+    return tokenizer(texts, padding=True, truncation=True, return_tensors='pt')
+
+def time_model(model, encoded, iterations: int) -> dict:
+    import torch
+    
+    samples = []
+    with torch.no_grad():
+        model(**encoded)  # warm-up
+        for _ in range(iterations):
+            start = time.perf_counter()
+            model(**encoded)
+            samples.append(time.perf_counter() - start)
+    return percentiles(samples)
+
+def bench_task(task: str, model_name: str, batch_sizes, iterations: int, backends) -> list:
+    eager, tokenizer = load_eager(task, model_name)
+    output_names = list(inference_backends.TASK_OUTPUTS[task])
+    reference_inputs = inference_backends.encode_samples(tokenizer, task)
+    
+    variants = {}
+    for backend in backends:
+        start = time.perf_counter()
+        variants[backend] = inference_backends.prepare_model(eager, tokenizer, task, backend)
+        # prepare_model hands back the eager model itself for torch
+        if backend != 'torch':
+            print(f"{task}: prepared {backend} in {time.perf_counter() - start:.2f}s")
+    
+    rows = []
+    for backend, model in variants.items():
+        parity = inference_backends.parity_report(eager, model, reference_inputs, output_names)
+        for batch_size in batch_sizes:
+            stats = time_model(model, encode_batch(tokenizer, task, batch_size), iterations)
+            rows.append({
+                'task': task,
+                'backend': backend,
+                'batch': batch_size,
+                'p50_ms': stats['p50_ms'],
+                'p95_ms': stats['p95_ms'],
+                'items_per_s': batch_size / (stats['mean_ms'] / 1000),
+                'max_abs_diff': parity['max_abs_diff'],
+                'agreement': parity['agreement'],
+            })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare transformer inference backends")
+    parser.add_argument(
+        '--tasks', nargs='+', default=['question-answering', 'sentiment-analysis'],
+        choices=list(inference_backends.TASK_OUTPUTS)
+    )
+    parser.add_argument('--backends', nargs='+', default=list(inference_backends.BACKENDS),
+                        choices=list(inference_backends.BACKENDS))
+    parser.add_argument('--model', action='append', default=[], metavar='TASK=NAME',
+                        help="override the model for a task, e.g. ner=dslim/bert-base-NER")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+    
+    models = dict(override.split('=', 1) for override in args.model)
+    rows = []
+    for task in args.tasks:
+        rows.extend(bench_task(task, models.get(task), args.batch_sizes, args.iterations, args.backends))
+    print_table("Inference backends", rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Cost of a logging call on the calling thread.
+
+Logs --records INFO records (with a few arguments, as the backend does)
+from --threads threads through the synchronous FileHandler and through
+QueuedJSONHandler, and reports the per-call latency seen by the caller,
+the rate, and how many records the queued handler dropped:
+
+    python -m benchmarks.bench_logging --records 100000 --threads 4
+"""
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from .common import add_baseline_arguments, handle_baseline, percentiles, print_table
+
+from backend.log_writer import QueuedJSONHandler
+
+def make_handler(kind: str, directory: str, queue_size: int) -> logging.Handler:
+    path = os.path.join(directory, f"{kind}.log")
+    if kind == 'file':
+        handler = logging.FileHandler(path)
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        return handler
+    return QueuedJSONHandler(path, queue_size=queue_size)
+
+def bench(kind: str, records: int, threads: int, queue_size: int) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        handler = make_handler(kind, directory, queue_size)
+        logger = logging.getLogger(f'bench.{kind}')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        
+        per_thread = records // threads
+        samples = []
+        
+        def producer(index: int):
+            local = []
+            for number in range(per_thread):
+                started = time.perf_counter()
+                logger.info("Task %s finished in %.3fs for session %s", number, 0.125, index)
+                local.append(time.perf_counter() - started)
+            samples.extend(local)
+        
+        workers = [threading.Thread(target=producer, args=(index,)) for index in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+        
+        dropped = sum(handler.stats()['dropped'].values()) if kind == 'queued' else 0
+        logger.removeHandler(handler)
+        handler.close()
+    
+    latency = percentiles(samples)
+    return {
+        'handler': kind,
+        'records': per_thread * threads,
+        'p50_us': latency['p50_ms'] * 1000,
+        'p99_us': latency['p99_ms'] * 1000,
+        'records_per_s': per_thread * threads / elapsed,
+        'dropped': dropped,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark logging call overhead")
+    parser.add_argument('--records', type=int, default=50000)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--queue-size', type=int, default=10000)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+    
+    rows = [bench(kind, args.records, args.threads, args.queue_size) for kind in ('file', 'queued')]
+    print_table(f"Logging: {args.records} records from {args.threads} threads", rows)
+    settings = {'records': args.records, 'threads': args.threads, 'queue_size': args.queue_size}
+    handle_baseline(args, 'logging', rows, 'handler', settings)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Long-context question answering latency.
+
+Answers a question over generated documents of increasing length and
+reports windows per document and latency, which should grow roughly
+linearly with the number of windows:
+
+    python -m benchmarks.bench_long_qa --words 200 2000 10000 50000
+"""
+import argparse
+import random
+
+from .common import percentiles, print_table, stopwatch
+
+from backend.config import Config
+from backend.nlp_engine import AdvancedNLPEngine
+
+FILLER = (
+    "The quarterly report covers revenue, staffing and the data center migration. "
+    "Most teams met their targets and the backlog shrank over the summer. "
+).split()
+
+NEEDLE = "The backup server was moved to Frankfurt in March."
+
+def make_document(words: int, rng: random.Random) -> str:
+    tokens = [rng.choice(FILLER) for _ in range(words)]
+    tokens.insert(rng.randrange(len(tokens) + 1), NEEDLE)
+    return " ".join(tokens)
+
+def bench_size(engine: AdvancedNLPEngine, words: int, repeats: int, rng: random.Random) -> dict:
+    document = make_document(words, rng)
+    question = "Where was the backup server moved?"
+    windows = len(engine.qa_tokenizer(
+        question, document,
+        truncation='only_second', max_length=Config.QA_MAX_SEQ_LENGTH,
+        stride=Config.QA_DOC_STRIDE, return_overflowing_tokens=True
+    )['input_ids'])
+    
+    samples = []
+    for _ in range(repeats):
+        timing = {}
+        with stopwatch(timing, 'qa'):
+            span = engine.find_answer(document, question)
+        samples.append(timing['qa'])
+    
+    stats = percentiles(samples)
+    return {
+        'words': words,
+        'windows': windows,
+        'p50_ms': stats['p50_ms'],
+        'p95_ms': stats['p95_ms'],
+        'ms_per_window': stats['p50_ms'] / windows,
+        'found': bool(span['answer']) and span['answer'] in NEEDLE,
+        'score': span['score'],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sliding-window question answering")
+    parser.add_argument('--words', type=int, nargs='+', default=[200, 2000, 10000])
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+    
+    engine = AdvancedNLPEngine(preload=[])
+    engine.find_answer("Warm up context.", "What is this?")
+    
+    rng = random.Random(0)
+    rows = [bench_size(engine, words, args.repeats, rng) for words in args.words]
+    print_table(f"Long-context QA ({Config.QA_MODEL_NAME}, {Config.NLP_INFERENCE_BACKEND})", rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Microbenchmarks for the NLP engine entry points used on every query.
+
+Times intent_classification, extract_entities, analyze_sentiment and
+answer_question one call at a time (per-call latency), then the model
+calls again through the inference scheduler with concurrent callers
+(throughput with micro-batching):
+
+    python -m benchmarks.bench_nlp --iterations 200 --concurrency 32 --save baselines/nlp.json
+"""
+import argparse
+import asyncio
+import time
+
+from .common import add_baseline_arguments, handle_baseline, percentiles, print_table, stopwatch
+
+from backend.inference_scheduler import inference_scheduler
+from backend.nlp_engine import AdvancedNLPEngine, nlp_engine
+
+QUERIES = [
+    "What is the weather like in Berlin tomorrow?",
+    "Schedule a meeting with Alice at 3pm on Friday",
+    "Open the calendar and stop the music",
+    "I really enjoyed the concert last night, thank you!",
+    "Who founded Microsoft and when did Bill Gates retire?",
+]
+
+CONTEXT = (
+    "Jarvis is a voice assistant built with FastAPI and React. It classifies "
+    "each query into one of four intents, extracts named entities with spaCy "
+    "and answers questions about documents with a transformer model. The "
+    "backend was first deployed in Frankfurt in March 2023."
+)
+
+QUESTION = "Where was the backend first deployed?"
+
+def operations(engine: AdvancedNLPEngine):
+    return {
+        'intent_classification': lambda query: engine.intent_classification(query),
+        'extract_entities': lambda query: engine.extract_entities(query),
+        'analyze_sentiment': lambda query: engine.analyze_sentiment(query),
+        'answer_question': lambda query: engine.answer_question(CONTEXT, QUESTION),
+    }
+
+def bench_sequential(name: str, call, iterations: int) -> dict:
+    # One untimed call loads the model and warms caches
+    call(QUERIES[0])
+    
+    samples = []
+    started = time.perf_counter()
+    for index in range(iterations):
+        timing = {}
+        with stopwatch(timing, name):
+            call(QUERIES[index % len(QUERIES)])
+        samples.append(timing[name])
+    elapsed = time.perf_counter() - started
+    
+    stats = percentiles(samples)
+    return {
+        'operation': name,
+        'mode': 'sequential',
+        'calls': iterations,
+        'p50_ms': stats['p50_ms'],
+        'p95_ms': stats['p95_ms'],
+        'p99_ms': stats['p99_ms'],
+        'calls_per_s': iterations / elapsed,
+    }
+
+async def bench_batched(name: str, call, iterations: int, concurrency: int) -> dict:
+    samples = []
+    counter = iter(range(iterations))
+    
+    async def caller():
+        for index in counter:
+            started = time.perf_counter()
+            await call(QUERIES[index % len(QUERIES)])
+            samples.append(time.perf_counter() - started)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    
+    stats = percentiles(samples)
+    return {
+        'operation': name,
+        'mode': f'batched x{concurrency}',
+        'calls': iterations,
+        'p50_ms': stats['p50_ms'],
+        'p95_ms': stats['p95_ms'],
+        'p99_ms': stats['p99_ms'],
+        'calls_per_s': iterations / elapsed,
+    }
+
+async def run_batched(names, iterations: int, concurrency: int) -> list:
+    # spaCy parsing (intents, entities) is not micro-batched
+    calls = {
+        'analyze_sentiment': inference_scheduler.analyze_sentiment,
+        'answer_question': lambda query: inference_scheduler.answer_question(CONTEXT, QUESTION),
+    }
+    rows = []
+    for name in names:
+        if name in calls:
+            rows.append(await bench_batched(name, calls[name], iterations, concurrency))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the NLP engine entry points")
+    parser.add_argument('--operations', nargs='+', default=[
+        'intent_classification', 'extract_entities', 'analyze_sentiment', 'answer_question'
+    ])
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=16,
+                        help="concurrent callers through the inference scheduler, 0 to skip")
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+    
+    # The scheduler's batches run on the shared engine
+    available = operations(nlp_engine)
+    unknown = set(args.operations) - set(available)
+    if unknown:
+        parser.error(f"unknown operations: {', '.join(sorted(unknown))}")
+    
+    rows = [bench_sequential(name, available[name], args.iterations) for name in args.operations]
+    if args.concurrency:
+        rows += asyncio.run(run_batched(args.operations, args.iterations, args.concurrency))
+    print_table("NLP engine", rows)
+    
+    for row in rows:
+        row['case'] = f"{row['operation']} {row['mode']}"
+    handle_baseline(args, 'nlp', rows, 'case', {'iterations': args.iterations, 'concurrency': args.concurrency})
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Scheduler benchmark for SmartTaskManager.
+
+Registers N recurring tasks, cancels a fraction of them and fires a batch
+of due tasks, reporting per-operation cost at several sizes so the
+O(log n) scaling of insertion and cancellation is visible:
+
+    python -m benchmarks.bench_scheduler --sizes 1000 10000 100000 200000
+    python -m benchmarks.bench_scheduler --compare baselines/scheduler.json
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from .common import add_baseline_arguments, handle_baseline, print_table, stopwatch
+
+from backend.task_manager import SmartTaskManager
+
+async def noop():
+    pass
+
+async def bench_size(size: int, fire_count: int, concurrency: int) -> dict:
+    manager = SmartTaskManager(max_concurrency=concurrency)
+    timings = {}
+    
+    # Far-future fire times so registration cost is measured without runs
+    now = time.time()
+    fire_times = [
+        datetime.fromtimestamp(now + random.uniform(3600, 86400)) for _ in range(size)
+    ]
+    
+    with stopwatch(timings, 'insert'):
+        task_ids = [
+            manager.add_task('bench', noop, {'datetime': fire_time})
+            for fire_time in fire_times
+        ]
+    
+    cancelled = random.sample(task_ids, size // 2)
+    with stopwatch(timings, 'cancel'):
+        for task_id in cancelled:
+            manager.remove_task(task_id)
+    
+    # Fire a batch of immediately due tasks through the loop
+    done = asyncio.Event()
+    remaining = [fire_count]
+    
+    async def counted():
+        remaining[0] -= 1
+        if remaining[0] == 0:
+            done.set()
+    
+    with stopwatch(timings, 'fire'):
+        for _ in range(fire_count):
+            manager.add_task('due', counted, {'interval': timedelta(days=1)})
+        await done.wait()
+    
+    await manager.stop()
+    
+    return {
+        'tasks': size,
+        'insert_us': timings['insert'] / size * 1e6,
+        'cancel_us': timings['cancel'] / len(cancelled) * 1e6,
+        'fired': fire_count,
+        'fire_per_s': fire_count / timings['fire'],
+        'heap_after': len(manager._heap),
+    }
+
+async def run(sizes, fire_count: int, concurrency: int):
+    rows = []
+    for size in sizes:
+        rows.append(await bench_size(size, fire_count, concurrency))
+    print_table("SmartTaskManager scheduler", rows)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the heap-based task scheduler")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--fire', type=int, default=10000, help="due tasks fired per size")
+    parser.add_argument('--concurrency', type=int, default=64)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+    rows = asyncio.run(run(args.sizes, args.fire, args.concurrency))
+    handle_baseline(args, 'scheduler', rows, 'tasks', {'fire': args.fire, 'concurrency': args.concurrency})
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Task store benchmark: persist N registered tasks, then time how long a
+fresh SmartTaskManager takes to bulk-load and reschedule them, as after a
+backend restart:
+
+    python -m benchmarks.bench_task_store --tasks 1000 10000 50000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+
+from .common import print_table, stopwatch
+
+from backend.task_manager import SmartTaskManager
+from backend.task_store import TaskStore
+
+async def job(n: int):
+    pass
+
+async def bench(count: int, directory: str) -> dict:
+    path = os.path.join(directory, f"tasks_{count}.db")
+    timings = {}
+    
+    manager = SmartTaskManager(store=TaskStore(path))
+    manager.register('job')(job)
+    with stopwatch(timings, 'create'):
+        for n in range(count):
+            manager.add_task('job', schedule={'cron': '0 3 * * *'}, kwargs={'n': n})
+    await manager.stop()
+    with stopwatch(timings, 'flush'):
+        manager.store.flush()
+    manager.store.close()
+    
+    restarted = SmartTaskManager(store=TaskStore(path))
+    restarted.register('job')(job)
+    with stopwatch(timings, 'restore'):
+        restored = restarted.restore()
+    await restarted.stop()
+    restarted.store.close()
+    
+    return {
+        'tasks': count,
+        'create_us': timings['create'] / count * 1e6,
+        'flush_ms': timings['flush'] * 1000,
+        'restored': restored,
+        'restore_ms': timings['restore'] * 1000,
+    }
+
+async def run(sizes):
+    with tempfile.TemporaryDirectory() as directory:
+        rows = [await bench(size, directory) for size in sizes]
+    print_table("Task store restart recovery", rows)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark task persistence and restart recovery")
+    parser.add_argument('--tasks', type=int, nargs='+', default=[1000, 10000])
+    args = parser.parse_args()
+    asyncio.run(run(args.tasks))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+End-to-end latency of the /ws/voice endpoint.
+
+Streams a 16-bit mono WAV utterance to a running backend and measures,
+from the moment the utterance has been sent, how long the transcript,
+the text response and the synthesized audio take to arrive. Later
+iterations hit the TTS cache when the reply repeats (for example with
+the fake OpenAI server):
+
+    python -m benchmarks.bench_voice --url ws://localhost:8000/ws/voice --audio hello.wav
+
+Without --audio the utterance is synthesized locally with pyttsx3.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import wave
+
+import websockets
+
+from .common import percentiles, print_table
+
+def load_wav(path: str):
+    with wave.open(path, 'rb') as wav:
+        if wav.getsampwidth() != 2 or wav.getnchannels() != 1:
+            raise SystemExit(f"{path}: expected 16-bit mono PCM")
+        return wav.readframes(wav.getnframes()), wav.getframerate()
+
+def synthesize_utterance(text: str):
+    import pyttsx3
+    
+    path = os.path.join(tempfile.mkdtemp(), 'utterance.wav')
+    engine = pyttsx3.init()
+    engine.save_to_file(text, path)
+    engine.runAndWait()
+    return load_wav(path)
+
+async def run_once(url: str, pcm: bytes, sample_rate: int, chunk_ms: int, realtime: bool) -> dict:
+    chunk_bytes = sample_rate * chunk_ms // 1000 * 2
+    # Trailing silence so the VAD closes the utterance without an end frame
+    pcm = pcm + bytes(sample_rate * 2)
+    
+    async with websockets.connect(url, max_size=None) as websocket:
+        await websocket.send(json.dumps({'type': 'start', 'sample_rate': sample_rate}))
+        for offset in range(0, len(pcm), chunk_bytes):
+            await websocket.send(pcm[offset:offset + chunk_bytes])
+            if realtime:
+                await asyncio.sleep(chunk_ms / 1000)
+        await websocket.send(json.dumps({'type': 'end'}))
+        sent = time.perf_counter()
+        
+        timings = {}
+        while 'audio' not in timings:
+            message = await asyncio.wait_for(websocket.recv(), timeout=60)
+            elapsed = time.perf_counter() - sent
+            if isinstance(message, bytes):
+                timings['audio'] = elapsed
+                continue
+            frame = json.loads(message)
+            if frame['type'] == 'error':
+                raise RuntimeError(frame['error'])
+            timings.setdefault(frame['type'], elapsed)
+        return timings
+
+async def run(url: str, pcm: bytes, sample_rate: int, iterations: int, chunk_ms: int, realtime: bool):
+    results = [await run_once(url, pcm, sample_rate, chunk_ms, realtime) for _ in range(iterations)]
+    
+    rows = []
+    for stage in ('transcript', 'response', 'audio'):
+        stats = percentiles([timings[stage] for timings in results if stage in timings])
+        rows.append({'stage': stage, **stats})
+    rows.append({'stage': 'audio (first run)', **percentiles([results[0]['audio']])})
+    print_table(f"Voice round trip ({len(pcm) / 2 / sample_rate:.1f}s utterance, ms after last audio)", rows)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the voice websocket end to end")
+    parser.add_argument('--url', default='ws://localhost:8000/ws/voice')
+    parser.add_argument('--audio', help="16-bit mono WAV file with one utterance")
+    parser.add_argument('--text', default="What is the capital of France?",
+                        help="phrase to synthesize when --audio is not given")
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--chunk-ms', type=int, default=100)
+    parser.add_argument('--realtime', action='store_true', help="pace chunks at playback speed")
+    args = parser.parse_args()
+    
+    pcm, sample_rate = load_wav(args.audio) if args.audio else synthesize_utterance(args.text)
+    asyncio.run(run(args.url, pcm, sample_rate, args.iterations, args.chunk_ms, args.realtime))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Load generator for the /ws endpoint.
+
+Opens N concurrent connections, each sending framed requests one after
+another drawn from a weighted mix of the four intents, and reports
+latency percentiles and requests per second overall and per intent.
+Streaming requests also report the time to the first chunk:
+
+    python -m benchmarks.bench_ws_load --spawn --llm-latency-ms 300 --connections 50 --duration 30
+
+With --spawn the fake OpenAI server and the backend are started as
+subprocesses (task persistence disabled) and stopped afterwards;
+otherwise --url must point at a running backend. Task automation
+queries create hourly tasks on the target backend.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+import httpx
+import websockets
+
+from .common import add_baseline_arguments, handle_baseline, percentiles, print_table
+
+# Queries the rule-based classifier files under each intent
+QUERIES = {
+    'information_retrieval': [
+        "What is the capital of France?",
+        "Who wrote the theory of relativity?",
+        "How does a heat pump work?",
+        "Why is the sky blue?",
+    ],
+    'general_conversation': [
+        "Tell me a joke",
+        "I had a long day at the office",
+        "Good morning Jarvis",
+    ],
+    'system_control': [
+        "Open the browser",
+        "Stop the music",
+        "Restart the media server",
+    ],
+    'task_automation': [
+        "Schedule a backup of my documents",
+        "Automate the weekly report",
+    ],
+}
+
+DEFAULT_MIX = 'information_retrieval=4,general_conversation=3,system_control=2,task_automation=1'
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(','):
+        intent, _, weight = part.partition('=')
+        intent = intent.strip()
+        if intent not in QUERIES:
+            raise SystemExit(f"Unknown intent in --mix: {intent}")
+        weights[intent] = float(weight or 1)
+    return weights
+
+class LoadStats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.first_chunk = defaultdict(list)
+        self.outcomes = defaultdict(Counter)
+
+async def connection_worker(
+    url: str,
+    index: int,
+    weights: Dict[str, float],
+    stream: bool,
+    unique: bool,
+    stop_at: float,
+    max_requests: int,
+    stats: LoadStats
+):
+    rng = random.Random(index)
+    intents = list(weights)
+    cumulative = list(itertools.accumulate(weights.values()))
+    
+    async with websockets.connect(url, max_size=None) as websocket:
+        for number in itertools.count():
+            if time.perf_counter() >= stop_at or (max_requests and number >= max_requests):
+                return
+            
+            intent = rng.choices(intents, cum_weights=cumulative)[0]
+            query = rng.choice(QUERIES[intent])
+            if unique:
+                # Keep the response cache from answering repeated questions
+                query = f"{query} (connection {index} request {number})"
+            request_id = str(number)
+            
+            started = time.perf_counter()
+            first_chunk = None
+            await websocket.send(json.dumps({'id': request_id, 'query': query, 'stream': stream}))
+            while True:
+                frame = json.loads(await websocket.recv())
+                if frame.get('id') != request_id:
+                    continue
+                if frame['type'] == 'chunk':
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter() - started
+                    continue
+                break
+            
+            outcome = 'ok' if frame['type'] in ('response', 'end') else frame['type']
+            stats.outcomes[intent][outcome] += 1
+            if outcome == 'ok':
+                stats.latencies[intent].append(time.perf_counter() - started)
+                if first_chunk is not None:
+                    stats.first_chunk[intent].append(first_chunk)
+            elif outcome == 'busy':
+                await asyncio.sleep(frame.get('retry_after', 0.1))
+
+async def run_load(args, weights: Dict[str, float]) -> List[dict]:
+    stats = LoadStats()
+    started = time.perf_counter()
+    stop_at = started + args.duration if args.duration else float('inf')
+    await asyncio.gather(*(
+        connection_worker(
+            args.url, index, weights, args.stream, not args.repeat_queries,
+            stop_at, args.requests, stats
+        )
+        for index in range(args.connections)
+    ))
+    elapsed = time.perf_counter() - started
+    
+    rows = []
+    for intent in list(weights) + ['all']:
+        if intent == 'all':
+            latencies = [value for values in stats.latencies.values() for value in values]
+            first_chunk = [value for values in stats.first_chunk.values() for value in values]
+            outcomes = sum(stats.outcomes.values(), Counter())
+        else:
+            latencies = stats.latencies[intent]
+            first_chunk = stats.first_chunk[intent]
+            outcomes = stats.outcomes[intent]
+        
+        latency = percentiles(latencies)
+        rows.append({
+            'intent': intent,
+            'ok': outcomes['ok'],
+            'busy': outcomes['busy'],
+            'errors': outcomes['error'],
+            'rps': outcomes['ok'] / elapsed,
+            'p50_ms': latency.get('p50_ms', 0.0),
+            'p95_ms': latency.get('p95_ms', 0.0),
+            'p99_ms': latency.get('p99_ms', 0.0),
+            'first_chunk_p50_ms': percentiles(first_chunk).get('p50_ms', 0.0),
+        })
+    
+    print_table(
+        f"/ws load: {args.connections} connections, {elapsed:.1f}s, "
+        f"{'streaming' if args.stream else 'non-streaming'}",
+        rows
+    )
+    return rows
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"{' '.join(process.args)} exited with {process.returncode}")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise SystemExit(f"{url} not ready after {timeout:.0f}s")
+
+def spawn_stack(args) -> List[subprocess.Popen]:
+    """
+    Start the fake OpenAI server and a backend pointed at it
+    """
+    fake = subprocess.Popen([
+        sys.executable, '-m', 'benchmarks.fake_openai_server',
+        '--port', str(args.llm_port), '--latency-ms', str(args.llm_latency_ms),
+        '--token-delay-ms', str(args.llm_token_delay_ms),
+    ])
+    env = dict(
+        os.environ,
+        OPENAI_API_BASE=f"http://127.0.0.1:{args.llm_port}/v1",
+        TASK_STORE_PATH='',
+        TASK_HISTORY_LOG='',
+    )
+    backend = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'backend.main:app', '--port', str(args.port), '--log-level', 'warning'],
+        env=env
+    )
+    processes = [fake, backend]
+    try:
+        wait_until_ready(f"http://127.0.0.1:{args.port}/ready", backend, args.startup_timeout)
+    except BaseException:
+        stop_stack(processes)
+        raise
+    args.url = f"ws://127.0.0.1:{args.port}/ws"
+    return processes
+
+def stop_stack(processes: List[subprocess.Popen]):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the /ws endpoint")
+    parser.add_argument('--url', default='ws://localhost:8000/ws')
+    parser.add_argument('--connections', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=20.0, help="seconds; 0 runs until --requests are sent")
+    parser.add_argument('--requests', type=int, default=0, help="requests per connection, 0 for no limit")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help="intent=weight pairs, comma separated")
+    parser.add_argument('--stream', action='store_true', help="request streamed replies")
+    parser.add_argument('--repeat-queries', action='store_true',
+                        help="send the sample queries verbatim so the response cache can answer repeats")
+    parser.add_argument('--spawn', action='store_true', help="start the fake OpenAI server and a backend")
+    parser.add_argument('--port', type=int, default=8100, help="backend port with --spawn")
+    parser.add_argument('--llm-port', type=int, default=8101, help="fake OpenAI port with --spawn")
+    parser.add_argument('--llm-latency-ms', type=float, default=200.0)
+    parser.add_argument('--llm-token-delay-ms', type=float, default=20.0)
+    parser.add_argument('--startup-timeout', type=float, default=300.0)
+    add_baseline_arguments(parser)
+    args = parser.parse_args()
+    if not args.duration and not args.requests:
+        parser.error("--duration 0 needs --requests")
+    
+    weights = parse_mix(args.mix)
+    processes = spawn_stack(args) if args.spawn else []
+    try:
+        rows = asyncio.run(run_load(args, weights))
+    finally:
+        stop_stack(processes)
+    
+    settings = {
+        name: getattr(args, name)
+        for name in ('connections', 'duration', 'requests', 'mix', 'stream', 'llm_latency_ms')
+    }
+    handle_baseline(args, 'ws_load', rows, 'intent', settings)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks are run from the project root, e.g.
+    python -m benchmarks.bench_scheduler
+
+Scripts that take --save/--compare write their rows to a JSON baseline
+and later check a run against it, exiting non-zero on regressions.
+"""
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List
+
+# backend.config validates the API key at import time; benchmarks never
+# reach the real API
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """
+    p50/p95/p99/mean/max of a list of latencies (seconds) in milliseconds
+    """
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    
+    def pick(p: float) -> float:
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index] * 1000
+    
+    return {
+        'count': len(ordered),
+        'mean_ms': statistics.fmean(ordered) * 1000,
+        'p50_ms': pick(50),
+        'p95_ms': pick(95),
+        'p99_ms': pick(99),
+        'max_ms': ordered[-1] * 1000,
+    }
+
+@contextmanager
+def stopwatch(results: Dict[str, float], name: str):
+    """
+    Record the wall time of a block into results[name] (seconds)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        results[name] = time.perf_counter() - start
+
+def print_table(title: str, rows: List[Dict[str, object]]):
+    """
+    Print a list of flat dicts as an aligned table
+    """
+    print(f"\n{title}")
+    if not rows:
+        print("  (no results)")
+        return
+    columns = list(rows[0])
+    widths = {
+        column: max(len(column), *(len(_format(row.get(column))) for row in rows))
+        for column in columns
+    }
+    print("  " + "  ".join(column.rjust(widths[column]) for column in columns))
+    for row in rows:
+        print("  " + "  ".join(_format(row.get(column)).rjust(widths[column]) for column in columns))
+
+def _format(value) -> str:
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value)
+
+def add_baseline_arguments(parser):
+    parser.add_argument('--save', metavar='PATH', help="write the results to a JSON baseline")
+    parser.add_argument('--compare', metavar='PATH', help="compare the results with a saved baseline")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="relative slowdown reported as a regression (default 0.10)")
+
+def save_baseline(path: str, benchmark: str, rows: List[Dict[str, object]], key: str, settings: Dict = None):
+    """
+    Write benchmark rows to a JSON baseline, keyed by the given column
+    """
+    baseline = {
+        'benchmark': benchmark,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'settings': settings or {},
+        'results': {str(row[key]): row for row in rows},
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+    print(f"\nBaseline written to {path}")
+
+def _direction(metric: str) -> int:
+    """
+    +1 when larger values are better, -1 when smaller are, 0 otherwise.
+    The maximum is a single sample and too noisy to compare.
+    """
+    if metric == 'max_ms':
+        return 0
+    if metric.endswith(('_ms', '_us')):
+        return -1
+    if metric == 'rps' or metric.endswith('_per_s'):
+        return 1
+    return 0
+
+def compare_baseline(
+    path: str,
+    rows: List[Dict[str, object]],
+    key: str,
+    tolerance: float = 0.10,
+    settings: Dict = None
+) -> List[str]:
+    """
+    Print current against baseline figures and return the regressions:
+    latencies that grew, or throughputs that shrank, by more than the
+    tolerance
+    """
+    with open(path) as f:
+        baseline = json.load(f)
+    
+    if settings is not None:
+        # Round-trip through JSON so tuples and lists compare equal
+        settings = json.loads(json.dumps(settings))
+        for name in sorted(set(settings) | set(baseline['settings'])):
+            if settings.get(name) != baseline['settings'].get(name):
+                print(f"\nWarning: {name} is {settings.get(name)!r}, "
+                      f"the baseline used {baseline['settings'].get(name)!r}")
+    
+    table = []
+    regressions = []
+    for row in rows:
+        previous = baseline['results'].get(str(row[key]))
+        if previous is None:
+            continue
+        for metric, value in row.items():
+            direction = _direction(metric)
+            old = previous.get(metric)
+            if not direction or not isinstance(value, (int, float)) or not old:
+                continue
+            change = (value - old) / old
+            regressed = -direction * change > tolerance
+            table.append({
+                key: row[key],
+                'metric': metric,
+                'baseline': float(old),
+                'current': float(value),
+                'change_%': change * 100,
+                'status': 'REGRESSED' if regressed else 'ok',
+            })
+            if regressed:
+                regressions.append(f"{row[key]} {metric}: {old:.3f} -> {value:.3f} ({change * 100:+.1f}%)")
+    
+    print_table(f"Against baseline {path} ({baseline['created']})", table)
+    return regressions
+
+def handle_baseline(args, benchmark: str, rows: List[Dict[str, object]], key: str, settings: Dict = None):
+    """
+    Apply --save/--compare for a finished run; exits 1 on regressions
+    """
+    if args.save:
+        save_baseline(args.save, benchmark, rows, key, settings)
+    if args.compare:
+        regressions = compare_baseline(args.compare, rows, key, args.tolerance, settings)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
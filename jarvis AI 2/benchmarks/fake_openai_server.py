@@ -0,0 +1,91 @@
+"""
+Local stand-in for the OpenAI chat-completions API.
+
+Serves POST /v1/chat/completions in both plain and streaming (server-sent
+events) form with configurable latency, so the backend can be exercised
+without network access or API cost:
+
+    python benchmarks/fake_openai_server.py --port 8001 --latency-ms 300
+    OPENAI_API_BASE=http://127.0.0.1:8001/v1 uvicorn backend.main:app
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import uvicorn
+
+# Time to first token, delay between streamed tokens, and reply length
+LATENCY_MS = float(os.getenv('FAKE_LLM_LATENCY_MS', '200'))
+TOKEN_DELAY_MS = float(os.getenv('FAKE_LLM_TOKEN_DELAY_MS', '20'))
+REPLY_TOKENS = int(os.getenv('FAKE_LLM_REPLY_TOKENS', '40'))
+
+app = FastAPI()
+
+def make_reply(messages: list) -> list:
+    """
+    Deterministic reply tokens derived from the last user message
+    """
+    prompt = messages[-1]['content'] if messages else ''
+    words = (prompt.split() or ['ok']) * REPLY_TOKENS
+    return [f"{word} " for word in words[:REPLY_TOKENS]]
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    tokens = make_reply(body.get('messages', []))
+    model = body.get('model', 'fake-model')
+    created = int(time.time())
+    
+    await asyncio.sleep(LATENCY_MS / 1000)
+    
+    if not body.get('stream'):
+        return JSONResponse({
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion',
+            'created': created,
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': ''.join(tokens)},
+                'finish_reason': 'stop'
+            }]
+        })
+    
+    async def events():
+        for token in tokens:
+            chunk = {
+                'id': 'chatcmpl-fake',
+                'object': 'chat.completion.chunk',
+                'created': created,
+                'model': model,
+                'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            await asyncio.sleep(TOKEN_DELAY_MS / 1000)
+        yield "data: [DONE]\n\n"
+    
+    return StreamingResponse(events(), media_type='text/event-stream')
+
+def main():
+    global LATENCY_MS, TOKEN_DELAY_MS, REPLY_TOKENS
+    
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency-ms', type=float, default=LATENCY_MS)
+    parser.add_argument('--token-delay-ms', type=float, default=TOKEN_DELAY_MS)
+    parser.add_argument('--reply-tokens', type=int, default=REPLY_TOKENS)
+    args = parser.parse_args()
+    
+    LATENCY_MS = args.latency_ms
+    TOKEN_DELAY_MS = args.token_delay_ms
+    REPLY_TOKENS = args.reply_tokens
+    
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
+
+if __name__ == "__main__":
+    main()
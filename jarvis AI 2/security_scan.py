@@ -1,34 +1,199 @@
+import argparse
+import hashlib
+import json
+import mmap
 import os
 import re
 import subprocess
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
-def check_hardcoded_secrets(directory):
+# Each pattern names the group reported as the match
+SECRET_PATTERNS = {
+    'assignment': rb'(?P<assignment>api_key|password|secret|token)\s*=\s*[\'"][^\'"]+[\'"]\s*',  # Basic secret detection
+    'credentials_url': rb'(?P<credentials_url>https?://[^:]+:[^@]+@)',  # URL with credentials
+}
+
+# One alternation scans each file in a single pass
+SECRET_REGEX = re.compile(b'|'.join(SECRET_PATTERNS.values()), re.IGNORECASE)
+
+# Every match contains one of these (lowercased); substring search is far
+# faster than the case-insensitive regex, so most files skip the regex
+SECRET_KEYWORDS = (b'api_key', b'password', b'secret', b'token', b'://')
+
+SCANNED_EXTENSIONS = ('.py', '.js', '.json', '.yml', '.yaml', '.env')
+
+# Dependencies, build output and tool caches; more can be added with
+# --exclude
+IGNORED_DIRECTORIES = {
+    '.git', 'node_modules', '__pycache__', '.venv', 'venv', 'build', 'dist',
+    '.cache', '.mypy_cache', '.pytest_cache', '.tox',
+}
+
+# Files at least this large are memory-mapped instead of read, and
+# checked for keywords a window at a time
+MMAP_THRESHOLD = 1024 * 1024
+WINDOW_SIZE = 4 * 1024 * 1024
+
+# Below this many files a process pool costs more than it saves
+PARALLEL_THRESHOLD = 64
+BATCH_SIZE = 32
+
+# The cache lives outside the scanned tree, one file per directory, and
+# never holds matched text: only digests and the lines that matched
+CACHE_DIRECTORY = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'jarvis-security-scan'
+)
+# Cached results are only valid for the patterns that produced them
+CACHE_VERSION = hashlib.sha256(SECRET_REGEX.pattern).hexdigest()[:16]
+
+def default_cache_path(directory: str) -> str:
+    key = hashlib.sha256(os.path.abspath(directory).encode()).hexdigest()[:16]
+    return os.path.join(CACHE_DIRECTORY, f"{key}.json")
+
+def might_contain_secrets(data) -> bool:
+    # Windows overlap so a keyword on a boundary is still seen
+    overlap = max(len(keyword) for keyword in SECRET_KEYWORDS) - 1
+    for start in range(0, max(len(data), 1), WINDOW_SIZE):
+        window = data[start:start + WINDOW_SIZE + overlap].lower()
+        if any(keyword in window for keyword in SECRET_KEYWORDS):
+            return True
+    return False
+
+def find_secrets(data) -> list:
+    """
+    (line number, text) of each SECRET_REGEX match in bytes or an mmap
+    """
+    if not might_contain_secrets(data):
+        return []
+    matches = []
+    line, position = 1, 0
+    for match in SECRET_REGEX.finditer(data):
+        line += data[position:match.start()].count(b'\n')
+        position = match.start()
+        matches.append((line, match.group(match.lastgroup).decode('utf-8', 'replace')))
+    return matches
+
+def scan_file(filepath: str, known_digest: str = None):
     """
-    Scan for potential hardcoded secrets
+    (digest, matches) for one file. Returns (digest, None) when the
+    content still has known_digest, so the file is known to be clean.
     """
-    secret_patterns = [
-        r'(api_key|password|secret|token)\s*=\s*[\'"][^\'"]+[\'"]\s*',  # Basic secret detection
-        r'(https?://[^:]+:[^@]+@)',  # URL with credentials
+    with open(filepath, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                digest = hashlib.blake2b(data).hexdigest()
+                return digest, None if digest == known_digest else find_secrets(data)
+        data = f.read()
+    digest = hashlib.blake2b(data).hexdigest()
+    return digest, None if digest == known_digest else find_secrets(data)
+
+def scan_batch(batch: list) -> list:
+    results = []
+    for filepath, known_digest in batch:
+        try:
+            results.append((filepath, *scan_file(filepath, known_digest)))
+        except OSError as e:
+            print(f"Could not scan {filepath}: {e}", file=sys.stderr)
+    return results
+
+def candidate_files(directory: str, skip: set, ignored: set = IGNORED_DIRECTORIES):
+    for root, dirs, files in os.walk(directory):
+        # Pruned in place so os.walk never descends into them
+        dirs[:] = [name for name in dirs if name not in ignored]
+        for file in files:
+            if file.endswith(SCANNED_EXTENSIONS):
+                filepath = os.path.join(root, file)
+                if os.path.abspath(filepath) not in skip:
+                    yield filepath
+
+def load_cache(path: str) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache.get('files', {}) if cache.get('version') == CACHE_VERSION else {}
+
+def save_cache(path: str, files: dict):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump({'version': CACHE_VERSION, 'files': files}, f)
+    os.replace(temporary, path)
+
+def check_hardcoded_secrets(
+    directory,
+    workers: int = None,
+    cache_path: str = None,
+    use_cache: bool = True,
+    exclude: set = ()
+):
+    """
+    Scan for potential hardcoded secrets.
+    
+    Clean files whose size and mtime match the cache are not read at
+    all; clean files whose content hash matches are not searched again.
+    The cache records only which lines matched, so files with findings
+    are searched on every run to report the matched text. Remaining
+    files are scanned in batches across a process pool. Directories in
+    exclude are skipped in addition to IGNORED_DIRECTORIES.
+    """
+    cache_path = cache_path or default_cache_path(directory)
+    cache = load_cache(cache_path) if use_cache else {}
+    ignored = IGNORED_DIRECTORIES | set(exclude)
+    
+    updated = {}
+    pending = []
+    for filepath in candidate_files(directory, {os.path.abspath(cache_path)}, ignored):
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            continue
+        entry = cache.get(filepath)
+        if entry and entry['lines']:
+            # Findings are reported from a fresh read, never from the cache
+            entry = None
+        if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            updated[filepath] = (entry, [])
+            continue
+        known_digest = entry['digest'] if entry and entry['size'] == stat.st_size else None
+        pending.append((filepath, known_digest, stat))
+    
+    batches = [
+        [(filepath, known_digest) for filepath, known_digest, _ in pending[start:start + BATCH_SIZE]]
+        for start in range(0, len(pending), BATCH_SIZE)
     ]
+    if len(pending) >= PARALLEL_THRESHOLD and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = [result for batch in pool.map(scan_batch, batches) for result in batch]
+    else:
+        results = [result for batch in batches for result in scan_batch(batch)]
     
-    findings = []
+    stats = {filepath: stat for filepath, _, stat in pending}
+    for filepath, digest, matches in results:
+        matches = matches or []
+        entry = {
+            'mtime_ns': stats[filepath].st_mtime_ns,
+            'size': stats[filepath].st_size,
+            'digest': digest,
+            'lines': [line for line, _ in matches],
+        }
+        updated[filepath] = (entry, matches)
     
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith(('.py', '.js', '.json', '.yml', '.yaml', '.env')):
-                filepath = os.path.join(root, file)
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    for pattern in secret_patterns:
-                        matches = re.findall(pattern, content, re.IGNORECASE)
-                        if matches:
-                            findings.append({
-                                'file': filepath,
-                                'matches': matches
-                            })
+    if use_cache:
+        save_cache(cache_path, {filepath: entry for filepath, (entry, _) in updated.items()})
     
-    return findings
+    return [
+        {
+            'file': filepath,
+            'lines': [line for line, _ in matches],
+            'matches': [text for _, text in matches],
+        }
+        for filepath, (_, matches) in sorted(updated.items()) if matches
+    ]
 
 def check_dependency_vulnerabilities():
     """
@@ -46,15 +211,33 @@ def check_dependency_vulnerabilities():
         return None
 
 def main():
+    parser = argparse.ArgumentParser(description="Scan for hardcoded secrets and vulnerable dependencies")
+    parser.add_argument('directory', nargs='?', default='.')
+    parser.add_argument('--workers', type=int, default=None, help="scanner processes (default: one per CPU)")
+    parser.add_argument('--no-cache', action='store_true', help="rescan every file and leave the cache alone")
+    parser.add_argument('--cache', default=None, help=f"cache file (default: one per directory under {CACHE_DIRECTORY})")
+    parser.add_argument(
+        '--exclude', action='append', default=[], metavar='DIR',
+        help="also skip directories with this name (repeatable), e.g. --exclude data"
+    )
+    args = parser.parse_args()
+    
     print("🔒 Security Scan Starting...")
     
     # Secret scanning
     print("\n🕵️ Scanning for potential hardcoded secrets...")
-    secret_findings = check_hardcoded_secrets('.')
+    secret_findings = check_hardcoded_secrets(
+        args.directory,
+        workers=args.workers,
+        cache_path=args.cache,
+        use_cache=not args.no_cache,
+        exclude=set(args.exclude)
+    )
     if secret_findings:
         print("⚠️ Potential secrets found:")
         for finding in secret_findings:
-            print(f" - {finding['file']}: {finding['matches']}")
+            label = 'line' if len(finding['lines']) == 1 else 'lines'
+            print(f" - {finding['file']} ({label} {', '.join(map(str, finding['lines']))}): {finding['matches']}")
         sys.exit(1)
     else:
         print("✅ No hardcoded secrets detected")
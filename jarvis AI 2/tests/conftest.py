@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Config reads the environment when backend.config is first imported
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+os.environ['TASK_STORE_PATH'] = ''
+os.environ['TASK_HISTORY_LOG'] = ''
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
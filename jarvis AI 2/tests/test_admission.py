@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from backend.admission import AdmissionController, AdmissionRejected, DeadlineExceeded
+
+async def occupy(controller: AdmissionController, release: asyncio.Event, intent: str = 'general_conversation'):
+    async with controller.admit(intent):
+        await release.wait()
+
+def test_freed_slots_go_to_system_control_first():
+    order = []
+    
+    async def request(controller, intent):
+        async with controller.admit(intent):
+            order.append(intent)
+    
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, queue_limit=10, max_queue_wait=5, deadline=10)
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(occupy(controller, release))
+        await asyncio.sleep(0)
+        
+        waiting = []
+        for intent in ['information_retrieval', 'general_conversation', 'unknown_intent',
+                       'task_automation', 'system_control']:
+            waiting.append(asyncio.ensure_future(request(controller, intent)))
+            await asyncio.sleep(0)
+        assert controller.stats()['classes']['information_retrieval']['depth'] == 2
+        
+        release.set()
+        await asyncio.gather(holder, *waiting)
+    
+    asyncio.run(scenario())
+    # Unknown intents share the lowest class, first come first served
+    assert order == [
+        'system_control', 'task_automation', 'general_conversation',
+        'information_retrieval', 'unknown_intent',
+    ]
+
+def test_full_queue_is_rejected():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, queue_limit=1, max_queue_wait=5, deadline=10)
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(occupy(controller, release))
+        await asyncio.sleep(0)
+        queued = asyncio.ensure_future(occupy(controller, release, 'system_control'))
+        await asyncio.sleep(0)
+        
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.admit('system_control'):
+                pass
+        # Other classes have their own queues
+        other = asyncio.ensure_future(occupy(controller, release, 'task_automation'))
+        await asyncio.sleep(0)
+        
+        release.set()
+        await asyncio.gather(holder, queued, other)
+        return controller, rejected.value
+    
+    controller, error = asyncio.run(scenario())
+    assert error.reason == 'queue_full'
+    assert controller.rejected['system_control'] == {'queue_full': 1}
+    assert controller.admitted['task_automation'] == 1
+
+def test_expected_wait_over_limit_is_rejected_up_front():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, queue_limit=10, max_queue_wait=1, deadline=10)
+        controller._service_time = 5.0
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(occupy(controller, release))
+        await asyncio.sleep(0)
+        
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.admit('information_retrieval'):
+                pass
+        release.set()
+        await holder
+        return rejected.value
+    
+    error = asyncio.run(scenario())
+    assert error.reason == 'overloaded'
+    assert error.retry_after >= 5.0
+
+def test_queue_wait_limit_answers_busy():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, queue_limit=10, max_queue_wait=0.05, deadline=10)
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(occupy(controller, release))
+        await asyncio.sleep(0)
+        
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with controller.admit('general_conversation'):
+                pass
+        release.set()
+        await holder
+        return controller, rejected.value
+    
+    controller, error = asyncio.run(scenario())
+    assert error.reason == 'wait_exceeded'
+    assert controller.deadline_exceeded['general_conversation'] == 0
+
+def test_deadline_shorter_than_queue_wait_reports_deadline():
+    async def scenario():
+        controller = AdmissionController(max_concurrency=1, queue_limit=10, max_queue_wait=5, deadline=10)
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(occupy(controller, release))
+        await asyncio.sleep(0)
+        
+        with pytest.raises(DeadlineExceeded):
+            async with controller.admit('general_conversation', deadline=0.05):
+                pass
+        stats = controller.stats()['classes']['general_conversation']
+        release.set()
+        await holder
+        return stats
+    
+    stats = asyncio.run(scenario())
+    assert stats['deadline_exceeded'] == 1
+    assert stats['rejected'] == {}
+    assert stats['depth'] == 0
@@ -0,0 +1,45 @@
+import asyncio
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import bulk_analysis, main
+from backend.config import Config
+
+def batched_analysis(records, **options):
+    """
+    Stand-in for analyze_many that reads three records ahead, like
+    nlp.pipe filling a batch
+    """
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == 3:
+            yield from ({'text': item if isinstance(item, str) else item['text']} for item in batch)
+            batch = []
+    yield from ({'text': item if isinstance(item, str) else item['text']} for item in batch)
+
+def test_error_records_keep_their_place_in_input_order(monkeypatch):
+    monkeypatch.setattr(bulk_analysis.nlp_engine, 'analyze_many', batched_analysis)
+    body = b'"a"\n"b"\nnot json\n"c"\n{"id": 5}\n"d"\n\n"e"\nbad\n'
+    
+    async def scenario():
+        return [json.loads(line) async for line in bulk_analysis.stream_analysis(io.BytesIO(body))]
+    
+    results = asyncio.run(scenario())
+    assert [result.get('text') or result['line'] for result in results] == ['a', 'b', 3, 'c', 5, 'd', 'e', 9]
+    assert results[4]['error'] == "Missing 'text' field"
+
+@pytest.mark.parametrize('query', [
+    f'n_process={Config.BULK_MAX_N_PROCESS + 1}',
+    'n_process=0',
+    'n_process=-1',
+    f'batch_size={Config.BULK_MAX_BATCH_SIZE + 1}',
+    'batch_size=0',
+])
+def test_pipe_options_above_limits_are_rejected(query):
+    response = TestClient(main.app).post(f'/analyze/batch?{query}', content=b'"hello"\n')
+    
+    assert response.status_code == 422
@@ -0,0 +1,49 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from backend.command_runner import AsyncCommandRunner, BoundedOutput
+
+posix_only = pytest.mark.skipif(os.name != 'posix', reason='uses a POSIX shell')
+
+@posix_only
+def test_output_is_collected_and_streamed():
+    lines = []
+    runner = AsyncCommandRunner()
+    result = asyncio.run(runner.run('echo one; echo two >&2', on_output=lambda *item: lines.append(item)))
+    
+    assert result.returncode == 0
+    assert result.stdout == 'one\n'
+    assert result.stderr == 'two\n'
+    assert sorted(lines) == [('stderr', 'two\n'), ('stdout', 'one\n')]
+
+@posix_only
+def test_timeout_kills_children_that_outlive_the_shell():
+    runner = AsyncCommandRunner()
+    started = time.monotonic()
+    result = asyncio.run(runner.run('sleep 8 & echo hi', timeout=1))
+    
+    assert time.monotonic() - started < 4
+    assert result.timed_out
+    assert result.stdout == 'hi\n'
+    assert runner.stats()['timeouts'] == 1
+
+def test_bounded_output_counts_encoded_bytes():
+    output = BoundedOutput(max_bytes=10)
+    output.append('ééé\n')
+    assert output.size == 7
+    output.append('abcd\n')
+    
+    # The first line no longer fits alongside the second
+    assert output.text() == 'abcd\n'
+    assert output.dropped == 1
+
+def test_bounded_output_cuts_an_oversized_line_to_its_tail():
+    output = BoundedOutput(max_bytes=4)
+    output.append('abcdéf')
+    
+    assert output.text() == 'déf'
+    assert output.size <= 4
+    assert output.dropped == 1
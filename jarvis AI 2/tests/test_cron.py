@@ -0,0 +1,174 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend.cron import CronExpression, parse_cron
+
+try:
+    from zoneinfo import ZoneInfo
+    NEW_YORK = ZoneInfo('America/New_York')
+except Exception:  # no zoneinfo or no tz database
+    NEW_YORK = None
+
+needs_tz = pytest.mark.skipif(NEW_YORK is None, reason="needs the America/New_York tz database")
+
+def random_field(rng: random.Random, low: int, high: int):
+    """
+    Random cron field text and the set of values it matches
+    """
+    kind = rng.choice(['*', 'value', 'range', 'step', 'range_step', 'list'])
+    if kind == '*':
+        return '*', set(range(low, high + 1))
+    if kind == 'value':
+        value = rng.randint(low, high)
+        return str(value), {value}
+    if kind == 'step':
+        step = rng.randint(2, 5)
+        return f'*/{step}', set(range(low, high + 1, step))
+    start = rng.randint(low, high)
+    end = rng.randint(start, high)
+    if kind == 'range':
+        return f'{start}-{end}', set(range(start, end + 1))
+    if kind == 'range_step':
+        step = rng.randint(2, 4)
+        return f'{start}-{end}/{step}', set(range(start, end + 1, step))
+    values = rng.sample(range(low, high + 1), 2)
+    return ','.join(map(str, values)), set(values)
+
+def brute_force(fields: dict, day_or: bool, after: datetime) -> datetime:
+    """
+    Next matching minute after a naive datetime, checked day by day and
+    then minute by minute
+    """
+    day = after.replace(hour=0, minute=0, second=0, microsecond=0)
+    for _ in range(366 * 30):
+        cron_weekday = (day.weekday() + 1) % 7
+        by_day = day.day in fields['days']
+        by_weekday = cron_weekday in fields['weekdays']
+        matches_day = (by_day or by_weekday) if day_or else (by_day and by_weekday)
+        if day.month in fields['months'] and matches_day:
+            for hour in sorted(fields['hours']):
+                for minute in sorted(fields['minutes']):
+                    candidate = day.replace(hour=hour, minute=minute)
+                    if candidate > after:
+                        return candidate
+        day += timedelta(days=1)
+    raise AssertionError("no match within 30 years")
+
+def test_random_expressions_match_brute_force():
+    rng = random.Random(20241103)
+    for _ in range(300):
+        minute, minutes = random_field(rng, 0, 59)
+        hour, hours = random_field(rng, 0, 23)
+        day, days = random_field(rng, 1, 31)
+        month, months = random_field(rng, 1, 12)
+        weekday, weekdays = random_field(rng, 0, 6)
+        expression = f'{minute} {hour} {day} {month} {weekday}'
+        fields = {'minutes': minutes, 'hours': hours, 'days': days, 'months': months, 'weekdays': weekdays}
+        # As in Vixie cron, a field starting with '*' (including '*/n')
+        # does not count as restricted
+        day_or = not day.startswith('*') and not weekday.startswith('*')
+        
+        after = datetime(2020, 1, 1) + timedelta(minutes=rng.randrange(60 * 24 * 365 * 8))
+        cron = CronExpression(expression, timezone.utc)
+        try:
+            expected = brute_force(fields, day_or, after)
+        except AssertionError:
+            with pytest.raises(ValueError):
+                cron.next_after(after.replace(tzinfo=timezone.utc))
+            continue
+        found = cron.next_after(after.replace(tzinfo=timezone.utc))
+        assert found.replace(tzinfo=None) == expected, (expression, after)
+
+def test_day_of_month_or_day_of_week():
+    # The 13th or any Friday, not only Friday the 13th
+    cron = CronExpression('0 0 13 * 5', timezone.utc)
+    start = datetime(2024, 9, 1, tzinfo=timezone.utc)
+    fires = [start]
+    for _ in range(4):
+        fires.append(cron.next_after(fires[-1]))
+    assert [fire.day for fire in fires[1:]] == [6, 13, 20, 27]
+    
+    # A restricted field and a '*' field still combine with AND
+    cron = CronExpression('0 0 13 * *', timezone.utc)
+    assert cron.next_after(start).day == 13
+
+def test_february_29():
+    cron = CronExpression('0 0 29 2 *', timezone.utc)
+    assert cron.next_after(datetime(2024, 3, 1, tzinfo=timezone.utc)) == datetime(2028, 2, 29, tzinfo=timezone.utc)
+    # 2100 is not a leap year
+    assert cron.next_after(datetime(2096, 3, 1, tzinfo=timezone.utc)) == datetime(2104, 2, 29, tzinfo=timezone.utc)
+
+def test_impossible_date_is_rejected_when_searched():
+    with pytest.raises(ValueError):
+        CronExpression('0 0 30 2 *', timezone.utc).next_after(datetime(2024, 1, 1, tzinfo=timezone.utc))
+
+@pytest.mark.parametrize('expression', [
+    '0 0 L * *',
+    '0 0 * * 5L',
+    '0 0 15W * *',
+    '0 0 * * 5#3',
+    '60 * * * *',
+    '0 24 * * *',
+    '0 0 0 * *',
+    '0 0 * 13 *',
+    '0 0 * * 8',
+    '*/0 * * * *',
+    '0 0 * *',
+    '0 0 * * * *',
+])
+def test_invalid_expressions_are_rejected(expression):
+    with pytest.raises(ValueError):
+        CronExpression(expression)
+
+def test_names_macros_and_sunday_alias():
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)  # a Monday
+    assert CronExpression('0 9 * jan-feb sun', timezone.utc).next_after(start) == datetime(2024, 1, 7, 9, tzinfo=timezone.utc)
+    assert CronExpression('0 9 * * 7', timezone.utc).next_after(start) == datetime(2024, 1, 7, 9, tzinfo=timezone.utc)
+    assert CronExpression('@monthly', timezone.utc).next_after(start) == datetime(2024, 2, 1, tzinfo=timezone.utc)
+
+def local(text: str, fold: int = 0) -> datetime:
+    return datetime.fromisoformat(text).replace(tzinfo=NEW_YORK, fold=fold)
+
+def fires(expression: str, start: datetime, count: int) -> list:
+    cron = parse_cron(expression, NEW_YORK)
+    times = []
+    after = start.timestamp()
+    for _ in range(count):
+        after = cron.next_fire_time(after)
+        times.append(datetime.fromtimestamp(after, timezone.utc))
+    return times
+
+def utc(text: str) -> datetime:
+    return datetime.fromisoformat(text).replace(tzinfo=timezone.utc)
+
+@needs_tz
+def test_spring_forward_runs_skipped_time_after_the_jump():
+    # 2024-03-10: 02:00 EST jumps to 03:00 EDT, so 02:30 never happens
+    assert fires('30 2 * * *', local('2024-03-09T00:00'), 3) == [
+        utc('2024-03-09T07:30'),  # 02:30 EST
+        utc('2024-03-10T07:30'),  # 03:30 EDT, right after the jump
+        utc('2024-03-11T06:30'),  # 02:30 EDT
+    ]
+    # Times after the gap are unaffected
+    assert fires('30 3 * * *', local('2024-03-10T00:00'), 1) == [utc('2024-03-10T07:30')]
+
+@needs_tz
+def test_fall_back_fires_repeated_time_once():
+    # 2024-11-03: 02:00 EDT falls back to 01:00 EST, so 01:30 happens twice
+    assert fires('30 1 * * *', local('2024-11-02T12:00'), 2) == [
+        utc('2024-11-03T05:30'),  # 01:30 EDT; 01:30 EST is skipped
+        utc('2024-11-04T06:30'),  # 01:30 EST the next day
+    ]
+    # Started during the repeated hour, after the first 01:30 passed
+    assert fires('30 1 * * *', local('2024-11-03T01:10', fold=1), 1) == [utc('2024-11-04T06:30')]
+
+@needs_tz
+def test_fall_back_pauses_wildcard_hours_during_repeated_hour():
+    assert fires('0,30 * * * *', local('2024-11-03T00:45'), 4) == [
+        utc('2024-11-03T05:00'),  # 01:00 EDT
+        utc('2024-11-03T05:30'),  # 01:30 EDT
+        utc('2024-11-03T07:00'),  # 02:00 EST
+        utc('2024-11-03T07:30'),  # 02:30 EST
+    ]
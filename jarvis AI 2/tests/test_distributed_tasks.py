@@ -0,0 +1,141 @@
+import asyncio
+import time
+from datetime import timedelta
+
+import pytest
+
+pytest.importorskip('redis')
+fakeredis = pytest.importorskip('fakeredis')
+# fakeredis runs the Lua scripts with lupa
+pytest.importorskip('lupa')
+
+from backend.distributed_tasks import DistributedTaskManager
+
+INTERVAL = 0.5
+LEASE = 1.0
+
+def cluster(server, runs: list, size: int = 3) -> list:
+    """
+    Workers sharing one fake Redis server, each recording its runs of
+    the 'tick' task as (worker index, time, scheduled fire time)
+    """
+    managers = []
+    for index in range(size):
+        manager = DistributedTaskManager(
+            redis=fakeredis.aioredis.FakeRedis(server=server, decode_responses=True),
+            lease=LEASE,
+            poll_interval=0.1,
+            worker_id=f'w{index}'
+        )
+        
+        @manager.register('tick')
+        async def tick():
+            pass
+        
+        async def record_run(task, fire_time, started_at, error, index=index, record=manager._record_run):
+            runs.append((index, time.monotonic(), fire_time))
+            await record(task, fire_time, started_at, error)
+        
+        manager._record_run = record_run
+        manager.start()
+        managers.append(manager)
+    return managers
+
+async def schedule_tick(managers: list):
+    # Every worker registers the task at startup; only one definition wins
+    for manager in managers:
+        await manager.create_task('tick', schedule={'interval': timedelta(seconds=INTERVAL)}, task_id='tick')
+
+async def wait_for_leader(managers: list) -> DistributedTaskManager:
+    for _ in range(50):
+        leaders = [manager for manager in managers if manager.is_leader]
+        if leaders:
+            assert len(leaders) == 1
+            return leaders[0]
+        await asyncio.sleep(0.05)
+    raise AssertionError("no leader elected")
+
+def assert_one_run_per_interval(runs: list):
+    # Each scheduled slot ran exactly once, and slots are an interval apart
+    fire_times = [fire_time for _, _, fire_time in runs]
+    assert len(set(fire_times)) == len(fire_times)
+    fire_times.sort()
+    gaps = [later - earlier for earlier, later in zip(fire_times, fire_times[1:])]
+    assert all(gap > INTERVAL * 0.99 for gap in gaps), gaps
+
+def test_each_interval_runs_once_across_workers():
+    runs = []
+    
+    async def scenario():
+        managers = cluster(fakeredis.FakeServer(), runs)
+        await wait_for_leader(managers)
+        await schedule_tick(managers)
+        await asyncio.sleep(INTERVAL * 4 + 0.25)
+        for manager in managers:
+            await manager.stop()
+    
+    asyncio.run(scenario())
+    # Runs at 0, 0.5, 1.0, 1.5 and 2.0 seconds
+    assert len(runs) == 5
+    assert_one_run_per_interval(runs)
+
+def test_worker_takes_over_when_leader_lease_expires():
+    runs = []
+    
+    async def scenario():
+        managers = cluster(fakeredis.FakeServer(), runs)
+        leader = await wait_for_leader(managers)
+        await schedule_tick(managers)
+        await asyncio.sleep(INTERVAL * 2 + 0.25)
+        
+        # Crash the leader: its loops stop without releasing the lease
+        leader._serving = False
+        for worker in leader._workers:
+            worker.cancel()
+        await asyncio.gather(*leader._workers, return_exceptions=True)
+        crashed_at = time.monotonic()
+        survivors = [manager for manager in managers if manager is not leader]
+        
+        new_leader = await wait_for_leader(survivors)
+        took_over = time.monotonic() - crashed_at
+        await asyncio.sleep(INTERVAL * 3)
+        
+        for manager in managers:
+            await manager.stop()
+        return leader, new_leader, took_over, crashed_at
+    
+    leader, new_leader, took_over, crashed_at = asyncio.run(scenario())
+    assert new_leader is not leader
+    # Within the lease plus one renewal period
+    assert took_over < LEASE + LEASE / 3 + 0.2
+    # Scheduling resumed once the new leader took over
+    assert len([at for _, at, _ in runs if at > crashed_at + took_over]) >= 2
+    # Slots missed during the takeover run once, late, and are not repeated
+    assert_one_run_per_interval(runs)
+
+def test_removing_a_task_removes_it_across_the_cluster():
+    runs = []
+    
+    async def scenario():
+        managers = cluster(fakeredis.FakeServer(), runs)
+        leader = await wait_for_leader(managers)
+        await schedule_tick(managers)
+        await asyncio.sleep(INTERVAL + 0.25)
+        
+        # Removed on a worker that is not the leader
+        follower = next(manager for manager in managers if manager is not leader)
+        follower.remove_task('tick')
+        await follower.flush_writes()
+        removed_at = time.monotonic()
+        await asyncio.sleep(INTERVAL * 3)
+        
+        listings = [await manager.list_cluster_tasks() for manager in managers]
+        for manager in managers:
+            await manager.stop()
+        return removed_at, listings
+    
+    removed_at, listings = asyncio.run(scenario())
+    assert len(runs) >= 2
+    # A run already queued when the task was removed may still finish
+    assert len([at for _, at, _ in runs if at > removed_at + 0.1]) == 0
+    assert all(listing == [] for listing in listings)
@@ -0,0 +1,115 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from backend import main
+from backend.config import Config
+from backend.llm_client import LLMClient
+
+def sse(*events) -> bytes:
+    return b''.join(f"data: {event}\n\n".encode() for event in events)
+
+def delta(content: str = None, role: str = None) -> str:
+    fields = {}
+    if role:
+        fields['role'] = role
+    if content is not None:
+        fields['content'] = content
+    return json.dumps({'choices': [{'index': 0, 'delta': fields}]})
+
+class BrokenStream(httpx.AsyncByteStream):
+    """
+    Sends the given events, then drops the connection
+    """
+    def __init__(self, body: bytes):
+        self.body = body
+    
+    async def __aiter__(self):
+        yield self.body
+        raise httpx.ReadError("connection reset by peer")
+
+def client_for(handler) -> LLMClient:
+    client = LLMClient(api_key='test', base_url='http://llm.test/v1', model='fake')
+    client._client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(handler))
+    return client
+
+async def collect(iterator) -> list:
+    return [item async for item in iterator]
+
+def test_stream_chat_yields_content_deltas():
+    requests = []
+    
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        body = (
+            b": keep-alive comment\n\n"
+            + sse(delta(role='assistant'), delta('Hello'), delta(''), delta(', world'))
+            + b"event: ignored\n\n"
+            + sse('[DONE]', delta('after done'))
+        )
+        return httpx.Response(200, content=body, headers={'content-type': 'text/event-stream'})
+    
+    client = client_for(handler)
+    chunks = asyncio.run(collect(client.stream_chat([{'role': 'user', 'content': 'hi'}])))
+    
+    assert chunks == ['Hello', ', world']
+    assert requests[0]['stream'] is True
+    assert requests[0]['model'] == 'fake'
+
+def test_stream_chat_raises_on_error_status():
+    client = client_for(lambda request: httpx.Response(503, content=b'overloaded'))
+    
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(collect(client.stream_chat([{'role': 'user', 'content': 'hi'}])))
+
+class FakeConnection:
+    def __init__(self):
+        self.frames = []
+    
+    async def send(self, message: dict):
+        self.frames.append(message)
+
+def stream_frames(monkeypatch, handler) -> list:
+    """
+    Frames sent for one streamed information query answered by handler
+    """
+    monkeypatch.setattr(Config, 'RESPONSE_CACHE_ENABLED', False)
+    
+    async def analyze_query(query):
+        return SimpleNamespace(text=query, vector=None), 'information_retrieval'
+    
+    monkeypatch.setattr(main.assistant, 'analyze_query', analyze_query)
+    
+    async def scenario():
+        monkeypatch.setattr(main, 'llm_client', client_for(handler))
+        connection = FakeConnection()
+        await main.handle_frame(connection, {'id': 'r1', 'query': 'What is SSE?', 'stream': True})
+        return connection.frames
+    
+    return asyncio.run(scenario())
+
+def test_streamed_reply_is_sent_as_chunk_frames_then_end(monkeypatch):
+    body = sse(delta(role='assistant'), delta('Server-sent '), delta('events'), '[DONE]')
+    frames = stream_frames(monkeypatch, lambda request: httpx.Response(200, content=body))
+    
+    assert frames == [
+        {'type': 'chunk', 'id': 'r1', 'data': 'Server-sent '},
+        {'type': 'chunk', 'id': 'r1', 'data': 'events'},
+        {'type': 'end', 'id': 'r1'},
+    ]
+
+def test_error_in_the_middle_of_a_stream_ends_with_error_frame(monkeypatch):
+    body = sse(delta('partial '), delta('answer'))
+    frames = stream_frames(monkeypatch, lambda request: httpx.Response(200, stream=BrokenStream(body)))
+    
+    assert frames[:2] == [
+        {'type': 'chunk', 'id': 'r1', 'data': 'partial '},
+        {'type': 'chunk', 'id': 'r1', 'data': 'answer'},
+    ]
+    assert frames[2]['type'] == 'error'
+    assert frames[2]['id'] == 'r1'
+    assert 'connection reset' in frames[2]['error']
+    assert len(frames) == 3
@@ -0,0 +1,126 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.main import InvalidFrame, parse_frame
+from backend.multiplexer import ConnectionMultiplexer
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+    
+    async def send_text(self, text: str):
+        self.sent.append(json.loads(text) if text.startswith('{') else text)
+
+async def sleepy_handler(connection: ConnectionMultiplexer, frame: dict):
+    """
+    Answers after frame['delay'] seconds
+    """
+    await asyncio.sleep(frame['delay'])
+    await connection.send({'type': 'response', 'id': frame['id']})
+
+def test_replies_arrive_in_completion_order():
+    websocket = FakeWebSocket()
+    
+    async def scenario():
+        connection = ConnectionMultiplexer(websocket, sleepy_handler, None, max_inflight=4, max_pending=4)
+        await connection.submit({'id': 'slow', 'delay': 0.2})
+        await connection.submit({'id': 'quick', 'delay': 0.01})
+        await asyncio.sleep(0.3)
+        await connection.close()
+    
+    asyncio.run(scenario())
+    assert [frame['id'] for frame in websocket.sent] == ['quick', 'slow']
+
+def test_cancel_by_id_stops_only_that_request():
+    websocket = FakeWebSocket()
+    
+    async def scenario():
+        connection = ConnectionMultiplexer(websocket, sleepy_handler, None, max_inflight=4, max_pending=4)
+        await connection.submit({'id': 'doomed', 'delay': 0.2})
+        await connection.submit({'id': 'kept', 'delay': 0.1})
+        await connection.cancel('doomed')
+        await connection.cancel('unknown')
+        inflight = connection.inflight
+        await asyncio.sleep(0.3)
+        await connection.close()
+        return inflight
+    
+    assert asyncio.run(scenario()) == 1
+    assert websocket.sent == [
+        {'type': 'cancelled', 'id': 'doomed'},
+        {'type': 'error', 'id': 'unknown', 'error': "No such request in flight"},
+        {'type': 'response', 'id': 'kept'},
+    ]
+
+def test_requests_beyond_max_pending_are_refused():
+    websocket = FakeWebSocket()
+    
+    async def scenario():
+        connection = ConnectionMultiplexer(websocket, sleepy_handler, None, max_inflight=1, max_pending=2)
+        for request_id in ['a', 'b', 'c', 'a']:
+            await connection.submit({'id': request_id, 'delay': 0.05})
+        await asyncio.sleep(0.2)
+        await connection.close()
+    
+    asyncio.run(scenario())
+    assert websocket.sent == [
+        {'type': 'error', 'id': 'c', 'error': "Too many requests in flight"},
+        {'type': 'error', 'id': 'a', 'error': "A request with this id is already in flight"},
+        {'type': 'response', 'id': 'a'},
+        {'type': 'response', 'id': 'b'},
+    ]
+
+def test_plain_text_beyond_max_pending_gets_a_plain_text_error():
+    websocket = FakeWebSocket()
+    
+    async def echo(connection: ConnectionMultiplexer, text: str):
+        await asyncio.sleep(0.05)
+        await connection.send_text(text)
+    
+    async def scenario():
+        connection = ConnectionMultiplexer(websocket, None, echo, max_inflight=1, max_pending=1)
+        for text in ['one', 'two', 'three']:
+            await connection.submit_text(text)
+        await asyncio.sleep(0.2)
+        await connection.close()
+    
+    asyncio.run(scenario())
+    # 'one' fills the queue before the worker first runs
+    assert websocket.sent == ["Error: too many requests in flight"] * 2 + ['one']
+
+def test_parse_frame_accepts_requests_and_cancels():
+    assert parse_frame('hello') is None
+    assert parse_frame('{not json') is None
+    
+    frame = parse_frame('{"id": 7, "query": "hi", "deadline_ms": 250}')
+    assert frame == {'id': '7', 'query': 'hi', 'deadline_ms': 250, 'stream': True}
+    assert parse_frame('{"type": "cancel", "id": 7}') == {'type': 'cancel', 'id': '7'}
+
+@pytest.mark.parametrize('data, request_id', [
+    ('{"type": "ping"}', None),
+    ('{"id": "x"}', 'x'),
+    ('{"type": "cancel"}', None),
+    ('{"id": "x", "query": "hi", "deadline_ms": "soon"}', 'x'),
+    ('{"id": "x", "query": "hi", "deadline_ms": -5}', 'x'),
+    ('{"id": "x", "query": "hi", "deadline_ms": true}', 'x'),
+    ('{"id": "x", "query": "hi", "deadline_ms": NaN}', 'x'),
+    ('{"id": "x", "query": ["hi"]}', 'x'),
+])
+def test_parse_frame_rejects_malformed_frames(data, request_id):
+    with pytest.raises(InvalidFrame) as raised:
+        parse_frame(data)
+    assert raised.value.request_id == request_id
+
+def test_malformed_frames_get_an_error_frame():
+    with TestClient(main.app).websocket_connect('/ws') as websocket:
+        websocket.send_text('{"type": "ping"}')
+        unknown = websocket.receive_json()
+        websocket.send_text('{"id": "x", "query": "hi", "deadline_ms": "soon"}')
+        bad_deadline = websocket.receive_json()
+    
+    assert unknown['type'] == 'error' and unknown['id'] is None
+    assert bad_deadline == {'type': 'error', 'id': 'x', 'error': "deadline_ms must be a positive number"}
@@ -0,0 +1,36 @@
+import numpy as np
+
+from backend.response_cache import SemanticResponseCache
+
+def vector(*values):
+    return np.array(values, dtype=np.float32)
+
+def test_exact_hit_ignores_case_and_punctuation():
+    cache = SemanticResponseCache(capacity=4, ttl=60, max_bytes=1024)
+    cache.put("What is the capital of France?", "Paris")
+    
+    assert cache.get("what is the capital of france") == "Paris"
+    assert cache.exact_hits == 1
+
+def test_semantic_hit_requires_same_content_words():
+    cache = SemanticResponseCache(capacity=4, similarity_threshold=0.95, ttl=60, max_bytes=1024)
+    cache.put("What is the capital of France", "Paris", vector(1.0, 0.0, 0.1))
+    
+    # Nearly the same averaged vector, different entity
+    assert cache.get("What is the capital of Germany", vector(1.0, 0.0, 0.12)) is None
+    # Same content words, different phrasing
+    assert cache.get("Tell me the capital of France", vector(1.0, 0.0, 0.11)) == "Paris"
+    assert cache.semantic_hits == 1
+    assert cache.misses == 1
+
+def test_semantic_lookup_falls_back_to_next_best_candidate():
+    cache = SemanticResponseCache(capacity=4, similarity_threshold=0.9, ttl=60, max_bytes=1024)
+    cache.put("capital of Germany", "Berlin", vector(1.0, 0.0, 0.0))
+    cache.put("capital of France", "Paris", vector(1.0, 0.2, 0.0))
+    
+    assert cache.get("what is the capital of France", vector(1.0, 0.01, 0.0)) == "Paris"
+
+def test_zero_threshold_is_not_replaced_by_default():
+    cache = SemanticResponseCache(capacity=4, similarity_threshold=0.0, ttl=60, max_bytes=1024)
+    
+    assert cache.similarity_threshold == 0.0
@@ -0,0 +1,56 @@
+import json
+
+from backend.config import Config
+from backend.task_history import ExecutionRecord, TaskHistory
+
+def record(started_at: float, task_id: str = 'task') -> ExecutionRecord:
+    return ExecutionRecord(task_id, started_at, 0.01, 'completed')
+
+def test_ring_keeps_only_the_most_recent_records():
+    history = TaskHistory(capacity=3, log_path='')
+    for second in range(5):
+        history.append(record(second))
+    
+    assert len(history) == 3
+    assert [r.started_at for r in history.recent()] == [2, 3, 4]
+    assert [r.started_at for r in history.recent(2)] == [3, 4]
+
+def test_ring_before_it_wraps():
+    history = TaskHistory(capacity=4, log_path='')
+    assert history.recent() == []
+    history.append(record(1))
+    history.append(record(2))
+    
+    assert len(history) == 2
+    assert [r.started_at for r in history.recent()] == [1, 2]
+
+def test_seek_time_lands_on_a_line_just_before_the_target(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'TASK_HISTORY_SKEW', 0)
+    history = TaskHistory(capacity=10, log_path=str(tmp_path / 'history.jsonl'))
+    for second in range(5000):
+        history.append(record(second))
+    history.close()
+    
+    with open(history.log_path, 'rb') as log:
+        offset = history._seek_time(log, 4000)
+        log.seek(offset - 1)
+        assert log.read(1) == b'\n'
+        first = ExecutionRecord(**json.loads(log.readline()))
+    
+    # The search stops within one 4 KiB window of the target
+    assert 3900 <= first.started_at <= 4000
+
+def test_read_range_filters_by_time_and_task(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'TASK_HISTORY_SKEW', 5)
+    history = TaskHistory(capacity=10, log_path=str(tmp_path / 'history.jsonl'))
+    for second in range(3000):
+        history.append(record(second, 'even' if second % 2 == 0 else 'odd'))
+        if second == 2003:
+            # Completed out of order, but within the allowed skew
+            history.append(record(2000.5, 'late'))
+    
+    found = list(history.read_range(2000, 2006))
+    assert [r.started_at for r in found] == [2000, 2001, 2002, 2003, 2000.5, 2004, 2005]
+    assert [r.started_at for r in history.read_range(2000, 2006, task_id='odd')] == [2001, 2003, 2005]
+    assert list(history.read_range(5000)) == []
+    history.close()
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+from backend.config import Config
+from backend.task_manager import SmartTaskManager
+
+def at(seconds: float) -> dict:
+    return {'datetime': datetime.fromtimestamp(time.time() + seconds)}
+
+def test_tasks_fire_in_deadline_order():
+    fired = []
+    
+    async def scenario():
+        manager = SmartTaskManager(max_concurrency=1)
+        for name, delay in [('third', 0.15), ('first', 0.05), ('second', 0.1)]:
+            manager.add_task(name, lambda name=name: fired.append(name), at(delay))
+        await asyncio.sleep(0.3)
+        await manager.stop()
+    
+    asyncio.run(scenario())
+    assert fired == ['first', 'second', 'third']
+
+def test_cancelled_task_never_fires():
+    fired = []
+    
+    async def scenario():
+        manager = SmartTaskManager()
+        task_id = manager.add_task('doomed', lambda: fired.append('doomed'), at(0.05))
+        manager.add_task('kept', lambda: fired.append('kept'), at(0.1))
+        await manager.cancel_task(task_id)
+        await asyncio.sleep(0.2)
+        await manager.stop()
+        return manager
+    
+    manager = asyncio.run(scenario())
+    assert fired == ['kept']
+    assert manager._heap == []
+
+def test_compaction_keeps_live_entries():
+    fired = []
+    
+    async def scenario():
+        manager = SmartTaskManager()
+        ids = [manager.add_task(f'task{i}', lambda: None, at(3600 + i)) for i in range(3000)]
+        soon = manager.add_task('soon', lambda: fired.append('soon'), at(0.1))
+        for task_id in ids[:2500]:
+            manager.remove_task(task_id)
+        
+        # Stale entries were dropped, every live one survived
+        assert len(manager._heap) < 3001
+        live = {entry[2] for entry in manager._heap if manager._is_current(entry[0], entry[2])}
+        assert live == set(ids[2500:]) | {soon}
+        assert manager._heap[0][2] == soon
+        
+        await asyncio.sleep(0.25)
+        await manager.stop()
+    
+    asyncio.run(scenario())
+    assert fired == ['soon']
+
+def test_failing_recurring_task_stops_at_retry_limit(monkeypatch):
+    monkeypatch.setattr(Config, 'TASK_RETRY_LIMIT', 3)
+    calls = []
+    
+    def flaky():
+        calls.append(time.time())
+        raise RuntimeError("boom")
+    
+    async def scenario():
+        manager = SmartTaskManager()
+        task_id = manager.add_task('flaky', flaky, {'interval': timedelta(milliseconds=20)})
+        await asyncio.sleep(0.3)
+        await manager.stop()
+        return manager.tasks[task_id], manager
+    
+    task, manager = asyncio.run(scenario())
+    assert len(calls) == 3
+    assert task['status'] == 'failed'
+    assert task['failures'] == 3
+    assert task['next_run'] is None
+    assert manager.recurring_tasks == {}
+
+def test_success_resets_failure_count(monkeypatch):
+    monkeypatch.setattr(Config, 'TASK_RETRY_LIMIT', 2)
+    outcomes = iter([False, True, False, True, False, False, True])
+    calls = []
+    
+    def sometimes():
+        calls.append(1)
+        if not next(outcomes):
+            raise RuntimeError("boom")
+    
+    async def scenario():
+        manager = SmartTaskManager()
+        manager.add_task('sometimes', sometimes, {'interval': timedelta(milliseconds=20)})
+        await asyncio.sleep(0.4)
+        await manager.stop()
+    
+    asyncio.run(scenario())
+    # Single failures are retried; two in a row end the task
+    assert len(calls) == 6
@@ -0,0 +1,96 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.config import Config
+from backend.task_manager import SmartTaskManager
+from backend.task_store import TaskStore
+
+INTERVAL = 60
+
+def persist_missed_tasks(path: str):
+    """
+    Save an interval task whose last six slots passed while the process
+    was down, and a one-shot task that was due five minutes ago
+    """
+    manager = SmartTaskManager(store=TaskStore(path))
+    manager.register('tick')(lambda: None)
+    # No event loop: tasks are saved but never run
+    manager.add_task('tick', schedule={'interval': timedelta(seconds=INTERVAL)}, task_id='interval')
+    manager.add_task('tick', schedule={'datetime': datetime.now() + timedelta(hours=1)}, task_id='one-shot')
+    
+    now = time.time()
+    manager.tasks['interval']['next_run'] = now - 5 * INTERVAL - INTERVAL / 2
+    manager.tasks['one-shot']['next_run'] = now - 300
+    for task in manager.tasks.values():
+        manager.store.update(task)
+    manager.store.close()
+
+def restart(path: str) -> dict:
+    """
+    Restore the tasks into a new manager on the same file and count the
+    runs of each during a short window
+    """
+    runs = {'interval': 0, 'one-shot': 0}
+    
+    async def scenario():
+        manager = SmartTaskManager(store=TaskStore(path))
+        
+        @manager.register('tick')
+        async def tick():
+            pass
+        
+        restored = manager.restore()
+        original = manager._execute
+        
+        async def counting(task_id, fire_time):
+            runs[task_id] += 1
+            await original(task_id, fire_time)
+        
+        manager._execute = counting
+        await asyncio.sleep(0.3)
+        await manager.stop()
+        manager.store.close()
+        return restored, manager.tasks
+    
+    restored, tasks = asyncio.run(scenario())
+    return {'restored': restored, 'runs': runs, 'tasks': tasks}
+
+@pytest.mark.parametrize('policy, limit, interval_runs, one_shot_runs', [
+    ('skip', 10, 0, 0),
+    ('once', 10, 1, 1),
+    ('all', 10, 6, 1),
+    ('all', 3, 3, 1),
+])
+def test_restore_replays_missed_runs_by_policy(tmp_path, monkeypatch, policy, limit, interval_runs, one_shot_runs):
+    monkeypatch.setattr(Config, 'TASK_CATCHUP_POLICY', policy)
+    monkeypatch.setattr(Config, 'TASK_CATCHUP_LIMIT', limit)
+    path = str(tmp_path / 'tasks.db')
+    persist_missed_tasks(path)
+    
+    result = restart(path)
+    
+    assert result['runs'] == {'interval': interval_runs, 'one-shot': one_shot_runs}
+    interval = result['tasks']['interval']
+    # After catching up the task is back on its regular schedule
+    assert interval['next_run'] > time.time() + INTERVAL / 4
+    assert interval.get('catch_up', 0) == 0
+    if policy == 'skip':
+        assert result['restored'] == 1
+        assert result['tasks']['one-shot']['status'] == 'missed'
+    else:
+        assert result['restored'] == 2
+        assert result['tasks']['one-shot']['status'] == 'completed'
+
+def test_restored_state_survives_another_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'TASK_CATCHUP_POLICY', 'once')
+    path = str(tmp_path / 'tasks.db')
+    persist_missed_tasks(path)
+    restart(path)
+    
+    # Nothing was missed since the first restart
+    result = restart(path)
+    assert result['runs'] == {'interval': 0, 'one-shot': 0}
+    assert result['restored'] == 1
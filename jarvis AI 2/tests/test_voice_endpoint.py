@@ -0,0 +1,68 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.admission import DeadlineExceeded
+
+class BufferingVAD:
+    """
+    Stand-in for EnergyVAD that treats everything fed since the last
+    flush as one utterance
+    """
+    def __init__(self, sample_rate: int = 16000):
+        self.sample_rate = sample_rate
+        self.pending = []
+    
+    def feed(self, data: bytes):
+        self.pending.append(data)
+        return []
+    
+    def flush(self):
+        completed, self.pending = self.pending, []
+        return completed
+
+def test_start_frame_flushes_audio_at_its_original_rate(monkeypatch):
+    rates = []
+    
+    async def process_query(text, deadline=None):
+        return 'hi'
+    
+    async def synthesize(text):
+        return b'RIFF'
+    
+    monkeypatch.setattr(main, 'EnergyVAD', BufferingVAD)
+    monkeypatch.setattr(main.speech_recognizer, 'transcribe', lambda segment, rate: rates.append(rate) or 'hello')
+    monkeypatch.setattr(main.assistant, 'process_query', process_query)
+    monkeypatch.setattr(main.speech_synthesizer, 'synthesize', synthesize)
+    
+    with TestClient(main.app).websocket_connect('/ws/voice') as websocket:
+        websocket.send_bytes(b'\x00\x00')
+        websocket.send_text(json.dumps({'type': 'start', 'sample_rate': 8000}))
+        assert websocket.receive_json()['type'] == 'transcript'
+        assert websocket.receive_json()['type'] == 'response'
+        assert websocket.receive_bytes() == b'RIFF'
+        
+        websocket.send_bytes(b'\x00\x00')
+        websocket.send_text(json.dumps({'type': 'end'}))
+        assert websocket.receive_json()['type'] == 'transcript'
+    
+    assert rates == [16000, 8000]
+
+def test_deadline_exceeded_is_reported_without_a_traceback(monkeypatch, caplog):
+    async def process_query(text, deadline=None):
+        raise DeadlineExceeded('Deadline exceeded')
+    
+    monkeypatch.setattr(main, 'EnergyVAD', BufferingVAD)
+    monkeypatch.setattr(main.speech_recognizer, 'transcribe', lambda segment, rate: 'hello')
+    monkeypatch.setattr(main.assistant, 'process_query', process_query)
+    
+    with TestClient(main.app).websocket_connect('/ws/voice') as websocket:
+        websocket.send_bytes(b'\x00\x00')
+        websocket.send_text(json.dumps({'type': 'end'}))
+        transcript = websocket.receive_json()
+        error = websocket.receive_json()
+    
+    assert error == {'type': 'error', 'id': transcript['id'], 'error': 'Deadline exceeded'}
+    # An expected outcome, not a failure worth a logged traceback
+    assert not [r for r in caplog.records if r.levelname == 'ERROR']